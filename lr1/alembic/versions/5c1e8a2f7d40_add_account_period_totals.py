@@ -0,0 +1,58 @@
+"""Add account period totals
+
+Revision ID: 5c1e8a2f7d40
+Revises: b3660fef5353
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a2f7d40'
+down_revision: Union[str, None] = 'b3660fef5353'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('accounts', sa.Column('opening_balance', sa.Float(), nullable=True))
+    op.create_table('account_period_totals',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'month', 'type')
+    )
+    op.create_index(op.f('ix_account_period_totals_user_id'), 'account_period_totals', ['user_id'], unique=False)
+    # Existing balances were entered by hand and never included transactions: keep them as the opening balance.
+    op.execute("UPDATE accounts SET opening_balance = COALESCE(balance, 0)")
+    op.execute("""
+        INSERT INTO account_period_totals (account_id, month, type, user_id, total, count)
+        SELECT account_id, to_char(date, 'YYYY-MM'), type, user_id, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY account_id, to_char(date, 'YYYY-MM'), type, user_id
+    """)
+    op.execute("""
+        UPDATE accounts SET balance = accounts.opening_balance + COALESCE((
+            SELECT SUM(CASE WHEN t.type = 'income' THEN t.total ELSE -t.total END)
+            FROM account_period_totals t WHERE t.account_id = accounts.id
+        ), 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE accounts SET balance = opening_balance")
+    op.drop_index(op.f('ix_account_period_totals_user_id'), table_name='account_period_totals')
+    op.drop_table('account_period_totals')
+    op.drop_column('accounts', 'opening_balance')
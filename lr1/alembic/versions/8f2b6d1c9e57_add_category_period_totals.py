@@ -0,0 +1,45 @@
+"""Add category period totals
+
+Revision ID: 8f2b6d1c9e57
+Revises: 5c1e8a2f7d40
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2b6d1c9e57'
+down_revision: Union[str, None] = '5c1e8a2f7d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('category_period_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'category_id', 'month')
+    )
+    op.execute("""
+        INSERT INTO category_period_totals (user_id, category_id, month, total, count)
+        SELECT t.user_id, tc.category_id, to_char(t.date, 'YYYY-MM'), SUM(tc.allocated_amount), COUNT(*)
+        FROM transaction_categories tc
+        JOIN transactions t ON t.id = tc.transaction_id
+        WHERE t.type = 'expense'
+        GROUP BY t.user_id, tc.category_id, to_char(t.date, 'YYYY-MM')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('category_period_totals')
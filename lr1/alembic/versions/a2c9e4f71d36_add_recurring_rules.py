@@ -0,0 +1,55 @@
+"""Add recurring rules
+
+Revision ID: a2c9e4f71d36
+Revises: f3a8c61d9b07
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c9e4f71d36'
+down_revision: Union[str, None] = 'f3a8c61d9b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('recurring_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('categories', sa.JSON(), nullable=False),
+    sa.Column('frequency', sa.String(), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('occurrence_count', sa.Integer(), nullable=False),
+    sa.Column('next_date', sa.Date(), nullable=True),
+    sa.Column('last_date', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recurring_rules_id'), 'recurring_rules', ['id'], unique=False)
+    op.create_index('ix_recurring_rules_user_id', 'recurring_rules', ['user_id'], unique=False)
+    op.create_index('ix_recurring_rules_next_date', 'recurring_rules', ['next_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_recurring_rules_next_date', table_name='recurring_rules')
+    op.drop_index('ix_recurring_rules_user_id', table_name='recurring_rules')
+    op.drop_index(op.f('ix_recurring_rules_id'), table_name='recurring_rules')
+    op.drop_table('recurring_rules')
@@ -0,0 +1,139 @@
+"""Partition transactions by month
+
+Revision ID: a6d2f48c3e19
+Revises: e91d3a7c5b28
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2f48c3e19'
+down_revision: Union[str, None] = 'e91d3a7c5b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 12
+
+
+def add_months(date: datetime.date, months: int) -> datetime.date:
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_constraints(transaction_key: list) -> None:
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.create_primary_key('transactions_pkey', 'transactions', transaction_key)
+    op.create_foreign_key('transactions_account_id_fkey', 'transactions', 'accounts', ['account_id'], ['id'])
+    op.create_foreign_key('transactions_user_id_fkey', 'transactions', 'users', ['user_id'], ['id'])
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    op.create_index('ix_transactions_user_date_id', 'transactions', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_transactions_user_type_date', 'transactions', ['user_id', 'type', 'date'], unique=False,
+                    postgresql_include=['amount'])
+    op.create_index('ix_transactions_account_id', 'transactions', ['account_id'], unique=False)
+    op.create_index('ix_transaction_categories_category_transaction', 'transaction_categories',
+                    ['category_id', 'transaction_id'], unique=False, postgresql_include=['allocated_amount'])
+    op.create_foreign_key('transaction_categories_category_id_fkey', 'transaction_categories', 'categories',
+                          ['category_id'], ['id'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("UPDATE transactions SET date = CURRENT_DATE WHERE date IS NULL")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE transaction_categories RENAME TO transaction_categories_unpartitioned")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            amount FLOAT NOT NULL,
+            date DATE NOT NULL,
+            description VARCHAR,
+            type transactiontype NOT NULL
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("""
+        CREATE TABLE transaction_categories (
+            transaction_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            transaction_date DATE NOT NULL,
+            allocated_amount FLOAT NOT NULL
+        ) PARTITION BY RANGE (transaction_date)
+    """)
+
+    first = op.get_bind().execute(sa.text("SELECT MIN(date) FROM transactions_unpartitioned")).scalar()
+    month = (first or datetime.date.today()).replace(day=1)
+    last = add_months(datetime.date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        op.execute(f"CREATE TABLE transactions_{month:%Y_%m} PARTITION OF transactions FOR VALUES {bounds}")
+        op.execute(f"CREATE TABLE transaction_categories_{month:%Y_%m} PARTITION OF transaction_categories FOR VALUES {bounds}")
+        month = add_months(month, 1)
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+    op.execute("CREATE TABLE transaction_categories_default PARTITION OF transaction_categories DEFAULT")
+
+    op.execute("""
+        INSERT INTO transactions (id, user_id, account_id, amount, date, description, type)
+        SELECT id, user_id, account_id, amount, date, description, type FROM transactions_unpartitioned
+    """)
+    op.execute("""
+        INSERT INTO transaction_categories (transaction_id, category_id, transaction_date, allocated_amount)
+        SELECT tc.transaction_id, tc.category_id, t.date, tc.allocated_amount
+        FROM transaction_categories_unpartitioned tc
+        JOIN transactions_unpartitioned t ON t.id = tc.transaction_id
+    """)
+    op.drop_table('transaction_categories_unpartitioned')
+    op.drop_table('transactions_unpartitioned')
+
+    create_constraints(['id', 'date'])
+    op.create_primary_key('transaction_categories_pkey', 'transaction_categories',
+                          ['transaction_id', 'category_id', 'transaction_date'])
+    op.create_foreign_key('transaction_categories_transaction_fkey', 'transaction_categories', 'transactions',
+                          ['transaction_id', 'transaction_date'], ['id', 'date'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE transaction_categories RENAME TO transaction_categories_partitioned")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            user_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            amount FLOAT NOT NULL,
+            date DATE,
+            description VARCHAR,
+            type transactiontype NOT NULL
+        )
+    """)
+    op.execute("""
+        CREATE TABLE transaction_categories (
+            transaction_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            allocated_amount FLOAT NOT NULL
+        )
+    """)
+    op.execute("""
+        INSERT INTO transactions (id, user_id, account_id, amount, date, description, type)
+        SELECT id, user_id, account_id, amount, date, description, type FROM transactions_partitioned
+    """)
+    op.execute("""
+        INSERT INTO transaction_categories (transaction_id, category_id, allocated_amount)
+        SELECT transaction_id, category_id, allocated_amount FROM transaction_categories_partitioned
+    """)
+    op.execute("DROP TABLE transaction_categories_partitioned CASCADE")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
+
+    create_constraints(['id'])
+    op.create_primary_key('transaction_categories_pkey', 'transaction_categories', ['transaction_id', 'category_id'])
+    op.create_foreign_key('transaction_categories_transaction_id_fkey', 'transaction_categories', 'transactions',
+                          ['transaction_id'], ['id'])
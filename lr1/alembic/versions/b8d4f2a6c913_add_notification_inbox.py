@@ -0,0 +1,47 @@
+"""Add notification inbox
+
+Revision ID: b8d4f2a6c913
+Revises: a2c9e4f71d36
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6c913'
+down_revision: Union[str, None] = 'a2c9e4f71d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('read_at', sa.DateTime(), nullable=True))
+    op.drop_index('ix_notifications_user_created_at', table_name='notifications')
+    op.create_index('ix_notifications_user_id_id', 'notifications', ['user_id', 'id'], unique=False)
+    op.create_index('ix_notifications_user_unread', 'notifications', ['user_id', 'id'], unique=False,
+                    postgresql_where=sa.text('read_at IS NULL'), sqlite_where=sa.text('read_at IS NULL'))
+    op.create_index('ix_notifications_read_at', 'notifications', ['read_at'], unique=False)
+    op.create_table('notification_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Existing notifications start out unread.
+    op.execute("INSERT INTO notification_counters (user_id, unread) "
+               "SELECT user_id, COUNT(*) FROM notifications GROUP BY user_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notification_counters')
+    op.drop_index('ix_notifications_read_at', table_name='notifications')
+    op.drop_index('ix_notifications_user_unread', table_name='notifications')
+    op.drop_index('ix_notifications_user_id_id', table_name='notifications')
+    op.create_index('ix_notifications_user_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+    op.drop_column('notifications', 'read_at')
@@ -0,0 +1,30 @@
+"""Add notification dedup key
+
+Revision ID: c47a9e3b1f02
+Revises: 8f2b6d1c9e57
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a9e3b1f02'
+down_revision: Union[str, None] = '8f2b6d1c9e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('dedup_key', sa.String(), nullable=True))
+    op.create_unique_constraint('uq_notifications_dedup_key', 'notifications', ['dedup_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_notifications_dedup_key', 'notifications', type_='unique')
+    op.drop_column('notifications', 'dedup_key')
@@ -0,0 +1,49 @@
+"""Add finance query indexes
+
+Revision ID: e91d3a7c5b28
+Revises: c47a9e3b1f02
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91d3a7c5b28'
+down_revision: Union[str, None] = 'c47a9e3b1f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_accounts_user_id', 'accounts', ['user_id'], unique=False)
+    op.create_index('ix_transactions_user_date_id', 'transactions', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_transactions_user_type_date', 'transactions', ['user_id', 'type', 'date'], unique=False,
+                    postgresql_include=['amount'])
+    op.create_index('ix_transactions_account_id', 'transactions', ['account_id'], unique=False)
+    op.drop_index('ix_account_period_totals_user_id', table_name='account_period_totals')
+    op.create_index('ix_account_period_totals_user_type_month', 'account_period_totals', ['user_id', 'type', 'month'],
+                    unique=False, postgresql_include=['total', 'count'])
+    op.create_index('ix_transaction_categories_category_transaction', 'transaction_categories',
+                    ['category_id', 'transaction_id'], unique=False, postgresql_include=['allocated_amount'])
+    op.create_index('ix_budgets_user_category', 'budgets', ['user_id', 'category_id'], unique=False)
+    op.create_index('ix_goals_user_id', 'goals', ['user_id'], unique=False)
+    op.create_index('ix_notifications_user_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_user_created_at', table_name='notifications')
+    op.drop_index('ix_goals_user_id', table_name='goals')
+    op.drop_index('ix_budgets_user_category', table_name='budgets')
+    op.drop_index('ix_transaction_categories_category_transaction', table_name='transaction_categories')
+    op.drop_index('ix_account_period_totals_user_type_month', table_name='account_period_totals')
+    op.create_index('ix_account_period_totals_user_id', 'account_period_totals', ['user_id'], unique=False)
+    op.drop_index('ix_transactions_account_id', table_name='transactions')
+    op.drop_index('ix_transactions_user_type_date', table_name='transactions')
+    op.drop_index('ix_transactions_user_date_id', table_name='transactions')
+    op.drop_index('ix_accounts_user_id', table_name='accounts')
@@ -0,0 +1,34 @@
+"""Add user forecasts
+
+Revision ID: f3a8c61d9b07
+Revises: d15b7e0a4c62
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c61d9b07'
+down_revision: Union[str, None] = 'd15b7e0a4c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_forecasts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_forecasts')
@@ -0,0 +1,78 @@
+import argparse
+import time
+from collections import defaultdict
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, selectinload
+from app.database import Base
+from app.models import Transaction, TransactionType
+from app.crud import analytics
+from app.serialization_benchmark import seed
+
+QUANTILES = [50, 90, 99]
+
+
+def orm_path(db: Session, user_id: int) -> dict:
+    # The ad-hoc way: load ORM objects and aggregate them row by row in Python.
+    transactions = db.query(Transaction).filter(Transaction.user_id == user_id)\
+        .options(selectinload(Transaction.transaction_categories)).all()
+    weeks, months, accounts, categories = defaultdict(float), defaultdict(float), defaultdict(lambda: [0.0, 0.0]), defaultdict(list)
+    for transaction in transactions:
+        expense = transaction.type == TransactionType.expense
+        accounts[transaction.account_id][expense] += transaction.amount
+        if expense:
+            weeks[transaction.date.isocalendar()[:2]] += transaction.amount
+            months[transaction.date.strftime("%Y-%m")] += transaction.amount
+            for tc in transaction.transaction_categories:
+                categories[tc.category_id].append(tc.allocated_amount)
+    percentiles = {}
+    for category_id, values in categories.items():
+        values.sort()
+        percentiles[category_id] = [values[min(len(values) - 1, int(len(values) * q / 100))] for q in QUANTILES]
+    return {"weeks": weeks, "months": months, "accounts": accounts, "percentiles": percentiles}
+
+
+def vectorized_compute(frame: analytics.TransactionFrame) -> dict:
+    weeks = analytics.period_totals(frame, "week", TransactionType.expense)
+    return {"weeks": weeks, "rolling": analytics.rolling_mean(weeks[1], 4),
+            "months": analytics.period_totals(frame, "month", TransactionType.expense),
+            "accounts": analytics.account_totals(frame),
+            "percentiles": analytics.category_percentiles(frame, QUANTILES)}
+
+
+def timed(function, *args) -> tuple:
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-by-row ORM aggregation with the vectorized analytics engine")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--orm-max-rows", type=int, default=100000,
+                        help="skip the ORM baseline above this size (it needs several GB at a million rows)")
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    print(f"{'rows':>8} {'path':10} {'fetch ms':>10} {'compute ms':>11} {'total ms':>10}")
+    for rows in args.rows:
+        with Session(engine) as db:
+            user_id = seed(db, rows)
+            if rows <= args.orm_max_rows:
+                _, elapsed = timed(orm_path, db, user_id)
+                print(f"{rows:8} {'orm':10} {'':>10} {'':>11} {elapsed:10.1f}")
+                db.expunge_all()
+            frame, fetch = timed(analytics.load_frame, db, user_id)
+            _, compute = timed(vectorized_compute, frame)
+            print(f"{rows:8} {'vectorized':10} {fetch:10.1f} {compute:11.1f} {fetch + compute:10.1f}")
+            _, elapsed = timed(analytics.get_series, db, user_id, "day", TransactionType.expense, 30)
+            print(f"{rows:8} {'daily+30d':10} {'':>10} {'':>11} {elapsed:10.1f}")
+            _, elapsed = timed(analytics.get_account_flows, db, user_id)
+            print(f"{rows:8} {'accounts':10} {'':>10} {'':>11} {elapsed:10.1f}")
+            _, elapsed = timed(analytics.get_percentiles, db, user_id, QUANTILES)
+            print(f"{rows:8} {'percentile':10} {'':>10} {'':>11} {elapsed:10.1f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,99 @@
+import os
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import models
 from app.schemas import auth as auth_schema 
-from app.crud import auth as auth_crud
-from app.database import SessionLocal
+from app.crud import async_auth as auth_crud
+from app.database import get_db
 from app.core import security
+from app.core.cache import TTLCache
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "300")),
+)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate_tag(target.id)
+
+
+async def run_password_job(job):
     try:
-        yield db
-    finally:
-        db.close()
+        return await job
+    except security.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations, retry later", headers={"Retry-After": "1"})
 
 
 @router.post("/register", response_model=auth_schema.UserOut)
-def register(user: auth_schema.UserCreate, db: Session = Depends(get_db)) -> auth_schema.UserOut:
-    db_user = auth_crud.get_user_by_username(db, username=user.username)
+async def register(user: auth_schema.UserCreate, db: AsyncSession = Depends(get_db)) -> auth_schema.UserOut:
+    db_user = await auth_crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    new_user = auth_crud.create_user(db, user=user)
+    hashed_password = await run_password_job(security.hash_password_async(user.password))
+    new_user = await auth_crud.create_user(db, user=user, hashed_password=hashed_password)
     return new_user
 
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    db_user = auth_crud.get_user_by_username(db, username=form_data.username)
-    if not db_user or not security.verify_password(form_data.password, db_user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    db_user = await auth_crud.get_user_by_username(db, username=form_data.username)
+    if not db_user or not await run_password_job(security.verify_password_async(form_data.password, db_user.hashed_password)):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if security.needs_rehash(db_user.hashed_password):
+        hashed_password = await run_password_job(security.hash_password_async(form_data.password))
+        await auth_crud.update_password(db, db_user, form_data.password, hashed_password)
     token = security.generate_jwt({"user_id": db_user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 
-def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="login")), 
-                     db: Session = Depends(get_db)) -> models.User:
+async def authenticate(token: str, db: AsyncSession) -> security.UserPrincipal:
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
     payload = security.verify_jwt(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     user_id = payload.get("user_id")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await auth_crud.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    principal = security.UserPrincipal(id=user.id, username=user.username, email=user.email)
+    principal_cache.set(token, principal, expires_at=payload.get("exp"), tag=user.id)
+    return principal
+
+
+async def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="login")), 
+                           db: AsyncSession = Depends(get_db)) -> security.UserPrincipal:
+    return await authenticate(token, db)
 
 
 @router.get("/users/me", response_model=auth_schema.UserOut)
-def read_current_user(current_user: models.User = Depends(get_current_user)) -> auth_schema.UserOut:
+async def read_current_user(current_user: security.UserPrincipal = Depends(get_current_user)) -> auth_schema.UserOut:
     return current_user
 
 
 @router.get("/users", response_model=list[auth_schema.UserOut])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)) -> list[auth_schema.UserOut]:
-    users = auth_crud.get_users(db, skip=skip, limit=limit)
+async def read_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)) -> list[auth_schema.UserOut]:
+    users = await auth_crud.get_users(db, skip=skip, limit=limit)
     return users
 
 
 @router.post("/change-password")
-def change_password(change: auth_schema.ChangePassword, 
-                    current_user: models.User = Depends(get_current_user), 
-                    db: Session = Depends(get_db)):
-    if not security.verify_password(change.old_password, current_user.hashed_password):
+async def change_password(change: auth_schema.ChangePassword, 
+                          current_user: security.UserPrincipal = Depends(get_current_user), 
+                          db: AsyncSession = Depends(get_db)):
+    db_user = await auth_crud.get_user(db, current_user.id)
+    if not db_user or not await run_password_job(security.verify_password_async(change.old_password, db_user.hashed_password)):
         raise HTTPException(status_code=400, detail="Old password is incorrect")
-    auth_crud.update_password(db, current_user, change.new_password)
+    hashed_password = await run_password_job(security.hash_password_async(change.new_password))
+    await auth_crud.update_password(db, db_user, change.new_password, hashed_password)
     return {"msg": "Password updated successfully"}
+
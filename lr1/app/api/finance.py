@@ -1,87 +1,222 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import SessionLocal
+import base64
+import datetime
+import json
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.security import OAuth2PasswordBearer
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import AsyncSessionLocal, get_db, use_primary
 from app.schemas.finance import (
-    AccountCreate, AccountOut,
-    TransactionCreate, TransactionOut,
+    AccountCreate, AccountOut, AccountSummaryOut, AccountPeriodTotalOut,
+    TransactionCreate, TransactionOut, TransactionTypeEnum, BulkImportOut,
     CategoryCreate, CategoryOut,
     BudgetCreate, BudgetOut,
     GoalCreate, GoalOut,
+    RecurringRuleCreate, RecurringRuleOut,
     ExpenseAnalysisOut, BudgetNotificationOut,
-    NotificationOut, DashboardSummary, SpendingTrend
+    NotificationOut, NotificationMarkRead, NotificationMarkReadOut, NotificationUnreadOut, DashboardSummary, SpendingTrend,
+    AnalysisPeriodOut, YearOverYearOut, AmountPercentilesOut, AccountFlowOut,
+    ForecastOut, GoalProjectionOut, BudgetProjectionOut
 )
-from app.crud.finance import (
-    create_account, get_accounts, get_account, update_account, delete_account,
-    create_transaction, get_transactions, get_transaction, update_transaction, delete_transaction,
+from app.crud.async_finance import (
+    create_account, get_accounts, get_account_rows, get_account, get_account_totals, update_account, delete_account,
+    create_transaction, bulk_create_transactions, get_transactions, get_transaction_rows, iter_transactions, get_transaction, update_transaction, delete_transaction,
     create_category, get_categories, update_category, delete_category,
-    create_budget, get_budgets, update_budget, delete_budget,
+    create_budget, get_budgets, get_budget_rows, update_budget, delete_budget,
     create_goal, get_goals, update_goal, delete_goal,
+    create_recurring_rule, get_recurring_rules, update_recurring_rule, delete_recurring_rule,
     get_expense_analysis,
-    get_notifications, get_dashboard_summary, get_spending_trends
+    get_notifications, get_unread_count, mark_notifications_read, get_notification_events, get_last_notification_id, get_dashboard_summary, get_spending_trends,
+    get_analysis_series, get_year_over_year, get_percentiles, get_account_flows, get_forecast
+)
+from app.crud.analytics import GRANULARITIES
+from app.crud.finance import (
+    ACCOUNT_FIELDS, ACCOUNT_EXPANSIONS, TRANSACTION_FIELDS, TRANSACTION_EXPANSIONS, BUDGET_FIELDS, BUDGET_EXPANSIONS
 )
-from app.api.auth import get_current_user
-from app.models import User
+from app.api.auth import authenticate, get_current_user
+from app.core.statements import parse_statement
+from app.models import TransactionType
+from app.core.security import UserPrincipal
+from app.core.response_cache import analytics_cache, etag_matches, ANALYTICS_CACHE_PRIMARY_SECONDS
+from app.core.notifications import notification_broker
+from app.core.serialization import FastJSONResponse, fast_serialization
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def parse_names(value: Optional[str], allowed, param: str) -> Optional[list]:
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {param}: {', '.join(unknown)}")
+    return names
 
 @router.post("/accounts", response_model=AccountOut)
-def create_account_endpoint(account: AccountCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> AccountOut:
-    return create_account(db, account, current_user.id)
+async def create_account_endpoint(account: AccountCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> AccountOut:
+    return await create_account(db, account, current_user.id)
 
-@router.get("/accounts", response_model=List[AccountOut])
-def read_accounts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[AccountOut]:
-    return get_accounts(db, current_user.id)
+@router.get("/accounts", response_model=List[AccountSummaryOut])
+async def read_accounts(fields: Optional[str] = None,
+                        expand: Optional[str] = None,
+                        limit: Optional[int] = Query(None, ge=1, le=1000),
+                        db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[AccountSummaryOut]:
+    selected = parse_names(fields, ACCOUNT_FIELDS, "fields")
+    expanded = parse_names(expand, ACCOUNT_EXPANSIONS, "expand")
+    if selected or expanded or fast_serialization("read_accounts"):
+        return FastJSONResponse(await get_account_rows(db, current_user.id, fields=selected, expand=expanded or (), limit=limit))
+    return await get_accounts(db, current_user.id)
 
-@router.get("/accounts/{account_id}", response_model=AccountOut)
-def read_account(account_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> AccountOut:
-    db_account = get_account(db, account_id, current_user.id)
+@router.get("/accounts/{account_id}", response_model=AccountSummaryOut)
+async def read_account(account_id: int,
+                       fields: Optional[str] = None,
+                       expand: Optional[str] = None,
+                       limit: Optional[int] = Query(None, ge=1, le=1000),
+                       db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> AccountSummaryOut:
+    selected = parse_names(fields, ACCOUNT_FIELDS, "fields")
+    expanded = parse_names(expand, ACCOUNT_EXPANSIONS, "expand")
+    if selected or expanded:
+        rows = await get_account_rows(db, current_user.id, account_id=account_id, fields=selected, expand=expanded or (), limit=limit)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Account not found")
+        return FastJSONResponse(rows[0])
+    db_account = await get_account(db, account_id, current_user.id, eager=False)
     if not db_account:
         raise HTTPException(status_code=404, detail="Account not found")
     return db_account
 
+@router.get("/accounts/{account_id}/totals", response_model=List[AccountPeriodTotalOut])
+async def read_account_totals(account_id: int, month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"), db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[AccountPeriodTotalOut]:
+    return await get_account_totals(db, account_id, current_user.id, month=month)
+
 @router.put("/accounts/{account_id}", response_model=AccountOut)
-def update_account_endpoint(account_id: int, account: AccountCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> AccountOut:
-    db_account = update_account(db, account_id, account, current_user.id)
+async def update_account_endpoint(account_id: int, account: AccountCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> AccountOut:
+    db_account = await update_account(db, account_id, account, current_user.id)
     if not db_account:
         raise HTTPException(status_code=404, detail="Account not found")
     return db_account
 
 @router.delete("/accounts/{account_id}")
-def delete_account_endpoint(account_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not delete_account(db, account_id, current_user.id):
+async def delete_account_endpoint(account_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_account(db, account_id, current_user.id):
         raise HTTPException(status_code=404, detail="Account not found")
     return {"detail": "Account deleted"}
 
 @router.post("/transactions", response_model=TransactionOut)
-def create_transaction_endpoint(transaction: TransactionCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> TransactionOut:
+async def create_transaction_endpoint(transaction: TransactionCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> TransactionOut:
     try:
-        return create_transaction(db, transaction, current_user.id)
+        return await create_transaction(db, transaction, current_user.id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/transactions/bulk", response_model=BulkImportOut)
+async def bulk_create_transactions_endpoint(request: Request,
+                                            account_id: Optional[int] = None,
+                                            chunk_size: int = Query(1000, ge=1, le=10000),
+                                            db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> BulkImportOut:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart upload must contain a 'file' field")
+        rows = parse_statement((await upload.read()).decode("utf-8-sig"), upload.filename or "", account_id)
+    elif content_type.startswith("application/json"):
+        rows = await request.json()
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of transactions")
+    else:
+        rows = parse_statement((await request.body()).decode("utf-8-sig"), account_id=account_id)
+    transactions, errors = [], []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            transactions.append((row_number, TransactionCreate.model_validate(row)))
+        except ValidationError as e:
+            errors.append({"row": row_number, "detail": "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )})
+    return await bulk_create_transactions(db, transactions, current_user.id, chunk_size=chunk_size, errors=errors)
+
+def encode_cursor(date: datetime.date, transaction_id: int) -> str:
+    raw = f"{date.isoformat()}_{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_part, id_part = raw.split("_")
+        return datetime.date.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def stream_transactions(user_id: int, filters: dict):
+    async with AsyncSessionLocal() as db:
+        async for db_transaction in iter_transactions(db, user_id, **filters):
+            yield TransactionOut.model_validate(db_transaction, from_attributes=True).model_dump_json() + "\n"
+
 @router.get("/transactions", response_model=List[TransactionOut])
-def read_transactions(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[TransactionOut]:
-    return get_transactions(db, current_user.id)
+async def read_transactions(response: Response,
+                            cursor: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000),
+                            date_from: Optional[datetime.date] = None,
+                            date_to: Optional[datetime.date] = None,
+                            account_id: Optional[int] = None,
+                            type: Optional[TransactionTypeEnum] = None,
+                            category_id: Optional[int] = None,
+                            stream: bool = False,
+                            fields: Optional[str] = None,
+                            expand: Optional[str] = None,
+                            db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[TransactionOut]:
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "account_id": account_id,
+        "type": TransactionType(type.value) if type else None,
+        "category_id": category_id,
+    }
+    if stream:
+        return StreamingResponse(stream_transactions(current_user.id, filters), media_type="application/x-ndjson")
+    after = decode_cursor(cursor) if cursor else None
+    selected = parse_names(fields, TRANSACTION_FIELDS, "fields")
+    expanded = parse_names(expand, TRANSACTION_EXPANSIONS, "expand")
+    if selected or expanded is not None or fast_serialization("read_transactions"):
+        rows, last_key = await get_transaction_rows(db, current_user.id, after=after, limit=limit, fields=selected,
+                                                    expand=TRANSACTION_EXPANSIONS if expanded is None else expanded, **filters)
+        response = FastJSONResponse(rows)
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(*last_key)
+        return response
+    transactions = await get_transactions(db, current_user.id, after=after, limit=limit, **filters)
+    if len(transactions) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(transactions[-1].date, transactions[-1].id)
+    return transactions
 
 @router.get("/transactions/{transaction_id}", response_model=TransactionOut)
-def read_transaction(transaction_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> TransactionOut:
-    db_transaction = get_transaction(db, transaction_id, current_user.id)
+async def read_transaction(transaction_id: int,
+                           fields: Optional[str] = None,
+                           expand: Optional[str] = None,
+                           db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> TransactionOut:
+    selected = parse_names(fields, TRANSACTION_FIELDS, "fields")
+    expanded = parse_names(expand, TRANSACTION_EXPANSIONS, "expand")
+    if selected or expanded is not None:
+        rows, _ = await get_transaction_rows(db, current_user.id, limit=1, fields=selected, transaction_id=transaction_id,
+                                             expand=TRANSACTION_EXPANSIONS if expanded is None else expanded)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        return FastJSONResponse(rows[0])
+    db_transaction = await get_transaction(db, transaction_id, current_user.id)
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return db_transaction
 
 @router.put("/transactions/{transaction_id}", response_model=TransactionOut)
-def update_transaction_endpoint(transaction_id: int, transaction: TransactionCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> TransactionOut:
+async def update_transaction_endpoint(transaction_id: int, transaction: TransactionCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> TransactionOut:
     try:
-        db_transaction = update_transaction(db, transaction_id, transaction, current_user.id)
+        db_transaction = await update_transaction(db, transaction_id, transaction, current_user.id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     if not db_transaction:
@@ -89,47 +224,54 @@ def update_transaction_endpoint(transaction_id: int, transaction: TransactionCre
     return db_transaction
 
 @router.delete("/transactions/{transaction_id}")
-def delete_transaction_endpoint(transaction_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not delete_transaction(db, transaction_id, current_user.id):
+async def delete_transaction_endpoint(transaction_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_transaction(db, transaction_id, current_user.id):
         raise HTTPException(status_code=404, detail="Transaction not found")
     return {"detail": "Transaction deleted"}
 
 @router.post("/categories", response_model=CategoryOut)
-def create_category_endpoint(category: CategoryCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> CategoryOut:
-    return create_category(db, category)
+async def create_category_endpoint(category: CategoryCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> CategoryOut:
+    return await create_category(db, category)
 
 @router.get("/categories", response_model=List[CategoryOut])
-def read_categories(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[CategoryOut]:
-    return get_categories(db)
+async def read_categories(db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[CategoryOut]:
+    return await get_categories(db)
 
 @router.put("/categories/{category_id}", response_model=CategoryOut)
-def update_category_endpoint(category_id: int, category: CategoryCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> CategoryOut:
-    db_category = update_category(db, category_id, category)
+async def update_category_endpoint(category_id: int, category: CategoryCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> CategoryOut:
+    db_category = await update_category(db, category_id, category)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
 @router.delete("/categories/{category_id}")
-def delete_category_endpoint(category_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not delete_category(db, category_id):
+async def delete_category_endpoint(category_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_category(db, category_id):
         raise HTTPException(status_code=404, detail="Category not found")
     return {"detail": "Category deleted"}
 
 @router.post("/budgets", response_model=BudgetOut)
-def create_budget_endpoint(budget: BudgetCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> BudgetOut:
+async def create_budget_endpoint(budget: BudgetCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> BudgetOut:
     try:
-        return create_budget(db, budget, current_user.id)
+        return await create_budget(db, budget, current_user.id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/budgets", response_model=List[BudgetOut])
-def read_budgets(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[BudgetOut]:
-    return get_budgets(db, current_user.id)
+async def read_budgets(fields: Optional[str] = None,
+                       expand: Optional[str] = None,
+                       db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[BudgetOut]:
+    selected = parse_names(fields, BUDGET_FIELDS, "fields")
+    expanded = parse_names(expand, BUDGET_EXPANSIONS, "expand")
+    if selected or expanded is not None:
+        return FastJSONResponse(await get_budget_rows(db, current_user.id, fields=selected,
+                                                      expand=BUDGET_EXPANSIONS if expanded is None else expanded))
+    return await get_budgets(db, current_user.id)
 
 @router.put("/budgets/{budget_id}", response_model=BudgetOut)
-def update_budget_endpoint(budget_id: int, budget: BudgetCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> BudgetOut:
+async def update_budget_endpoint(budget_id: int, budget: BudgetCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> BudgetOut:
     try:
-        db_budget = update_budget(db, budget_id, budget, current_user.id)
+        db_budget = await update_budget(db, budget_id, budget, current_user.id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     if not db_budget:
@@ -137,47 +279,250 @@ def update_budget_endpoint(budget_id: int, budget: BudgetCreate, db: Session = D
     return db_budget
 
 @router.delete("/budgets/{budget_id}")
-def delete_budget_endpoint(budget_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not delete_budget(db, budget_id, current_user.id):
+async def delete_budget_endpoint(budget_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_budget(db, budget_id, current_user.id):
         raise HTTPException(status_code=404, detail="Budget not found")
     return {"detail": "Budget deleted"}
 
+@router.get("/budgets/{budget_id}/projection", response_model=BudgetProjectionOut)
+async def budget_projection(budget_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> BudgetProjectionOut:
+    projection = (await get_forecast(db, current_user.id))["budgets"].get(str(budget_id))
+    if projection is None:
+        raise HTTPException(status_code=404, detail="Budget not found or has no current window")
+    return projection
+
 @router.post("/goals", response_model=GoalOut)
-def create_goal_endpoint(goal: GoalCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> GoalOut:
-    return create_goal(db, goal, current_user.id)
+async def create_goal_endpoint(goal: GoalCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> GoalOut:
+    return await create_goal(db, goal, current_user.id)
 
 @router.get("/goals", response_model=List[GoalOut])
-def read_goals(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[GoalOut]:
-    return get_goals(db, current_user.id)
+async def read_goals(db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[GoalOut]:
+    return await get_goals(db, current_user.id)
 
 @router.put("/goals/{goal_id}", response_model=GoalOut)
-def update_goal_endpoint(goal_id: int, goal: GoalCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> GoalOut:
-    db_goal = update_goal(db, goal_id, goal, current_user.id)
+async def update_goal_endpoint(goal_id: int, goal: GoalCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> GoalOut:
+    db_goal = await update_goal(db, goal_id, goal, current_user.id)
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     return db_goal
 
 @router.delete("/goals/{goal_id}")
-def delete_goal_endpoint(goal_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not delete_goal(db, goal_id, current_user.id):
+async def delete_goal_endpoint(goal_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_goal(db, goal_id, current_user.id):
         raise HTTPException(status_code=404, detail="Goal not found")
     return {"detail": "Goal deleted"}
 
+@router.post("/recurring", response_model=RecurringRuleOut)
+async def create_recurring_rule_endpoint(rule: RecurringRuleCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> RecurringRuleOut:
+    try:
+        return await create_recurring_rule(db, rule, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/recurring", response_model=List[RecurringRuleOut])
+async def read_recurring_rules(db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[RecurringRuleOut]:
+    return await get_recurring_rules(db, current_user.id)
+
+@router.put("/recurring/{rule_id}", response_model=RecurringRuleOut)
+async def update_recurring_rule_endpoint(rule_id: int, rule: RecurringRuleCreate, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> RecurringRuleOut:
+    try:
+        db_rule = await update_recurring_rule(db, rule_id, rule, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not db_rule:
+        raise HTTPException(status_code=404, detail="Recurring rule not found")
+    return db_rule
+
+@router.delete("/recurring/{rule_id}")
+async def delete_recurring_rule_endpoint(rule_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)):
+    if not await delete_recurring_rule(db, rule_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Recurring rule not found")
+    return {"detail": "Recurring rule deleted"}
+
+@router.get("/goals/{goal_id}/projection", response_model=GoalProjectionOut)
+async def goal_projection(goal_id: int, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> GoalProjectionOut:
+    projection = (await get_forecast(db, current_user.id))["goals"].get(str(goal_id))
+    if projection is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return projection
+
+@router.get("/forecast", response_model=ForecastOut)
+async def read_forecast(db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> ForecastOut:
+    return await get_forecast(db, current_user.id)
+
+async def cached_analytics(request: Request, response: Response, db: AsyncSession, user_id: int, name: str, compute, params: tuple = ()):
+    key = analytics_cache.key(user_id, name, *params)
+    etag = analytics_cache.etag(key)
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        analytics_cache.record(name, hit=True)
+        return Response(status_code=304, headers={"ETag": etag})
+    result = analytics_cache.get(key, name)
+    if result is None:
+        if time.time() - analytics_cache.invalidated_at(key) < ANALYTICS_CACHE_PRIMARY_SECONDS:
+            use_primary(db)
+        result = jsonable_encoder(await compute(user_id))
+        analytics_cache.store(key, result)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return result
+
 @router.get("/analysis/expenses", response_model=List[ExpenseAnalysisOut])
-def expense_analysis(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[ExpenseAnalysisOut]:
-    analysis = get_expense_analysis(db, current_user.id)
-    return analysis
+async def expense_analysis(request: Request, response: Response,
+                           date_from: Optional[datetime.date] = None,
+                           date_to: Optional[datetime.date] = None,
+                           db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[ExpenseAnalysisOut]:
+    return await cached_analytics(request, response, db, current_user.id, "expense_analysis",
+                                  lambda user_id: get_expense_analysis(db, user_id, date_from=date_from, date_to=date_to),
+                                  params=(date_from, date_to))
+
+def encode_id_cursor(id: int) -> str:
+    return base64.urlsafe_b64encode(str(id).encode()).decode().rstrip("=")
+
+def decode_id_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/notifications", response_model=List[NotificationOut])
-def list_notifications(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[NotificationOut]:
-    return get_notifications(db, current_user.id)
+async def list_notifications(response: Response,
+                             cursor: Optional[str] = None,
+                             limit: int = Query(100, ge=1, le=1000),
+                             unread: bool = False,
+                             db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[NotificationOut]:
+    notifications = await get_notifications(db, current_user.id, before_id=decode_id_cursor(cursor) if cursor else None,
+                                            limit=limit, unread=unread)
+    if len(notifications) == limit:
+        response.headers["X-Next-Cursor"] = encode_id_cursor(notifications[-1].id)
+    return notifications
+
+@router.get("/notifications/unread-count", response_model=NotificationUnreadOut)
+async def unread_notification_count(db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> NotificationUnreadOut:
+    return {"unread": await get_unread_count(db, current_user.id)}
+
+@router.post("/notifications/read", response_model=NotificationMarkReadOut)
+async def mark_notifications_read_endpoint(body: NotificationMarkRead, db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> NotificationMarkReadOut:
+    if body.ids is None and body.up_to_id is None:
+        raise HTTPException(status_code=400, detail="Give ids or up_to_id")
+    updated = await mark_notifications_read(db, current_user.id, ids=body.ids, up_to_id=body.up_to_id)
+    return {"updated": updated, "unread": await get_unread_count(db, current_user.id)}
+
+# EventSource and browser WebSockets cannot set headers, so the push endpoints also take ?access_token=.
+async def get_stream_user(token: Optional[str] = Depends(OAuth2PasswordBearer(tokenUrl="login", auto_error=False)),
+                          access_token: Optional[str] = None,
+                          db: AsyncSession = Depends(get_db)) -> UserPrincipal:
+    if not (token or access_token):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await authenticate(token or access_token, db)
+
+async def fetch_notification_events(user_id: int, after_id: int, limit: int) -> list:
+    # Each replay uses its own short session; open streams do not hold a database connection.
+    async with AsyncSessionLocal() as db:
+        return await get_notification_events(db, user_id, after_id, limit)
+
+async def sse_notifications(request: Request, user_id: int, last_id: int):
+    yield "retry: 3000\n\n"
+    async for item in notification_broker.events(user_id, last_id, fetch_notification_events):
+        if await request.is_disconnected():
+            break
+        if item is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"id: {item['id']}\nevent: notification\ndata: {json.dumps(item)}\n\n"
+
+@router.get("/notifications/stream")
+async def stream_notifications(request: Request,
+                               after_id: Optional[int] = None,
+                               last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+                               db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_stream_user)):
+    # Resumes after Last-Event-ID (sent by EventSource on reconnect) or after_id; otherwise starts with new notifications.
+    last_id = after_id if after_id is not None else last_event_id
+    if last_id is None:
+        last_id = await get_last_notification_id(db, current_user.id)
+    return StreamingResponse(sse_notifications(request, current_user.id, last_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/notifications/ws")
+async def notifications_websocket(websocket: WebSocket, access_token: Optional[str] = None, last_id: Optional[int] = None):
+    token = access_token or websocket.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    async with AsyncSessionLocal() as db:
+        try:
+            current_user = await authenticate(token, db)
+        except HTTPException:
+            await websocket.close(code=1008)
+            return
+        if last_id is None:
+            last_id = await get_last_notification_id(db, current_user.id)
+    await websocket.accept()
+    try:
+        async for item in notification_broker.events(current_user.id, last_id, fetch_notification_events):
+            await websocket.send_json({"event": "heartbeat"} if item is None else {"event": "notification", "data": item})
+    except WebSocketDisconnect:
+        pass
 
 @router.get("/dashboard", response_model=DashboardSummary)
-def dashboard_summary(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> DashboardSummary:
-    summary = get_dashboard_summary(db, current_user.id)
-    return summary
+async def dashboard_summary(request: Request, response: Response,
+                            db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> DashboardSummary:
+    return await cached_analytics(request, response, db, current_user.id, "dashboard",
+                                  lambda user_id: get_dashboard_summary(db, user_id))
 
 @router.get("/trends/spending", response_model=List[SpendingTrend])
-def spending_trends(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> List[SpendingTrend]:
-    trends = get_spending_trends(db, current_user.id)
-    return trends
+async def spending_trends(request: Request, response: Response,
+                          date_from: Optional[datetime.date] = None,
+                          date_to: Optional[datetime.date] = None,
+                          db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[SpendingTrend]:
+    return await cached_analytics(request, response, db, current_user.id, "spending_trends",
+                                  lambda user_id: get_spending_trends(db, user_id, date_from=date_from, date_to=date_to),
+                                  params=(date_from, date_to))
+
+@router.get("/analysis/series", response_model=List[AnalysisPeriodOut])
+async def analysis_series(request: Request, response: Response,
+                          granularity: str = Query("month", pattern=f"^({'|'.join(GRANULARITIES)})$"),
+                          type: TransactionTypeEnum = TransactionTypeEnum.expense,
+                          window: int = Query(3, ge=1, le=366),
+                          date_from: Optional[datetime.date] = None,
+                          date_to: Optional[datetime.date] = None,
+                          db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[AnalysisPeriodOut]:
+    return await cached_analytics(request, response, db, current_user.id, "analysis_series",
+                                  lambda user_id: get_analysis_series(db, user_id, granularity=granularity,
+                                                                      type=TransactionType(type.value), window=window,
+                                                                      date_from=date_from, date_to=date_to),
+                                  params=(granularity, type.value, window, date_from, date_to))
+
+@router.get("/analysis/year-over-year", response_model=List[YearOverYearOut])
+async def analysis_year_over_year(request: Request, response: Response,
+                                  type: TransactionTypeEnum = TransactionTypeEnum.expense,
+                                  date_from: Optional[datetime.date] = None,
+                                  date_to: Optional[datetime.date] = None,
+                                  db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[YearOverYearOut]:
+    return await cached_analytics(request, response, db, current_user.id, "analysis_year_over_year",
+                                  lambda user_id: get_year_over_year(db, user_id, type=TransactionType(type.value),
+                                                                     date_from=date_from, date_to=date_to),
+                                  params=(type.value, date_from, date_to))
+
+@router.get("/analysis/percentiles", response_model=AmountPercentilesOut)
+async def analysis_percentiles(request: Request, response: Response,
+                               percentiles: str = "50,90,99",
+                               type: TransactionTypeEnum = TransactionTypeEnum.expense,
+                               date_from: Optional[datetime.date] = None,
+                               date_to: Optional[datetime.date] = None,
+                               db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> AmountPercentilesOut:
+    try:
+        quantiles = sorted({float(value) for value in percentiles.split(",") if value.strip()})
+    except ValueError:
+        quantiles = None
+    if not quantiles or not all(0 <= q <= 100 for q in quantiles):
+        raise HTTPException(status_code=400, detail="percentiles must be comma separated numbers between 0 and 100")
+    return await cached_analytics(request, response, db, current_user.id, "analysis_percentiles",
+                                  lambda user_id: get_percentiles(db, user_id, quantiles, type=TransactionType(type.value),
+                                                                  date_from=date_from, date_to=date_to),
+                                  params=(",".join(f"{q:g}" for q in quantiles), type.value, date_from, date_to))
+
+@router.get("/analysis/accounts", response_model=List[AccountFlowOut])
+async def analysis_accounts(request: Request, response: Response,
+                            date_from: Optional[datetime.date] = None,
+                            date_to: Optional[datetime.date] = None,
+                            db: AsyncSession = Depends(get_db), current_user: UserPrincipal = Depends(get_current_user)) -> List[AccountFlowOut]:
+    return await cached_analytics(request, response, db, current_user.id, "analysis_accounts",
+                                  lambda user_id: get_account_flows(db, user_id, date_from=date_from, date_to=date_to),
+                                  params=(date_from, date_to))
@@ -0,0 +1,66 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.core import security
+from app.api.auth import principal_cache
+from app.database import SessionLocal, partitions, pool_telemetry, replicas
+from app.core.cold_storage import cold_store
+from app.core.response_cache import analytics_cache
+from app.core.notifications import notification_broker
+from app.core.rate_limit import rate_limiter
+from app.crud.notifications import notification_retention
+from app.crud.outbox import outbox_drainer, outbox_stats
+
+
+async def require_internal_token(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not security.verify_internal_token(token):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/db/pool")
+async def db_pool_stats():
+    return {name: telemetry.snapshot() for name, telemetry in pool_telemetry.items()}
+
+
+@router.get("/db/replicas")
+async def db_replica_status():
+    return {"strategy": replicas.strategy, "replicas": replicas.status()}
+
+
+@router.get("/db/partitions")
+async def db_partition_status():
+    return {"last_run": partitions.last_run}
+
+
+@router.get("/db/cold-storage")
+async def cold_storage_stats():
+    return cold_store.stats()
+
+
+@router.get("/cache/auth")
+async def auth_cache_stats():
+    return principal_cache.stats()
+
+
+@router.get("/cache/analytics")
+async def analytics_cache_stats():
+    return analytics_cache.stats()
+
+
+@router.get("/notifications")
+async def notification_broker_stats():
+    return {**notification_broker.stats(), "retention": notification_retention.last_run}
+
+
+@router.get("/rate-limits")
+async def rate_limit_stats():
+    return rate_limiter.stats()
+
+
+@router.get("/outbox")
+def outbox_status():
+    with SessionLocal() as db:
+        return {**outbox_stats(db), "last_drain": outbox_drainer.last_run}
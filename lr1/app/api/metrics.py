@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.api.internal import require_internal_token
+from app.database import pool_telemetry
+from app.core.metrics import render_histograms
+from app.core.request_metrics import request_metrics
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    lines = request_metrics.render()
+    for name, attribute, help in (
+        ("db_pool_checkout_wait_seconds", "checkout_wait", "Time spent waiting for a pooled connection"),
+        ("db_pool_checkout_hold_seconds", "checkout_hold", "Time a connection stayed checked out"),
+    ):
+        lines.extend(render_histograms(name, help, {(("pool", pool),): getattr(telemetry, attribute)
+                                                    for pool, telemetry in pool_telemetry.items()}))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
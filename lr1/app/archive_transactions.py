@@ -0,0 +1,34 @@
+import argparse
+import datetime
+import json
+from app.database import SessionLocal
+from app.crud.archive import archive_transactions
+from app.core.cold_storage import COLD_STORAGE_DIR, COLD_STORAGE_HORIZON_MONTHS
+from app.core.partitions import add_months, month_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move transactions older than the horizon to compressed per-user monthly files")
+    parser.add_argument("--horizon-months", type=int, default=COLD_STORAGE_HORIZON_MONTHS,
+                        help="keep this many months (including the current one) in the database")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="only list the months that would be archived")
+    args = parser.parse_args()
+    if args.horizon_months < 1:
+        raise SystemExit("--horizon-months must be at least 1")
+    before = add_months(month_start(datetime.date.today()), 1 - args.horizon_months)
+    db = SessionLocal()
+    try:
+        archived = archive_transactions(db, before, user_id=args.user_id, dry_run=args.dry_run)
+    finally:
+        db.close()
+    for item in archived:
+        print(json.dumps(item))
+    total = sum(item["transactions"] for item in archived)
+    print(f"{total} transaction(s) in {len(archived)} month(s) before {before}"
+          f"{' would be archived' if args.dry_run else ' archived to ' + COLD_STORAGE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
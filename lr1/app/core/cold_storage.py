@@ -0,0 +1,89 @@
+import datetime
+import gzip
+import json
+import os
+import tempfile
+from typing import Optional
+from app.core.cache import TTLCache
+
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "cold_storage")
+COLD_STORAGE_HORIZON_MONTHS = int(os.getenv("COLD_STORAGE_HORIZON_MONTHS", "24"))
+COLD_STORAGE_CACHE_SIZE = int(os.getenv("COLD_STORAGE_CACHE_SIZE", "256"))
+
+TRANSACTION_COLUMNS = ("id", "account_id", "amount", "date", "description", "type")
+CATEGORY_COLUMNS = ("transaction_id", "category_id", "allocated_amount")
+
+
+class ColdStore:
+    # One gzip-compressed file per user and month, stored column by column so repeated values
+    # (account ids, types, dates) compress well. Files are never modified in place: a rewrite gets
+    # a new version and the archived_months row is switched to it in the same database commit.
+    def __init__(self, directory: str = COLD_STORAGE_DIR, cache_size: int = COLD_STORAGE_CACHE_SIZE):
+        self.directory = directory
+        self._cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+
+    def path(self, user_id: int, month: str, version: str) -> str:
+        return os.path.join(self.directory, str(user_id), f"{month}.{version}.json.gz")
+
+    def write(self, user_id: int, month: str, version: str, transactions: list) -> str:
+        # transactions: row dicts with TRANSACTION_COLUMNS and "categories": [(category_id, allocated_amount)]
+        transactions = sorted(transactions, key=lambda row: (row["date"], row["id"]), reverse=True)
+        data = {
+            "user_id": user_id,
+            "month": month,
+            "transactions": {column: [] for column in TRANSACTION_COLUMNS},
+            "categories": {column: [] for column in CATEGORY_COLUMNS},
+        }
+        for row in transactions:
+            for column in TRANSACTION_COLUMNS:
+                data["transactions"][column].append(row[column])
+            for category_id, allocated_amount in row["categories"]:
+                data["categories"]["transaction_id"].append(row["id"])
+                data["categories"]["category_id"].append(category_id)
+                data["categories"]["allocated_amount"].append(allocated_amount)
+        data["transactions"]["date"] = [date.toordinal() for date in data["transactions"]["date"]]
+        path = self.path(user_id, month, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(json.dumps(data, separators=(",", ":")).encode()))
+        os.replace(tmp_path, path)
+        return path
+
+    def read(self, user_id: int, month: str, version: str) -> list:
+        # Rows come back newest first, like the live transaction listings.
+        key = (user_id, month, version)
+        rows = self._cache.get(key)
+        if rows is not None:
+            return rows
+        with open(self.path(user_id, month, version), "rb") as f:
+            data = json.loads(gzip.decompress(f.read()))
+        categories = {}
+        columns = data["categories"]
+        for transaction_id, category_id, allocated_amount in zip(*(columns[column] for column in CATEGORY_COLUMNS)):
+            categories.setdefault(transaction_id, []).append((category_id, allocated_amount))
+        columns = data["transactions"]
+        rows = []
+        for values in zip(*(columns[column] for column in TRANSACTION_COLUMNS)):
+            row = dict(zip(TRANSACTION_COLUMNS, values))
+            row["date"] = datetime.date.fromordinal(row["date"])
+            row["user_id"] = user_id
+            row["categories"] = sorted(categories.get(row["id"], []))
+            rows.append(row)
+        self._cache.set(key, rows)
+        return rows
+
+    def remove(self, user_id: int, month: str, version: Optional[str]):
+        if version is None:
+            return
+        self._cache.invalidate((user_id, month, version))
+        try:
+            os.remove(self.path(user_id, month, version))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {"directory": self.directory, "cache": self._cache.stats()}
+
+
+cold_store = ColdStore()
@@ -0,0 +1,77 @@
+import bisect
+import itertools
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return self.buckets[index] if index < len(self.buckets) else self.max
+            return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+    def cumulative(self) -> tuple:
+        # Prometheus buckets count every observation up to and including their bound.
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        return list(zip(self.buckets, itertools.accumulate(counts))), count, total
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Iterable[Tuple[str, str]]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def render_histograms(name: str, help: str, series: Dict[tuple, Histogram]) -> List[str]:
+    # Prometheus text format; series maps a tuple of (label, value) pairs to its histogram.
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    for labels, histogram in series.items():
+        buckets, count, total = histogram.cumulative()
+        prefix = _label_text(labels)
+        separator = "," if prefix else ""
+        for bound, seen in buckets:
+            lines.append(f'{name}_bucket{{{prefix}{separator}le="{bound:g}"}} {seen}')
+        lines.append(f'{name}_bucket{{{prefix}{separator}le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{{{prefix}}} {total:.9g}" if prefix else f"{name}_sum {total:.9g}")
+        lines.append(f"{name}_count{{{prefix}}} {count}" if prefix else f"{name}_count {count}")
+    return lines
@@ -0,0 +1,289 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100"))
+NOTIFICATION_HEARTBEAT = float(os.getenv("NOTIFICATION_HEARTBEAT", "15"))
+NOTIFICATION_REPLAY_BATCH = int(os.getenv("NOTIFICATION_REPLAY_BATCH", "100"))
+NOTIFICATION_CHANNEL = os.getenv("NOTIFICATION_CHANNEL", "finance_notifications")
+
+
+def notification_event(notification) -> dict:
+    return {"id": notification.id, "user_id": notification.user_id, "title": notification.title,
+            "message": notification.message, "created_at": notification.created_at.isoformat()}
+
+
+# Sessions collect the events of the notifications they write; they are published when the
+# session commits and dropped on rollback, so subscribers never see rows that do not exist.
+def queue_notifications(session: Session, events: List[dict]):
+    session.info.setdefault("notification_events", []).extend(events)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session):
+    events = session.info.get("notification_events")
+    if events:
+        notification_broker.backend.prepare(session, events)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    events = session.info.pop("notification_events", None)
+    if events:
+        notification_broker.backend.deliver(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop("notification_events", None)
+
+
+class LocalBackend:
+    # Single process: committed events go straight to this process's broker.
+    def __init__(self):
+        self.broker = None
+
+    def prepare(self, session: Session, events: List[dict]):
+        pass
+
+    def deliver(self, events: List[dict]):
+        self.broker.dispatch_threadsafe(events)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class ListeningBackend(LocalBackend):
+    # Cross-worker backends run a listener task that feeds this worker's broker.
+    def __init__(self):
+        super().__init__()
+        self._task = None
+
+    def deliver(self, events: List[dict]):
+        pass
+
+    async def _listen(self):
+        raise NotImplementedError
+
+    async def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class RedisBackend(ListeningBackend):
+    # Every worker subscribes to one pub/sub channel; publishing happens after commit.
+    def __init__(self, url: str, channel: str = NOTIFICATION_CHANNEL):
+        super().__init__()
+        import redis
+        self.url = url
+        self.channel = channel
+        self.client = redis.Redis.from_url(url)
+
+    def deliver(self, events: List[dict]):
+        for item in events:
+            self.client.publish(self.channel, json.dumps(item))
+
+    async def _listen(self):
+        import redis.asyncio
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Anything sent while we were not listening is recovered from the database.
+                    self.broker.mark_all_lagged()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.broker.dispatch([json.loads(message["data"])])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Notification listener lost Redis: %s", e)
+            finally:
+                await client.aclose()
+            await asyncio.sleep(1)
+
+
+class PostgresBackend(ListeningBackend):
+    # NOTIFY is transactional: it is sent with the writing transaction's commit, from any process
+    # (API workers, the recurring scheduler, batch jobs), and every worker LISTENs on one connection.
+    def __init__(self, url: str, channel: str = NOTIFICATION_CHANNEL):
+        super().__init__()
+        self.url = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+
+    def prepare(self, session: Session, events: List[dict]):
+        for item in events:
+            session.execute(select(func.pg_notify(self.channel, json.dumps(item))))
+
+    async def _listen(self):
+        import asyncpg
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.url)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, lambda *args: self.broker.dispatch([json.loads(args[-1])]))
+                self.broker.mark_all_lagged()
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Notification listener lost PostgreSQL: %s", e)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(1)
+
+
+class Subscription:
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.lagged = False
+        self.overflows = 0
+
+    def offer(self, item: Optional[dict]):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A slow consumer does not get an ever growing buffer: its queue is dropped and the
+            # stream catches up from the database once the client reads again.
+            self.overflows += 1
+            self.lag()
+
+    def lag(self):
+        self.lagged = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class NotificationBroker:
+    # In-process fan-out of notification events to the SSE/WebSocket streams of this worker.
+    def __init__(self, backend, queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        self.backend = backend
+        self.backend.broker = self
+        self.queue_size = queue_size
+        self.subscribers: Dict[int, Set[Subscription]] = collections.defaultdict(set)
+        self.published = 0
+        self.overflows = 0
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start()
+
+    async def stop(self):
+        await self.backend.stop()
+        self._loop = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self.subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.user_id]
+        self.overflows += subscription.overflows
+
+    def dispatch(self, events: List[dict]):
+        for item in events:
+            self.published += 1
+            for subscription in list(self.subscribers.get(item["user_id"], ())):
+                subscription.offer(item)
+
+    def dispatch_threadsafe(self, events: List[dict]):
+        # Commits happen in worker threads and greenlets; the queues belong to the event loop.
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.dispatch, events)
+
+    def mark_all_lagged(self):
+        for subscribers in list(self.subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.lag()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "users": len(self.subscribers),
+            "subscriptions": sum(len(subscribers) for subscribers in self.subscribers.values()),
+            "published": self.published,
+            "overflows": self.overflows + sum(subscription.overflows for subscribers in self.subscribers.values()
+                                              for subscription in subscribers),
+        }
+
+    async def events(self, user_id: int, last_id: int, fetch: Callable[[int, int, int], Awaitable[list]],
+                     heartbeat: float = NOTIFICATION_HEARTBEAT):
+        # Yields the user's notifications after last_id: first from the database, then live. A
+        # lagged subscription goes back to the database from the last delivered id. None is a heartbeat.
+        subscription = self.subscribe(user_id)
+        recent = collections.deque(maxlen=self.queue_size * 4)
+        try:
+            catch_up = True
+            while True:
+                if catch_up:
+                    subscription.lagged = False
+                    while True:
+                        batch = await fetch(user_id, last_id, NOTIFICATION_REPLAY_BATCH)
+                        for item in batch:
+                            last_id = max(last_id, item["id"])
+                            recent.append(item["id"])
+                            yield item
+                        if len(batch) < NOTIFICATION_REPLAY_BATCH:
+                            break
+                    catch_up = False
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is None:
+                    catch_up = subscription.lagged
+                elif item["id"] > last_id or item["id"] not in recent:
+                    last_id = max(last_id, item["id"])
+                    recent.append(item["id"])
+                    yield item
+        finally:
+            self.unsubscribe(subscription)
+
+
+def build_backend(kind: str):
+    if kind == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if kind == "postgres":
+        return PostgresBackend(os.getenv("DATABASE_URL"))
+    if kind == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown notification backend: {kind}")
+
+
+notification_broker = NotificationBroker(build_backend(os.getenv("NOTIFICATION_BACKEND", "local")))
@@ -0,0 +1,197 @@
+import asyncio
+import datetime
+import logging
+import os
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# transactions is range partitioned by month on date, and transaction_categories follows it on
+# transaction_date, so a month of history lives in one pair of partitions that can be detached together.
+# Parents come before children when creating partitions and after them when detaching.
+PARTITIONED_TABLES = (("transactions", "date"), ("transaction_categories", "transaction_date"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+PARTITION_CHECK_INTERVAL = float(os.getenv("PARTITION_CHECK_INTERVAL", "21600"))
+PARTITION_NAME = re.compile(r"^(\w+)_(\d{4})_(\d{2})$")
+
+
+def month_start(date: datetime.date) -> datetime.date:
+    return date.replace(day=1)
+
+
+def add_months(date: datetime.date, months: int) -> datetime.date:
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'transactions' AND c.relnamespace = 'public'::regnamespace)"
+    )).scalar()
+
+
+def list_partitions(connection: Connection, table: str) -> dict:
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace"
+    ), {"table": table}).scalars()
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match and match.group(1) == table:
+            partitions[datetime.date(int(match.group(2)), int(match.group(3)), 1)] = name
+    return partitions
+
+
+def oldest_partition_month(connection: Connection) -> Optional[datetime.date]:
+    if not is_partitioned(connection):
+        return None
+    return min(list_partitions(connection, "transactions"), default=None)
+
+
+def _detach_default(connection: Connection):
+    for table, _ in reversed(PARTITIONED_TABLES):
+        name = f"{table}_default"
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        _drop_transaction_foreign_keys(connection, name)
+
+
+def _attach_default(connection: Connection):
+    for table, _ in PARTITIONED_TABLES:
+        connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT"))
+
+
+def _drop_transaction_foreign_keys(connection: Connection, name: str):
+    # A detached transaction_categories partition keeps its own copy of the foreign key to
+    # transactions, which would block detaching or moving the matching transactions rows next.
+    foreign_keys = connection.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f' "
+        "AND confrelid = CAST('transactions' AS regclass)"
+    ), {"name": name}).scalars().all()
+    for constraint in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+
+
+def create_month(connection: Connection, month: datetime.date) -> list:
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    # Rows for a month without a partition land in the default partition (backdated imports). A new
+    # partition cannot be created over them, so they are moved out while the default is detached.
+    moving = connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM transactions_default WHERE date >= :lower AND date < :upper)"
+    ), {"lower": lower, "upper": upper}).scalar()
+    if moving:
+        _detach_default(connection)
+    created = []
+    for table, column in PARTITIONED_TABLES:
+        name = partition_name(table, month)
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+        if moving:
+            connection.execute(text(
+                f"INSERT INTO {table} SELECT * FROM {table}_default WHERE {column} >= :lower AND {column} < :upper"
+            ), {"lower": lower, "upper": upper})
+        created.append(name)
+    if moving:
+        for table, column in reversed(PARTITIONED_TABLES):
+            connection.execute(text(f"DELETE FROM {table}_default WHERE {column} >= :lower AND {column} < :upper"),
+                               {"lower": lower, "upper": upper})
+        _attach_default(connection)
+    return created
+
+
+def ensure_partitions(connection: Connection, start: datetime.date, end: datetime.date) -> list:
+    created = []
+    existing = list_partitions(connection, "transactions")
+    month = month_start(start)
+    while month <= end:
+        if month not in existing:
+            created += create_month(connection, month)
+        month = add_months(month, 1)
+    return created
+
+
+def archive_partitions(connection: Connection, before: datetime.date, drop: bool = False) -> list:
+    archived = []
+    if not drop:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {PARTITION_ARCHIVE_SCHEMA}"))
+    for table, _ in reversed(PARTITIONED_TABLES):
+        for month, name in sorted(list_partitions(connection, table).items()):
+            if month >= before:
+                continue
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            _drop_transaction_foreign_keys(connection, name)
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {PARTITION_ARCHIVE_SCHEMA}"))
+            archived.append(name)
+    return archived
+
+
+def default_months(connection: Connection) -> list:
+    return connection.execute(text(
+        "SELECT DISTINCT CAST(date_trunc('month', date) AS date) FROM transactions_default ORDER BY 1"
+    )).scalars().all()
+
+
+def maintain(connection: Connection, today: datetime.date = None, months_ahead: int = None,
+             retention_months: int = None, drop: bool = False) -> dict:
+    if not is_partitioned(connection):
+        return {"created": [], "archived": []}
+    current = month_start(today or datetime.date.today())
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retention_months = PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    created = ensure_partitions(connection, current, add_months(current, months_ahead))
+    for month in default_months(connection):
+        created += create_month(connection, month)
+    archived = archive_partitions(connection, add_months(current, -retention_months), drop=drop) if retention_months else []
+    return {"created": created, "archived": archived}
+
+
+class PartitionMaintainer:
+    def __init__(self, engine: AsyncEngine, interval: float = PARTITION_CHECK_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.last_run = None
+        self._task = None
+
+    async def run(self) -> dict:
+        async with self.engine.begin() as connection:
+            result = await connection.run_sync(maintain)
+        self.last_run = {"at": datetime.datetime.utcnow().isoformat(), **result}
+        if result["created"] or result["archived"]:
+            logger.info("Partition maintenance: created %s, archived %s", result["created"], result["archived"])
+        return result
+
+    async def _monitor(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logger.warning("Partition maintenance failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.engine.dialect.name == "postgresql" and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,108 @@
+import time
+import threading
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.core.metrics import Histogram
+
+
+LIFETIME_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 7200, 21600, 86400)
+
+
+class PoolTelemetry:
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_wait = Histogram()
+        self.checkout_hold = Histogram()
+        self.connection_lifetime = Histogram(LIFETIME_BUCKETS)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def attach(self, sync_engine):
+        self.pool = sync_engine.pool
+        self.pool._telemetry = self
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        event.listen(sync_engine, "close", self._on_close)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, record):
+        record.info["connected_at"] = time.monotonic()
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, record, proxy):
+        record.info["checked_out_at"] = time.monotonic()
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.checkout_hold.observe(time.monotonic() - checked_out_at)
+
+    def _on_close(self, dbapi_connection, record):
+        connected_at = record.info.pop("connected_at", None)
+        if connected_at is not None:
+            self.connection_lifetime.observe(time.monotonic() - connected_at)
+
+    def _on_invalidate(self, dbapi_connection, record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        occupancy = {}
+        if isinstance(pool, QueuePool):
+            occupancy = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            }
+        return {
+            "name": self.name,
+            "pool": type(pool).__name__ if pool else None,
+            "occupancy": occupancy,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+            "checkout_hold_seconds": self.checkout_hold.snapshot(),
+            "connection_lifetime_seconds": self.connection_lifetime.snapshot(),
+        }
+
+
+class _TimedPoolMixin:
+    def _do_get(self):
+        telemetry = getattr(self, "_telemetry", None)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if telemetry:
+                with telemetry._lock:
+                    telemetry.timeouts += 1
+            raise
+        finally:
+            if telemetry:
+                telemetry.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._telemetry = getattr(self, "_telemetry", None)
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,254 @@
+import asyncio
+import itertools
+import json
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+from app.core import security
+
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# rate/burst: tokens per second and bucket size.
+RATE_LIMITS = os.getenv("RATE_LIMITS", "user=50/100,ip=100/200,auth_ip=2/10")
+RATE_LIMIT_CONCURRENCY = os.getenv("RATE_LIMIT_CONCURRENCY", "analytics=8,writes=32,auth=16")
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_EXEMPT = tuple(os.getenv("RATE_LIMIT_EXEMPT", "/internal,/metrics,/docs,/openapi.json,/redoc").split(","))
+ANALYTICS_PATHS = ("/finance/analysis/", "/finance/dashboard", "/finance/trends/", "/finance/forecast")
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, value = item.split("=")
+        rate, burst = value.split("/")
+        limits[name.strip()] = (float(rate), float(burst))
+    return limits
+
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    return {name.strip(): int(value) for name, value in
+            (item.split("=") for item in filter(None, (part.strip() for part in spec.split(","))))}
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    # Decided from the raw path, before routing, so a rejected request costs no more than this.
+    if path.startswith("/auth/"):
+        return "auth" if method == "POST" else None
+    if path.endswith("/projection") or path.startswith(ANALYTICS_PATHS):
+        return "analytics"
+    if method in WRITE_METHODS:
+        return "writes"
+    return None
+
+
+class MemoryBackend:
+    # Buckets of this process; the event loop is the only caller, so no lock is needed. The dict is
+    # kept in update order, so when it is full the buckets that have been idle longest go first and
+    # a client that keeps hitting its limit is never dropped in favour of new keys.
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state and can go.
+        full = [key for key, (tokens, updated, rate, burst) in self._buckets.items() if tokens + (now - updated) * rate >= burst]
+        for key in full:
+            del self._buckets[key]
+        # Then the least recently updated tenth, so a full dict is not rescanned for every new key.
+        excess = len(self._buckets) - self.max_keys + max(1, self.max_keys // 10)
+        for key in list(itertools.islice(self._buckets, max(0, excess))):
+            del self._buckets[key]
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        # Returns 0 when a token was taken, otherwise the seconds until one is available.
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            tokens = burst
+        else:
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, rate, burst)
+            return (1 - tokens) / rate
+        self._buckets[key] = (tokens - 1, now, rate, burst)
+        return 0.0
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class RedisBackend:
+    # Shared between workers and hosts; the refill and take happen atomically in one script.
+    SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = burst
+if bucket[1] then tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate) end
+local wait = 0
+if tokens < 1 then wait = (1 - tokens) / rate else tokens = tokens - 1 end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, url: str, prefix: str = "finance:ratelimit:"):
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        # now is the caller's wall clock; hosts sharing buckets are assumed to run NTP.
+        return float(await self._script(keys=[self.prefix + key], args=[rate, burst, now]))
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: Dict[str, Tuple[float, float]], concurrency: Dict[str, int],
+                 trust_forwarded: bool = RATE_LIMIT_TRUST_FORWARDED, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.backend = backend
+        self.limits = limits
+        self.concurrency = concurrency
+        self.trust_forwarded = trust_forwarded
+        self.max_keys = max_keys
+        self.active = {name: 0 for name in concurrency}
+        self.rejected = {}
+        self._tokens = {}
+        # The memory backend answers synchronously; only shared backends are awaited.
+        self._awaitable = asyncio.iscoroutinefunction(backend.take)
+
+    def user_id(self, token: str) -> Optional[int]:
+        # Verified tokens are remembered until they expire, so the HMAC runs once per token.
+        cached = self._tokens.get(token)
+        now = time.time()
+        if cached is not None and cached[1] >= now:
+            return cached[0]
+        payload = security.verify_jwt(token)
+        if payload is None or "user_id" not in payload:
+            return None
+        if len(self._tokens) >= self.max_keys:
+            # Expired tokens first, then the oldest entries; evicted tokens are only verified again.
+            expired = [key for key, (_, exp) in self._tokens.items() if exp < now]
+            excess = len(self._tokens) - len(expired) - self.max_keys + max(1, self.max_keys // 10)
+            for key in expired + list(itertools.islice(self._tokens, max(0, excess))):
+                self._tokens.pop(key, None)
+        self._tokens[token] = (payload["user_id"], payload.get("exp", now))
+        return payload["user_id"]
+
+    def client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _token(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                return token if scheme.lower() == "bearer" else None
+        query = scope.get("query_string", b"")
+        if b"access_token=" in query:
+            for part in query.decode("latin-1").split("&"):
+                if part.startswith("access_token="):
+                    return part[len("access_token="):]
+        return None
+
+    async def check(self, scope, route: Optional[str]) -> Tuple[Optional[str], float]:
+        # Returns (reason, retry_after) for a rejected request, or (None, 0).
+        now = time.time()
+        ip = self.client_ip(scope)
+        keys = []
+        if route == "auth" and "auth_ip" in self.limits:
+            keys.append(("auth_ip", "auth_ip:" + ip))
+        token = self._token(scope)
+        user_id = self.user_id(token) if token else None
+        # Authenticated requests are charged to both the user and the address they come from.
+        if user_id is not None and "user" in self.limits:
+            keys.append(("user", f"user:{user_id}"))
+        if "ip" in self.limits:
+            keys.append(("ip", "ip:" + ip))
+        for name, key in keys:
+            rate, burst = self.limits[name]
+            wait = self.backend.take(key, rate, burst, now)
+            if self._awaitable:
+                wait = await wait
+            if wait:
+                return name, wait
+        return None, 0.0
+
+    def acquire(self, route: Optional[str]) -> bool:
+        limit = self.concurrency.get(route)
+        if limit is None:
+            return True
+        if self.active[route] >= limit:
+            return False
+        self.active[route] += 1
+        return True
+
+    def release(self, route: Optional[str]):
+        if route in self.active:
+            self.active[route] -= 1
+
+    def reject(self, reason: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "buckets": self.backend.size(),
+            "limits": {name: {"rate": rate, "burst": burst} for name, (rate, burst) in self.limits.items()},
+            "concurrency": {name: {"limit": limit, "active": self.active[name]} for name, limit in self.concurrency.items()},
+            "rejected": dict(self.rejected),
+        }
+
+
+class RateLimitMiddleware:
+    # Plain ASGI middleware: no request object is built and the body is never touched, so an
+    # admitted request pays for a dict lookup or two and one bucket update per limit.
+    def __init__(self, app, limiter: RateLimiter = None, exempt: tuple = RATE_LIMIT_EXEMPT):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            return await self.app(scope, receive, send)
+        route = route_class(scope["method"], scope["path"])
+        reason, retry_after = await self.limiter.check(scope, route)
+        if reason is None and not self.limiter.acquire(route):
+            reason, retry_after = route, 1.0
+        if reason is not None:
+            self.limiter.reject(reason)
+            return await self._too_many(send, retry_after)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(route)
+
+    async def _too_many(self, send, retry_after: float):
+        body = json.dumps({"detail": "Too many requests, retry later"}).encode()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def build_backend(kind: str):
+    if kind == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+rate_limiter = RateLimiter(build_backend(os.getenv("RATE_LIMIT_BACKEND", "memory")),
+                           parse_limits(RATE_LIMITS), parse_concurrency(RATE_LIMIT_CONCURRENCY))
@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.last_check = None
+        self.last_error = None
+        self.selected = 0
+
+    @property
+    def sync_engine(self):
+        return self.engine.sync_engine
+
+    def load(self) -> int:
+        pool = self.sync_engine.pool
+        return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], strategy: str = "round_robin",
+                 check_interval: float = 5.0, check_timeout: float = 2.0):
+        if strategy not in ("round_robin", "least_loaded"):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._task = None
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_loaded":
+            replica = min(healthy, key=lambda candidate: (candidate.load(), candidate.selected))
+        else:
+            with self._lock:
+                replica = healthy[next(self._counter) % len(healthy)]
+        replica.selected += 1
+        return replica
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(text("SELECT 1")), self.check_timeout)
+        except Exception as e:
+            if replica.healthy:
+                logger.warning("Replica %s marked unhealthy: %s", replica.name, e)
+            replica.healthy, replica.last_error = False, repr(e)
+        else:
+            if not replica.healthy:
+                logger.info("Replica %s is healthy again", replica.name)
+            replica.healthy, replica.last_error = True, None
+        replica.last_check = time.time()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _monitor(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> list:
+        return [{
+            "name": replica.name,
+            "healthy": replica.healthy,
+            "last_check": replica.last_check,
+            "last_error": replica.last_error,
+            "selected": replica.selected,
+            "checked_out": replica.load(),
+        } for replica in self.replicas]
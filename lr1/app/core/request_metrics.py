@@ -0,0 +1,144 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Dict
+from sqlalchemy import event
+from app.core.metrics import Histogram, render_histograms
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "1") == "1"
+# Requests slower than this are logged with their SQL; 0 turns the log (and SQL capture) off.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50"))
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time", "rows", "sql")
+
+    def __init__(self, capture: bool = False):
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.sql = [] if capture else None
+
+
+# Set for the duration of a request. Sync sessions run in copies of the request's context
+# (threadpool, AsyncSession.run_sync), so their statements land in the same RequestStats.
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.statements += 1
+    stats.db_time += elapsed
+    # Driver-reported: rows returned by PostgreSQL drivers, affected rows for writes; SQLite reports none for SELECT.
+    stats.rows += max(cursor.rowcount, 0)
+    if stats.sql is not None and len(stats.sql) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.sql.append((elapsed, statement))
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestMetrics:
+    # One set of histograms per (method, route template, status class); templates keep the
+    # label set bounded no matter which ids are requested.
+    def __init__(self):
+        self.series: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _histograms(self, key: tuple) -> tuple:
+        histograms = self.series.get(key)
+        if histograms is None:
+            with self._lock:
+                histograms = self.series.setdefault(key, (
+                    Histogram(), Histogram(), Histogram(STATEMENT_BUCKETS), Histogram(ROW_BUCKETS), Histogram(BYTE_BUCKETS),
+                ))
+        return histograms
+
+    def observe(self, method: str, route: str, status: int, latency: float, stats: RequestStats, size: int):
+        key = (("method", method), ("route", route), ("status", f"{status // 100}xx"))
+        latency_histogram, db_histogram, statement_histogram, row_histogram, byte_histogram = self._histograms(key)
+        latency_histogram.observe(latency)
+        db_histogram.observe(stats.db_time)
+        statement_histogram.observe(stats.statements)
+        row_histogram.observe(stats.rows)
+        byte_histogram.observe(size)
+
+    def render(self) -> list:
+        series = list(self.series.items())
+        lines = []
+        for index, (name, help) in enumerate((
+            ("http_request_duration_seconds", "Request latency, from the first byte in to the last byte out"),
+            ("http_request_db_seconds", "Time spent executing SQL per request"),
+            ("http_request_sql_statements", "SQL statements executed per request"),
+            ("http_request_db_rows", "Rows returned or affected by the request's SQL"),
+            ("http_response_size_bytes", "Response body size"),
+        )):
+            lines.extend(render_histograms(name, help, {key: histograms[index] for key, histograms in series}))
+        return lines
+
+
+class RequestMetricsMiddleware:
+    # Plain ASGI middleware; the route template is read from the scope after routing has run.
+    def __init__(self, app, metrics: RequestMetrics = None, slow_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.metrics = metrics or request_metrics
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(capture=self.slow_seconds > 0)
+        token = _current.set(stats)
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.metrics.observe(scope["method"], template, status, latency, stats, size)
+            if self.slow_seconds and latency >= self.slow_seconds:
+                self._log_slow(scope["method"], template, status, latency, stats, size)
+
+    def _log_slow(self, method: str, route: str, status: int, latency: float, stats: RequestStats, size: int):
+        sql = "\n".join(f"  {elapsed * 1000:8.2f} ms  {' '.join(statement.split())}" for elapsed, statement in stats.sql)
+        omitted = stats.statements - len(stats.sql)
+        if omitted > 0:
+            sql += f"\n  ... {omitted} more statement(s)"
+        logger.warning("Slow request %s %s -> %s: %.1f ms, %d statement(s), %.1f ms in SQL, %d row(s), %d bytes\n%s",
+                       method, route, status, latency * 1000, stats.statements, stats.db_time * 1000, stats.rows, size, sql)
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+from app.core.cache import TTLCache
+
+# Misses this soon after an invalidation are computed on the primary: a replica may not have the
+# write yet, and the result would be cached under the new version.
+ANALYTICS_CACHE_PRIMARY_SECONDS = float(os.getenv("ANALYTICS_CACHE_PRIMARY_SECONDS", "30"))
+ENTITY_TAG = re.compile(r'[\s,]*((?:W/)?"[^"]*")[ \t]*(?=,|$)')
+
+
+def new_version() -> str:
+    # Milliseconds since the epoch when the version was minted, and a random suffix.
+    return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2) against each tag in the list; "*" matches any current representation.
+    if if_none_match.strip() == "*":
+        return True
+    opaque, position = etag.removeprefix("W/"), 0
+    while if_none_match[position:].strip(" \t,"):
+        match = ENTITY_TAG.match(if_none_match, position)
+        if match is None:
+            # A malformed list matches nothing, so the full response is sent.
+            return False
+        if match.group(1).removeprefix("W/") == opaque:
+            return True
+        position = match.end()
+    return False
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Least recently used versions are evicted; an evicted version is minted afresh on its next
+        # read, which only turns the entries stored under the old one into misses.
+        self._versions = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self._cache.set(key, value, expires_at=time.time() + ttl)
+
+    def get_version(self, key: str) -> str:
+        version = self._versions.get(key)
+        if version is None:
+            version = new_version()
+            self._versions.set(key, version)
+        return version
+
+    def set_version(self, key: str, version: str):
+        self._versions.set(key, version)
+
+
+class FileBackend:
+    # Shared between workers on one host: every entry is a small JSON file, replaced atomically.
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _read(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, entry: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._read(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: str, ttl: float):
+        self._write(key, {"value": value, "expires_at": time.time() + ttl})
+
+    def get_version(self, key: str) -> str:
+        entry = self._read("version:" + key)
+        return entry["value"] if entry else "0"
+
+    def set_version(self, key: str, version: str):
+        self._write("version:" + key, {"value": version, "expires_at": float("inf")})
+
+
+class RedisBackend:
+    def __init__(self, url: str, prefix: str = "finance:"):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def get_version(self, key: str) -> str:
+        return self.client.get(self.prefix + "version:" + key) or "0"
+
+    def set_version(self, key: str, version: str):
+        self.client.set(self.prefix + "version:" + key, version)
+
+
+class ResponseCache:
+    # Entries are keyed by the versions of the data they depend on. A write bumps the
+    # version of what it touched, so dependent entries stop matching and simply age out.
+    def __init__(self, backend, ttl: float = 300.0, dependencies: Dict[str, Iterable[str]] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.dependencies = {name: tuple(tags) for name, tags in (dependencies or {}).items()}
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    def key(self, user_id: int, name: str, *params) -> str:
+        versions = [self.backend.get_version("global:*")]
+        for tag in self.dependencies.get(name, ()):
+            versions.append(self.backend.get_version(f"global:{tag}"))
+            versions.append(self.backend.get_version(f"{user_id}:{tag}"))
+        return ":".join([str(user_id), name, *map(str, params), ".".join(versions)])
+
+    def etag(self, key: str) -> str:
+        return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    def invalidated_at(self, key: str) -> float:
+        # When the newest of the key's versions was minted; 0 if none was ever invalidated.
+        versions = key.rsplit(":", 1)[1].split(".")
+        return max(int(version.split("-")[0]) if "-" in version else 0 for version in versions) / 1000
+
+    def record(self, name: str, hit: bool):
+        with self._lock:
+            counter = self.hits if hit else self.misses
+            counter[name] = counter.get(name, 0) + 1
+
+    def get(self, key: str, name: str) -> Optional[Any]:
+        raw = self.backend.get(key)
+        self.record(name, raw is not None)
+        return json.loads(raw) if raw is not None else None
+
+    def store(self, key: str, value: Any):
+        self.backend.set(key, json.dumps(value), self.ttl)
+
+    def invalidate(self, user_id: Optional[int], *tags: str):
+        scope = user_id if user_id is not None else "global"
+        for tag in tags:
+            self.backend.set_version(f"{scope}:{tag}", new_version())
+
+    def invalidate_all(self):
+        self.backend.set_version("global:*", new_version())
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = set(self.hits) | set(self.misses)
+            per_name = {}
+            for name in names:
+                hits, misses = self.hits.get(name, 0), self.misses.get(name, 0)
+                per_name[name] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "endpoints": per_name,
+        }
+
+
+def build_backend(kind: str):
+    if kind == "file":
+        return FileBackend(os.getenv("ANALYTICS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "finance-analytics-cache")))
+    if kind == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if kind == "memory":
+        return MemoryBackend(maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "10000")),
+                             ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "300")))
+    raise ValueError(f"Unknown analytics cache backend: {kind}")
+
+
+analytics_cache = ResponseCache(
+    build_backend(os.getenv("ANALYTICS_CACHE_BACKEND", "memory")),
+    ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "300")),
+    dependencies={
+        "expense_analysis": ("transactions", "categories"),
+        "dashboard": ("transactions",),
+        "spending_trends": ("transactions",),
+        "analysis_series": ("transactions",),
+        "analysis_year_over_year": ("transactions",),
+        "analysis_percentiles": ("transactions", "categories"),
+        "analysis_accounts": ("transactions", "accounts"),
+    },
+)
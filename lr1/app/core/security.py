@@ -1,8 +1,13 @@
+import asyncio
 import base64
 import json
 import hmac
 import hashlib
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
 
 
@@ -10,6 +15,25 @@ SECRET_KEY = "blablabla2281337"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_SECONDS = 3600
 
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "scrypt")
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.getenv("PBKDF2_ITERATIONS", "600000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+SALT_BYTES = 16
+KEY_BYTES = 32
+# Bearer token for /internal and /metrics; the endpoints are not mounted while it is unset.
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN", "")
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    id: int
+    username: str
+    email: str
+
 
 def generate_jwt(data: Dict[str, Any], expire: int = ACCESS_TOKEN_EXPIRE_SECONDS) -> str:
     header = {"alg": ALGORITHM, "typ": "JWT"}
@@ -50,9 +74,82 @@ def verify_jwt(token: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+def verify_internal_token(token: str) -> bool:
+    return bool(INTERNAL_TOKEN) and hmac.compare_digest(token.encode(), INTERNAL_TOKEN.encode())
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=KEY_BYTES)
+
+
+def hash_password(password: str, scheme: str = None, cost: Optional[Dict[str, int]] = None) -> str:
+    scheme = scheme or PASSWORD_HASH_SCHEME
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        cost = cost or {"n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P}
+        digest = _scrypt(password, salt, cost["n"], cost["r"], cost["p"])
+        return f"scrypt${cost['n']}${cost['r']}${cost['p']}${_b64(salt)}${_b64(digest)}"
+    if scheme == "pbkdf2_sha256":
+        iterations = (cost or {}).get("iterations", PBKDF2_ITERATIONS)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+        return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == hashed
+    parts = hashed.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            expected = _scrypt(password, _unb64(parts[4]), n, r, p)
+            return hmac.compare_digest(expected, _unb64(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            expected = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(parts[2]), int(parts[1]), dklen=KEY_BYTES)
+            return hmac.compare_digest(expected, _unb64(parts[3]))
+    except ValueError:
+        return False
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    parts = hashed.split("$")
+    if parts[0] != PASSWORD_HASH_SCHEME:
+        return True
+    if parts[0] == "scrypt":
+        return parts[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return parts[1] != str(PBKDF2_ITERATIONS)
+
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+async def _run_password_job(func, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        return await asyncio.wrap_future(_hash_executor.submit(func, *args))
+    finally:
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_password_job(verify_password, password, hashed)
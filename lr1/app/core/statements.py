@@ -0,0 +1,57 @@
+import csv
+import datetime
+import io
+import re
+from typing import Any, Dict, List, Optional
+
+
+OFX_TRANSACTION_RE = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+OFX_FIELD_RE = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def _signed_row(amount: float, type_: Optional[str]) -> Dict[str, Any]:
+    if type_:
+        return {"amount": amount, "type": type_.strip().lower()}
+    return {"amount": abs(amount), "type": "income" if amount >= 0 else "expense"}
+
+
+def parse_csv(text: str, account_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    rows = []
+    for line in csv.DictReader(io.StringIO(text)):
+        line = {key.strip().lower(): (value or "").strip() for key, value in line.items() if key}
+        try:
+            row = _signed_row(float(line.get("amount", "")), line.get("type"))
+        except ValueError:
+            rows.append(line)
+            continue
+        row["account_id"] = line.get("account_id") or account_id
+        row["date"] = line.get("date") or None
+        row["description"] = line.get("description") or None
+        if line.get("category_id"):
+            allocated = line.get("allocated_amount") or row["amount"]
+            row["categories"] = [{"category_id": line["category_id"], "allocated_amount": allocated}]
+        rows.append(row)
+    return rows
+
+
+def parse_ofx(text: str, account_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    rows = []
+    for block in OFX_TRANSACTION_RE.findall(text):
+        fields = {key.upper(): value.strip() for key, value in OFX_FIELD_RE.findall(block)}
+        posted = fields.get("DTPOSTED", "")[:8]
+        try:
+            row = _signed_row(float(fields.get("TRNAMT", "")), None)
+            row["date"] = datetime.datetime.strptime(posted, "%Y%m%d").date() if posted else None
+        except ValueError:
+            rows.append(fields)
+            continue
+        row["account_id"] = account_id
+        row["description"] = fields.get("NAME") or fields.get("MEMO") or None
+        rows.append(row)
+    return rows
+
+
+def parse_statement(text: str, filename: str = "", account_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    if filename.lower().endswith((".ofx", ".qfx")) or "<OFX>" in text[:4096].upper():
+        return parse_ofx(text, account_id)
+    return parse_csv(text, account_id)
@@ -0,0 +1,203 @@
+import datetime
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import (
+    Account, AccountPeriodTotal, ArchivedMonth, Category, CategoryPeriodTotal, Transaction, TransactionCategory, TransactionType
+)
+from app.core.cold_storage import cold_store
+from app.core.response_cache import analytics_cache
+from app.core.partitions import oldest_partition_month
+
+
+def month_key(date: datetime.date) -> str:
+    return date.strftime("%Y-%m")
+
+
+def signed_amount(amount: float, type: TransactionType) -> float:
+    return amount if TransactionType(type) == TransactionType.income else -amount
+
+
+def dialect_insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def new_deltas() -> dict:
+    # accounts: {(account_id, month, type): [amount, count]}, categories: {(category_id, month): [amount, count]}
+    return {"accounts": {}, "categories": {}}
+
+
+def add_delta(deltas: dict, account_id: int, date: datetime.date, type: TransactionType, amount: float,
+              sign: int = 1, categories: list = ()):
+    month = month_key(date)
+    type = TransactionType(type)
+    entry = deltas["accounts"].setdefault((account_id, month, type), [0.0, 0])
+    entry[0] += sign * amount
+    entry[1] += sign
+    if type == TransactionType.expense:
+        for category_id, allocated_amount in categories:
+            entry = deltas["categories"].setdefault((category_id, month), [0.0, 0])
+            entry[0] += sign * allocated_amount
+            entry[1] += sign
+
+
+def apply_deltas(db: Session, user_id: int, deltas: dict):
+    upsert = dialect_insert(db)
+    balances = defaultdict(float)
+    for (account_id, month, type), (amount, count) in deltas["accounts"].items():
+        if not amount and not count:
+            continue
+        balances[account_id] += signed_amount(amount, type)
+        stmt = upsert(AccountPeriodTotal).values(
+            account_id=account_id, month=month, type=type, user_id=user_id, total=amount, count=count
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[AccountPeriodTotal.account_id, AccountPeriodTotal.month, AccountPeriodTotal.type],
+            set_={"total": AccountPeriodTotal.total + amount, "count": AccountPeriodTotal.count + count}
+        ))
+    for (category_id, month), (amount, count) in deltas["categories"].items():
+        if not amount and not count:
+            continue
+        stmt = upsert(CategoryPeriodTotal).values(
+            user_id=user_id, category_id=category_id, month=month, total=amount, count=count
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[CategoryPeriodTotal.user_id, CategoryPeriodTotal.category_id, CategoryPeriodTotal.month],
+            set_={"total": CategoryPeriodTotal.total + amount, "count": CategoryPeriodTotal.count + count}
+        ))
+    for account_id, amount in balances.items():
+        if amount:
+            db.query(Account).filter(Account.id == account_id)\
+                .update({Account.balance: func.coalesce(Account.balance, 0.0) + amount}, synchronize_session="fetch")
+
+
+def apply_transaction(db: Session, db_transaction: Transaction, sign: int = 1, categories: list = None):
+    if categories is None:
+        categories = [(tc.category_id, tc.allocated_amount) for tc in db_transaction.transaction_categories]
+    deltas = new_deltas()
+    add_delta(deltas, db_transaction.account_id, db_transaction.date, db_transaction.type, db_transaction.amount,
+              sign, categories)
+    apply_deltas(db, db_transaction.user_id, deltas)
+
+
+def get_period_totals(db: Session, user_id: int, account_id: int = None, month: str = None):
+    # Rows whose transactions were all moved or deleted stay behind at zero; they are not reported.
+    query = db.query(AccountPeriodTotal).filter(AccountPeriodTotal.user_id == user_id, AccountPeriodTotal.count > 0)
+    if account_id:
+        query = query.filter(AccountPeriodTotal.account_id == account_id)
+    if month:
+        query = query.filter(AccountPeriodTotal.month == month)
+    return query.order_by(AccountPeriodTotal.month, AccountPeriodTotal.account_id).all()
+
+
+def _raw_totals(db: Session, user_id: int = None):
+    accounts, categories = {}, {}
+    query = db.query(Transaction.user_id, Transaction.account_id, Transaction.date, Transaction.type, Transaction.amount)
+    if user_id:
+        query = query.filter(Transaction.user_id == user_id)
+    for row_user_id, account_id, date, type, amount in query.yield_per(10000):
+        entry = accounts.setdefault((account_id, month_key(date), TransactionType(type)), [row_user_id, 0.0, 0])
+        entry[1] += amount
+        entry[2] += 1
+    query = db.query(Transaction.user_id, TransactionCategory.category_id, Transaction.date, TransactionCategory.allocated_amount)\
+        .join(TransactionCategory, TransactionCategory.transaction_id == Transaction.id)\
+        .filter(Transaction.type == TransactionType.expense)
+    if user_id:
+        query = query.filter(Transaction.user_id == user_id)
+    for row_user_id, category_id, date, amount in query.yield_per(10000):
+        entry = categories.setdefault((row_user_id, category_id, month_key(date)), [row_user_id, 0.0, 0])
+        entry[1] += amount
+        entry[2] += 1
+    _add_cold_totals(db, accounts, categories, user_id)
+    return accounts, categories
+
+
+def _add_cold_totals(db: Session, accounts: dict, categories: dict, user_id: int = None):
+    # Rows moved to cold storage still count towards their months' rollups.
+    query = db.query(ArchivedMonth.user_id, ArchivedMonth.month, ArchivedMonth.version)
+    if user_id:
+        query = query.filter(ArchivedMonth.user_id == user_id)
+    known_categories = None
+    for row_user_id, month, version in query.all():
+        if known_categories is None:
+            known_categories = {row[0] for row in db.query(Category.id)}
+        for row in cold_store.read(row_user_id, month, version):
+            type = TransactionType(row["type"])
+            entry = accounts.setdefault((row["account_id"], month, type), [row_user_id, 0.0, 0])
+            entry[1] += row["amount"]
+            entry[2] += 1
+            if type != TransactionType.expense:
+                continue
+            for category_id, allocated_amount in row["categories"]:
+                if category_id in known_categories:
+                    entry = categories.setdefault((row_user_id, category_id, month), [row_user_id, 0.0, 0])
+                    entry[1] += allocated_amount
+                    entry[2] += 1
+
+
+def _reconcile_table(db: Session, model, key_columns: tuple, expected: dict, user_id: int, fix: bool, tolerance: float):
+    drift = []
+    query = db.query(model)
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+    stored = {tuple(getattr(row, column) for column in key_columns): row for row in query}
+    for key in expected.keys() | stored.keys():
+        row_user_id, total, count = expected.get(key, (None, 0.0, 0))
+        row = stored.get(key)
+        if row is not None and abs(row.total - total) <= tolerance and row.count == count:
+            continue
+        drift.append({
+            "kind": model.__tablename__,
+            **{column: value.value if hasattr(value, "value") else value for column, value in zip(key_columns, key)},
+            "stored": row.total if row else None, "expected": total,
+        })
+        if fix and row is None:
+            db.add(model(**{"user_id": row_user_id, **dict(zip(key_columns, key))}, total=total, count=count))
+        elif fix and count == 0:
+            db.delete(row)
+        elif fix:
+            row.total, row.count = total, count
+    return drift
+
+
+def _keep_archived(db: Session, model, key_columns: tuple, expected: dict, user_id: int, cutoff: str):
+    # Months older than the oldest attached partition were archived, so their raw rows are gone
+    # and the stored rollups are the only record left; take them as the expected values.
+    month_index = key_columns.index("month")
+    for key in [key for key in expected if key[month_index] < cutoff]:
+        del expected[key]
+    query = db.query(model).filter(model.month < cutoff)
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+    for row in query:
+        expected[tuple(getattr(row, column) for column in key_columns)] = (row.user_id, row.total, row.count)
+
+
+def reconcile(db: Session, user_id: int = None, fix: bool = False, tolerance: float = 1e-6):
+    expected_accounts, expected_categories = _raw_totals(db, user_id)
+    cutoff = oldest_partition_month(db.connection())
+    if cutoff:
+        _keep_archived(db, AccountPeriodTotal, ("account_id", "month", "type"), expected_accounts, user_id, month_key(cutoff))
+        _keep_archived(db, CategoryPeriodTotal, ("user_id", "category_id", "month"), expected_categories, user_id, month_key(cutoff))
+    drift = _reconcile_table(db, AccountPeriodTotal, ("account_id", "month", "type"), expected_accounts,
+                             user_id, fix, tolerance)
+    drift += _reconcile_table(db, CategoryPeriodTotal, ("user_id", "category_id", "month"), expected_categories,
+                              user_id, fix, tolerance)
+
+    net = defaultdict(float)
+    for (account_id, _, type), (_, total, _) in expected_accounts.items():
+        net[account_id] += signed_amount(total, type)
+    accounts_query = db.query(Account)
+    if user_id:
+        accounts_query = accounts_query.filter(Account.user_id == user_id)
+    for account in accounts_query:
+        balance = (account.opening_balance or 0.0) + net[account.id]
+        if abs((account.balance or 0.0) - balance) > tolerance:
+            drift.append({"kind": "balance", "account_id": account.id, "stored": account.balance, "expected": balance})
+            if fix:
+                account.balance = balance
+    if fix:
+        db.commit()
+        analytics_cache.invalidate_all()
+    return drift
@@ -0,0 +1,174 @@
+import datetime
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from app.models import Account, Category, Transaction, TransactionCategory, TransactionType
+from app.crud.archive import iter_archived_transactions
+
+GRANULARITIES = ("day", "week", "month")
+# numpy counts days from 1970-01-01, a Thursday; shifting by three days makes weeks start on Monday.
+WEEK_SHIFT = 3
+
+
+class TransactionFrame:
+    # A user's transaction slice as parallel arrays: one entry per transaction, and one entry
+    # per category allocation. Built from one query per table plus the archived months in range.
+    def __init__(self, account_id, date, amount, expense, category_id, category_date, allocated, category_expense):
+        self.account_id = account_id
+        self.date = date
+        self.amount = amount
+        self.expense = expense
+        self.category_id = category_id
+        self.category_date = category_date
+        self.allocated = allocated
+        self.category_expense = category_expense
+
+    def __len__(self):
+        return len(self.amount)
+
+
+def _bounds(query, column, date_from: datetime.date = None, date_to: datetime.date = None):
+    if date_from:
+        query = query.where(column >= date_from)
+    if date_to:
+        query = query.where(column <= date_to)
+    return query
+
+
+def load_frame(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None) -> TransactionFrame:
+    transactions = db.execute(_bounds(
+        select(Transaction.account_id, Transaction.date, Transaction.amount, Transaction.type == TransactionType.expense)
+        .where(Transaction.user_id == user_id), Transaction.date, date_from, date_to)).all()
+    categories = db.execute(_bounds(
+        select(TransactionCategory.category_id, TransactionCategory.transaction_date, TransactionCategory.allocated_amount,
+               Transaction.type == TransactionType.expense)
+        .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                Transaction.date == TransactionCategory.transaction_date))
+        .where(Transaction.user_id == user_id), TransactionCategory.transaction_date, date_from, date_to)).all()
+    for row in iter_archived_transactions(db, user_id, date_from=date_from, date_to=date_to):
+        expense = row["type"] == TransactionType.expense.value
+        transactions.append((row["account_id"], row["date"], row["amount"], expense))
+        categories.extend((category_id, row["date"], allocated_amount, expense)
+                          for category_id, allocated_amount in row["categories"])
+    account_id, date, amount, expense = zip(*transactions) if transactions else ((), (), (), ())
+    category_id, category_date, allocated, category_expense = zip(*categories) if categories else ((), (), (), ())
+    return TransactionFrame(
+        np.array(account_id, dtype=np.int64), np.array(date, dtype="datetime64[D]"), np.array(amount, dtype=np.float64),
+        np.array(expense, dtype=bool), np.array(category_id, dtype=np.int64), np.array(category_date, dtype="datetime64[D]"),
+        np.array(allocated, dtype=np.float64), np.array(category_expense, dtype=bool),
+    )
+
+
+def period_index(dates: np.ndarray, granularity: str) -> np.ndarray:
+    if granularity == "month":
+        return dates.astype("datetime64[M]").astype(np.int64)
+    days = dates.astype(np.int64)
+    return (days + WEEK_SHIFT) // 7 if granularity == "week" else days
+
+
+def _period_labels(first: int, count: int, granularity: str) -> list:
+    index = np.arange(first, first + count)
+    if granularity == "month":
+        return np.datetime_as_string(index.astype("datetime64[M]")).tolist()
+    if granularity == "week":
+        index = index * 7 - WEEK_SHIFT
+    return np.datetime_as_string(index.astype("datetime64[D]")).tolist()
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Trailing mean; the first window-1 points average over what is available.
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def _type_mask(frame: TransactionFrame, type: TransactionType) -> np.ndarray:
+    return frame.expense if type == TransactionType.expense else ~frame.expense
+
+
+def period_totals(frame: TransactionFrame, granularity: str, type: TransactionType,
+                  date_from: datetime.date = None, date_to: datetime.date = None) -> tuple:
+    # Totals and counts for every period from the first to the last one, empty periods included.
+    mask = _type_mask(frame, type)
+    periods = period_index(frame.date[mask], granularity)
+    edges = [period_index(np.array([day], dtype="datetime64[D]"), granularity)[0] if day else None for day in (date_from, date_to)]
+    if not periods.size and None in edges:
+        return 0, np.zeros(0), np.zeros(0, dtype=np.int64)
+    first = edges[0] if edges[0] is not None else periods.min()
+    last = edges[1] if edges[1] is not None else periods.max()
+    length = max(int(last - first + 1), 0)
+    totals = np.bincount(periods - first, weights=frame.amount[mask], minlength=length)[:length]
+    counts = np.bincount(periods - first, minlength=length)[:length]
+    return int(first), totals, counts
+
+
+def get_series(db: Session, user_id: int, granularity: str = "month", type: TransactionType = TransactionType.expense,
+               window: int = 3, date_from: datetime.date = None, date_to: datetime.date = None) -> list:
+    frame = load_frame(db, user_id, date_from, date_to)
+    first, totals, counts = period_totals(frame, granularity, type, date_from, date_to)
+    rolling = rolling_mean(totals, window) if len(totals) else totals
+    return [{"period": period, "total": total, "count": count, "rolling_average": average}
+            for period, total, count, average in zip(_period_labels(first, len(totals), granularity),
+                                                     totals.tolist(), counts.tolist(), rolling.tolist())]
+
+
+def get_year_over_year(db: Session, user_id: int, type: TransactionType = TransactionType.expense,
+                       date_from: datetime.date = None, date_to: datetime.date = None) -> list:
+    # Months are compared with the same month a year earlier, so the fetch starts twelve months early.
+    load_from = date_from.replace(day=1, year=date_from.year - 1) if date_from else None
+    frame = load_frame(db, user_id, load_from, date_to)
+    first, totals, _ = period_totals(frame, "month", type, load_from, date_to)
+    previous = np.concatenate([np.full(min(12, len(totals)), np.nan), totals[:-12]])
+    start = 12 if date_from else 0
+    change = totals - previous
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(previous > 0, change / previous * 100, np.nan)
+    labels = _period_labels(first, len(totals), "month")
+    return [{
+        "month": labels[index], "total": float(totals[index]),
+        "previous_year_total": None if np.isnan(previous[index]) else float(previous[index]),
+        "change": None if np.isnan(change[index]) else float(change[index]),
+        "change_pct": None if np.isnan(change_pct[index]) else float(change_pct[index]),
+    } for index in range(start, len(totals))]
+
+
+def percentile_summary(values: np.ndarray, quantiles: list) -> dict:
+    points = np.percentile(values, quantiles).tolist() if values.size else [None] * len(quantiles)
+    return {"count": int(values.size), "percentiles": {f"p{q:g}": point for q, point in zip(quantiles, points)}}
+
+
+def category_percentiles(frame: TransactionFrame, quantiles: list, type: TransactionType = TransactionType.expense) -> dict:
+    mask = frame.category_expense if type == TransactionType.expense else ~frame.category_expense
+    category_ids, allocated = frame.category_id[mask], frame.allocated[mask]
+    order = np.argsort(category_ids, kind="stable")
+    ids, starts = np.unique(category_ids[order], return_index=True)
+    return {category_id: percentile_summary(values, quantiles)
+            for category_id, values in zip(ids.tolist(), np.split(allocated[order], starts[1:]))}
+
+
+def account_totals(frame: TransactionFrame) -> tuple:
+    ids, index = np.unique(frame.account_id, return_inverse=True)
+    income = np.bincount(index, weights=np.where(frame.expense, 0.0, frame.amount), minlength=len(ids))
+    expense = np.bincount(index, weights=np.where(frame.expense, frame.amount, 0.0), minlength=len(ids))
+    return ids, income, expense, np.bincount(index, minlength=len(ids))
+
+
+def get_percentiles(db: Session, user_id: int, quantiles: list, type: TransactionType = TransactionType.expense,
+                    date_from: datetime.date = None, date_to: datetime.date = None) -> dict:
+    frame = load_frame(db, user_id, date_from, date_to)
+    summaries = category_percentiles(frame, quantiles, type)
+    names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(summaries))) if summaries else {}
+    return {
+        "overall": percentile_summary(frame.amount[_type_mask(frame, type)], quantiles),
+        "categories": [{"category": names[category_id], **summary}
+                       for category_id, summary in summaries.items() if category_id in names],
+    }
+
+
+def get_account_flows(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None) -> list:
+    ids, income, expense, counts = account_totals(load_frame(db, user_id, date_from, date_to))
+    names = dict(db.query(Account.id, Account.name).filter(Account.user_id == user_id))
+    return [{"account_id": account_id, "name": names[account_id], "income": account_income, "expense": account_expense,
+             "net": account_income - account_expense, "count": count}
+            for account_id, account_income, account_expense, count in zip(ids.tolist(), income.tolist(), expense.tolist(), counts.tolist())
+            if account_id in names]
@@ -0,0 +1,161 @@
+import datetime
+import itertools
+import uuid
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from app.models import ArchivedMonth, Transaction, TransactionCategory, TransactionType
+from app.crud.aggregates import month_key
+from app.core.cold_storage import cold_store
+from app.core.partitions import add_months, month_start
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def month_bounds(month: str) -> tuple:
+    start = datetime.date.fromisoformat(month + "-01")
+    return start, add_months(start, 1) - datetime.timedelta(days=1)
+
+
+def archived_months(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None) -> list:
+    query = db.query(ArchivedMonth.month, ArchivedMonth.version).filter(ArchivedMonth.user_id == user_id)
+    if date_from:
+        query = query.filter(ArchivedMonth.month >= month_key(date_from))
+    if date_to:
+        query = query.filter(ArchivedMonth.month <= month_key(date_to))
+    return query.order_by(ArchivedMonth.month.desc()).all()
+
+
+def archived_month_rows(user_id: int, month: str, version: str, after: tuple = None, date_from: datetime.date = None,
+                        date_to: datetime.date = None, account_id: int = None, type: TransactionType = None,
+                        category_id: int = None):
+    for row in cold_store.read(user_id, month, version):
+        if date_from and row["date"] < date_from or date_to and row["date"] > date_to:
+            continue
+        if after and (row["date"], row["id"]) >= after:
+            continue
+        if account_id and row["account_id"] != account_id or type and row["type"] != TransactionType(type).value:
+            continue
+        if category_id and all(category != category_id for category, _ in row["categories"]):
+            continue
+        yield row
+
+
+def iter_archived_transactions(db: Session, user_id: int, after: tuple = None, date_from: datetime.date = None,
+                               date_to: datetime.date = None, **filters):
+    # Same filters and (date, id) descending order as the live listing, so both can be merged.
+    if after:
+        date_to = min(date_to, after[0]) if date_to else after[0]
+    for month, version in archived_months(db, user_id, date_from, date_to):
+        yield from archived_month_rows(user_id, month, version, after=after, date_from=date_from, date_to=date_to, **filters)
+
+
+def get_archived_transactions(db: Session, user_id: int, after: tuple = None, limit: int = None, **filters) -> list:
+    return list(itertools.islice(iter_archived_transactions(db, user_id, after=after, **filters), limit))
+
+
+def _live_month(db: Session, user_id: int, start: datetime.date, end: datetime.date) -> list:
+    transactions = db.query(Transaction.id, Transaction.account_id, Transaction.amount, Transaction.date,
+                            Transaction.description, Transaction.type)\
+                     .filter(Transaction.user_id == user_id, Transaction.date.between(start, end)).all()
+    categories = {}
+    query = db.query(TransactionCategory.transaction_id, TransactionCategory.category_id, TransactionCategory.allocated_amount)\
+              .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                      Transaction.date == TransactionCategory.transaction_date))\
+              .filter(Transaction.user_id == user_id, TransactionCategory.transaction_date.between(start, end))
+    for transaction_id, category_id, allocated_amount in query:
+        categories.setdefault(transaction_id, []).append((category_id, allocated_amount))
+    return [{
+        "id": id, "account_id": account_id, "amount": amount, "date": date, "description": description,
+        "type": TransactionType(type).value, "categories": categories.get(id, []),
+    } for id, account_id, amount, date, description, type in transactions]
+
+
+def _replace_month(db: Session, user_id: int, month: str, rows: list, archived: ArchivedMonth = None):
+    # Writes a new version of the month file and points archived_months at it. The caller commits
+    # and then removes the previous version; until then readers keep using the old file.
+    if not rows:
+        if archived is not None:
+            db.delete(archived)
+        return None
+    version = uuid.uuid4().hex[:12]
+    cold_store.write(user_id, month, version, rows)
+    if archived is None:
+        db.add(ArchivedMonth(user_id=user_id, month=month, version=version, transaction_count=len(rows)))
+    else:
+        archived.version, archived.transaction_count = version, len(rows)
+        archived.archived_at = datetime.datetime.utcnow()
+    return version
+
+
+def _delete_live(db: Session, ids: list, start: datetime.date, end: datetime.date):
+    for offset in range(0, len(ids), DELETE_CHUNK_SIZE):
+        chunk = ids[offset:offset + DELETE_CHUNK_SIZE]
+        db.query(TransactionCategory).filter(TransactionCategory.transaction_id.in_(chunk),
+                                             TransactionCategory.transaction_date.between(start, end))\
+          .delete(synchronize_session=False)
+        db.query(Transaction).filter(Transaction.id.in_(chunk), Transaction.date.between(start, end))\
+          .delete(synchronize_session=False)
+
+
+def archive_month(db: Session, user_id: int, month: str) -> int:
+    start, end = month_bounds(month)
+    live = _live_month(db, user_id, start, end)
+    if not live:
+        return 0
+    archived = db.query(ArchivedMonth).filter(ArchivedMonth.user_id == user_id, ArchivedMonth.month == month)\
+                 .with_for_update().first()
+    previous = archived.version if archived else None
+    # Live rows for an already archived month (backdated entries) are merged into a new version.
+    rows = {row["id"]: row for row in cold_store.read(user_id, month, previous)} if previous else {}
+    rows.update((row["id"], row) for row in live)
+    version = None
+    try:
+        version = _replace_month(db, user_id, month, list(rows.values()), archived)
+        _delete_live(db, [row["id"] for row in live], start, end)
+        db.commit()
+    except Exception:
+        db.rollback()
+        cold_store.remove(user_id, month, version)
+        raise
+    cold_store.remove(user_id, month, previous)
+    return len(live)
+
+
+def months_to_archive(db: Session, before: datetime.date, user_id: int = None) -> list:
+    query = db.query(Transaction.user_id, Transaction.date).filter(Transaction.date < month_start(before)).distinct()
+    if user_id:
+        query = query.filter(Transaction.user_id == user_id)
+    return sorted({(row_user_id, month_key(date)) for row_user_id, date in query})
+
+
+def archive_transactions(db: Session, before: datetime.date, user_id: int = None, dry_run: bool = False) -> list:
+    # Moves transactions dated before the month of `before` into cold storage, one user and month
+    # per commit. Rollups and balances are left as they are: archiving moves rows, it does not change totals.
+    result = []
+    for row_user_id, month in months_to_archive(db, before, user_id):
+        if dry_run:
+            start, end = month_bounds(month)
+            count = db.query(Transaction).filter(Transaction.user_id == row_user_id,
+                                                 Transaction.date.between(start, end)).count()
+        else:
+            count = archive_month(db, row_user_id, month)
+        result.append({"user_id": row_user_id, "month": month, "transactions": count})
+    return result
+
+
+def purge_account(db: Session, user_id: int, account_id: int) -> list:
+    # Drops a deleted account's archived rows. Returns the superseded (month, version) pairs,
+    # to be removed with remove_versions once the caller has committed.
+    superseded = []
+    for archived in db.query(ArchivedMonth).filter(ArchivedMonth.user_id == user_id).all():
+        rows = cold_store.read(user_id, archived.month, archived.version)
+        kept = [row for row in rows if row["account_id"] != account_id]
+        if len(kept) != len(rows):
+            superseded.append((archived.month, archived.version))
+            _replace_month(db, user_id, archived.month, kept, archived)
+    return superseded
+
+
+def remove_versions(user_id: int, versions: list):
+    for month, version in versions:
+        cold_store.remove(user_id, month, version)
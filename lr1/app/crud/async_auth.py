@@ -0,0 +1,25 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import run_read, run_write
+from app import models
+from app.schemas import auth as auth_schemas
+from app.crud import auth
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(auth.get_user, user_id)
+
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.run_sync(auth.get_user_by_username, username)
+
+
+async def create_user(db: AsyncSession, user: auth_schemas.UserCreate, hashed_password: str = None):
+    return await run_write(db, auth.create_user, user, hashed_password=hashed_password)
+
+
+async def update_password(db: AsyncSession, user: models.User, new_password: str, hashed_password: str = None):
+    return await run_write(db, auth.update_password, user, new_password, hashed_password=hashed_password)
+
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return await run_read(db, auth.get_users, skip=skip, limit=limit)
@@ -0,0 +1,188 @@
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import run_read, run_write
+from app.crud import analytics, finance, forecasting, notifications, recurring
+from app.crud.archive import archived_months
+from app.schemas.finance import AccountCreate, TransactionCreate, CategoryCreate, BudgetCreate, GoalCreate, RecurringRuleCreate
+
+# Async counterparts of app.crud.finance. Each call runs the sync CRUD function through
+# AsyncSession.run_sync, so the query logic lives in one place. Reads go through run_read
+# and may be served by a replica; writes go through run_write and pin the session to the primary.
+
+async def create_account(db: AsyncSession, account: AccountCreate, user_id: int):
+    return await run_write(db, finance.create_account, account, user_id)
+
+async def get_accounts(db: AsyncSession, user_id: int):
+    return await run_read(db, finance.get_accounts, user_id)
+
+async def get_account(db: AsyncSession, account_id: int, user_id: int, eager: bool = True):
+    return await run_read(db, finance.get_account, account_id, user_id, eager=eager)
+
+async def update_account(db: AsyncSession, account_id: int, account_data: AccountCreate, user_id: int):
+    return await run_write(db, finance.update_account, account_id, account_data, user_id)
+
+async def delete_account(db: AsyncSession, account_id: int, user_id: int) -> bool:
+    return await run_write(db, finance.delete_account, account_id, user_id)
+
+async def create_transaction(db: AsyncSession, transaction: TransactionCreate, user_id: int):
+    return await run_write(db, finance.create_transaction, transaction, user_id)
+
+async def bulk_create_transactions(db: AsyncSession, transactions: list, user_id: int, chunk_size: int = 1000, errors: list = None):
+    return await run_write(db, finance.bulk_create_transactions, transactions, user_id, chunk_size=chunk_size, errors=errors)
+
+async def get_account_totals(db: AsyncSession, account_id: int, user_id: int, month: str = None):
+    return await run_read(db, finance.get_account_totals, account_id, user_id, month=month)
+
+async def get_transactions(db: AsyncSession, user_id: int, after: tuple = None, limit: int = 100, **filters):
+    return await run_read(db, finance.get_transactions, user_id, after=after, limit=limit, **filters)
+
+async def get_transaction_rows(db: AsyncSession, user_id: int, after: tuple = None, limit: int = 100, fields: list = None,
+                               expand: tuple = finance.TRANSACTION_EXPANSIONS, transaction_id: int = None, **filters):
+    return await run_read(db, finance.get_transaction_rows, user_id, after=after, limit=limit, fields=fields,
+                          expand=expand, transaction_id=transaction_id, **filters)
+
+async def get_account_rows(db: AsyncSession, user_id: int, account_id: int = None, fields: list = None, expand: tuple = (),
+                           limit: int = None):
+    return await run_read(db, finance.get_account_rows, user_id, account_id=account_id, fields=fields, expand=expand, limit=limit)
+
+async def iter_archived_transaction_outs(db: AsyncSession, user_id: int, **filters):
+    months = await run_read(db, archived_months, user_id, filters.get("date_from"), filters.get("date_to"))
+    for month, version in months:
+        for transaction in await run_read(db, finance.get_archived_month_outs, user_id, month, version, **filters):
+            yield transaction
+
+async def iter_transactions(db: AsyncSession, user_id: int, batch_size: int = 1000, **filters):
+    # Archived rows are merged in on (date, id) as the live rows stream past them, one archived
+    # month at a time.
+    archived = iter_archived_transaction_outs(db, user_id, **filters)
+    pending = await anext(archived, None)
+    statement = finance._transactions_query(db.sync_session, user_id, **filters)\
+        .options(finance.TRANSACTION_OUT_LOAD).statement.execution_options(yield_per=batch_size)
+    db.sync_session.info["read_only"] = True
+    try:
+        result = await db.stream_scalars(statement)
+        async for db_transaction in result:
+            while pending is not None and finance._transaction_key(pending) > finance._transaction_key(db_transaction):
+                yield pending
+                pending = await anext(archived, None)
+            yield db_transaction
+    finally:
+        db.sync_session.info["read_only"] = False
+    while pending is not None:
+        yield pending
+        pending = await anext(archived, None)
+
+async def get_transaction(db: AsyncSession, transaction_id: int, user_id: int, eager: bool = True):
+    return await run_read(db, finance.get_transaction, transaction_id, user_id, eager=eager)
+
+async def update_transaction(db: AsyncSession, transaction_id: int, transaction_data: TransactionCreate, user_id: int):
+    return await run_write(db, finance.update_transaction, transaction_id, transaction_data, user_id)
+
+async def delete_transaction(db: AsyncSession, transaction_id: int, user_id: int) -> bool:
+    return await run_write(db, finance.delete_transaction, transaction_id, user_id)
+
+async def create_category(db: AsyncSession, category: CategoryCreate):
+    return await run_write(db, finance.create_category, category)
+
+async def get_categories(db: AsyncSession):
+    return await run_read(db, finance.get_categories)
+
+async def get_category(db: AsyncSession, category_id: int):
+    return await run_read(db, finance.get_category, category_id)
+
+async def update_category(db: AsyncSession, category_id: int, category_data: CategoryCreate):
+    return await run_write(db, finance.update_category, category_id, category_data)
+
+async def delete_category(db: AsyncSession, category_id: int) -> bool:
+    return await run_write(db, finance.delete_category, category_id)
+
+async def create_budget(db: AsyncSession, budget: BudgetCreate, user_id: int):
+    return await run_write(db, finance.create_budget, budget, user_id)
+
+async def get_budgets(db: AsyncSession, user_id: int):
+    return await run_read(db, finance.get_budgets, user_id)
+
+async def get_budget_rows(db: AsyncSession, user_id: int, fields: list = None, expand: tuple = finance.BUDGET_EXPANSIONS):
+    return await run_read(db, finance.get_budget_rows, user_id, fields=fields, expand=expand)
+
+async def get_budget(db: AsyncSession, budget_id: int, user_id: int, eager: bool = True):
+    return await run_read(db, finance.get_budget, budget_id, user_id, eager=eager)
+
+async def update_budget(db: AsyncSession, budget_id: int, budget_data: BudgetCreate, user_id: int):
+    return await run_write(db, finance.update_budget, budget_id, budget_data, user_id)
+
+async def delete_budget(db: AsyncSession, budget_id: int, user_id: int) -> bool:
+    return await run_write(db, finance.delete_budget, budget_id, user_id)
+
+async def create_goal(db: AsyncSession, goal: GoalCreate, user_id: int):
+    return await run_write(db, finance.create_goal, goal, user_id)
+
+async def get_goals(db: AsyncSession, user_id: int):
+    return await run_read(db, finance.get_goals, user_id)
+
+async def get_goal(db: AsyncSession, goal_id: int, user_id: int):
+    return await run_read(db, finance.get_goal, goal_id, user_id)
+
+async def update_goal(db: AsyncSession, goal_id: int, goal_data: GoalCreate, user_id: int):
+    return await run_write(db, finance.update_goal, goal_id, goal_data, user_id)
+
+async def delete_goal(db: AsyncSession, goal_id: int, user_id: int) -> bool:
+    return await run_write(db, finance.delete_goal, goal_id, user_id)
+
+async def create_recurring_rule(db: AsyncSession, rule: RecurringRuleCreate, user_id: int):
+    return await run_write(db, recurring.create_recurring_rule, rule, user_id)
+
+async def get_recurring_rules(db: AsyncSession, user_id: int):
+    return await run_read(db, recurring.get_recurring_rules, user_id)
+
+async def update_recurring_rule(db: AsyncSession, rule_id: int, rule: RecurringRuleCreate, user_id: int):
+    return await run_write(db, recurring.update_recurring_rule, rule_id, rule, user_id)
+
+async def delete_recurring_rule(db: AsyncSession, rule_id: int, user_id: int) -> bool:
+    return await run_write(db, recurring.delete_recurring_rule, rule_id, user_id)
+
+async def get_expense_analysis(db: AsyncSession, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, finance.get_expense_analysis, user_id, date_from=date_from, date_to=date_to)
+
+async def get_analysis_series(db: AsyncSession, user_id: int, granularity: str = "month", type=None, window: int = 3,
+                              date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, analytics.get_series, user_id, granularity=granularity, type=type, window=window,
+                          date_from=date_from, date_to=date_to)
+
+async def get_year_over_year(db: AsyncSession, user_id: int, type=None, date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, analytics.get_year_over_year, user_id, type=type, date_from=date_from, date_to=date_to)
+
+async def get_percentiles(db: AsyncSession, user_id: int, quantiles: list, type=None,
+                          date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, analytics.get_percentiles, user_id, quantiles, type=type, date_from=date_from, date_to=date_to)
+
+async def get_account_flows(db: AsyncSession, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, analytics.get_account_flows, user_id, date_from=date_from, date_to=date_to)
+
+async def get_forecast(db: AsyncSession, user_id: int):
+    # Normally precomputed by the nightly batch; a missing or stale forecast is computed on the primary and stored.
+    return await run_read(db, forecasting.get_forecast, user_id) or await run_write(db, forecasting.refresh_forecast, user_id)
+
+async def create_notification(db: AsyncSession, user_id: int, title: str, message: str):
+    return await run_write(db, finance.create_notification, user_id, title, message)
+
+async def get_notifications(db: AsyncSession, user_id: int, before_id: int = None, limit: int = 100, unread: bool = False):
+    return await run_read(db, notifications.get_notifications, user_id, before_id=before_id, limit=limit, unread=unread)
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    return await run_read(db, notifications.get_unread_count, user_id)
+
+async def mark_notifications_read(db: AsyncSession, user_id: int, ids: list = None, up_to_id: int = None) -> int:
+    return await run_write(db, notifications.mark_read, user_id, ids=ids, up_to_id=up_to_id)
+
+async def get_notification_events(db: AsyncSession, user_id: int, after_id: int, limit: int):
+    return await run_read(db, finance.get_notification_events, user_id, after_id, limit)
+
+async def get_last_notification_id(db: AsyncSession, user_id: int) -> int:
+    return await run_read(db, finance.get_last_notification_id, user_id)
+
+async def get_dashboard_summary(db: AsyncSession, user_id: int):
+    return await run_read(db, finance.get_dashboard_summary, user_id)
+
+async def get_spending_trends(db: AsyncSession, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None):
+    return await run_read(db, finance.get_spending_trends, user_id, date_from=date_from, date_to=date_to)
@@ -4,15 +4,19 @@ from app.schemas import auth as auth_schemas
 from app.core.security import hash_password
 
 
+def get_user(db: Session, user_id: int):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
-def create_user(db: Session, user: auth_schemas.UserCreate):
+def create_user(db: Session, user: auth_schemas.UserCreate, hashed_password: str = None):
     db_user = models.User(
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password)
+        hashed_password=hashed_password or hash_password(user.password)
     )
     db.add(db_user)
     db.commit()
@@ -20,8 +24,8 @@ def create_user(db: Session, user: auth_schemas.UserCreate):
     return db_user
 
 
-def update_password(db: Session, user: models.User, new_password: str):
-    user.hashed_password = hash_password(new_password)
+def update_password(db: Session, user: models.User, new_password: str, hashed_password: str = None):
+    user.hashed_password = hashed_password or hash_password(new_password)
     db.commit()
     db.refresh(user)
     return user
@@ -0,0 +1,106 @@
+import calendar
+import datetime
+import os
+import re
+from typing import Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, literal, or_, select, union_all
+from app.models import Budget, Notification, Transaction, TransactionCategory, TransactionType
+from app.crud.aggregates import dialect_insert
+from app.crud.notifications import adjust_unread, budget_alert
+from app.core.notifications import notification_event, queue_notifications
+
+
+BUDGET_ALERT_THRESHOLDS = sorted(float(value) for value in os.getenv("BUDGET_ALERT_THRESHOLDS", "1.0").split(",") if value.strip())
+MAX_WINDOWS_PER_QUERY = 200
+
+
+def budget_window(budget: Budget, on_date: datetime.date) -> Optional[tuple]:
+    # None when the window is unknown: a single date, or no dates and a period that is not understood.
+    if budget.start_date and budget.end_date:
+        return budget.start_date, budget.end_date
+    if budget.start_date or budget.end_date:
+        return None
+    period = (budget.period or "").strip().lower()
+    if re.fullmatch(r"\d{4}-\d{2}", period):
+        year, month = map(int, period.split("-"))
+        return datetime.date(year, month, 1), datetime.date(year, month, calendar.monthrange(year, month)[1])
+    if re.fullmatch(r"\d{4}", period):
+        return datetime.date(int(period), 1, 1), datetime.date(int(period), 12, 31)
+    if period in ("daily", "day"):
+        return on_date, on_date
+    if period in ("weekly", "week"):
+        start = on_date - datetime.timedelta(days=on_date.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if period in ("monthly", "month"):
+        return on_date.replace(day=1), on_date.replace(day=calendar.monthrange(on_date.year, on_date.month)[1])
+    if period in ("yearly", "annual", "year"):
+        return on_date.replace(month=1, day=1), on_date.replace(month=12, day=31)
+    return None
+
+
+def _in_window(window: tuple, on_date: datetime.date) -> bool:
+    start, end = window
+    return start <= on_date <= end
+
+
+def _spent_query(index: int, budget: Budget, window: tuple):
+    start, end = window
+    return select(literal(index).label("idx"), func.coalesce(func.sum(TransactionCategory.allocated_amount), 0.0))\
+        .select_from(TransactionCategory)\
+        .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                Transaction.date == TransactionCategory.transaction_date))\
+        .where(
+            Transaction.user_id == budget.user_id,
+            Transaction.type == TransactionType.expense,
+            TransactionCategory.category_id == budget.category_id,
+            Transaction.date.between(start, end),
+            TransactionCategory.transaction_date.between(start, end)
+        )
+
+
+def _notification(budget: Budget, window: tuple, threshold: float, spent: float) -> dict:
+    start, end = window
+    title, message = budget_alert(budget.category.name, budget.limit_amount, spent, threshold)
+    return {
+        "user_id": budget.user_id,
+        "title": title,
+        "message": message,
+        "created_at": datetime.datetime.utcnow(),
+        "dedup_key": f"budget:{budget.id}:{start}:{end}:{threshold:g}",
+    }
+
+
+def evaluate_budgets(db: Session, user_id: int, affected: dict, thresholds: list = None, commit: bool = True) -> int:
+    # affected: {category_id: {transaction dates}} for the expense allocations that were just written
+    thresholds = thresholds or BUDGET_ALERT_THRESHOLDS
+    if not affected:
+        return 0
+    budgets = db.query(Budget).options(joinedload(Budget.category))\
+        .filter(Budget.user_id == user_id, Budget.category_id.in_(affected.keys())).all()
+    windows = []
+    for budget in budgets:
+        budget_windows = {budget_window(budget, on_date) for on_date in affected[budget.category_id]}
+        windows.extend((budget, window) for window in budget_windows
+                       if window is not None and any(_in_window(window, on_date) for on_date in affected[budget.category_id]))
+    notifications = []
+    for start in range(0, len(windows), MAX_WINDOWS_PER_QUERY):
+        chunk = windows[start:start + MAX_WINDOWS_PER_QUERY]
+        queries = [_spent_query(index, budget, window) for index, (budget, window) in enumerate(chunk)]
+        spent_by_index = dict(db.execute(union_all(*queries) if len(queries) > 1 else queries[0]).all())
+        for index, (budget, window) in enumerate(chunk):
+            spent = spent_by_index.get(index) or 0.0
+            notifications.extend(_notification(budget, window, threshold, spent)
+                                 for threshold in thresholds if spent > budget.limit_amount * threshold)
+    if notifications:
+        # RETURNING only yields the rows that were new; those are pushed to subscribers on commit.
+        created = db.execute(
+            dialect_insert(db)(Notification).on_conflict_do_nothing(index_elements=[Notification.dedup_key])
+            .returning(Notification.id, Notification.user_id, Notification.title, Notification.message, Notification.created_at),
+            notifications
+        ).all()
+        adjust_unread(db, user_id, len(created))
+        queue_notifications(db, [notification_event(row) for row in created])
+    if commit:
+        db.commit()
+    return len(notifications)
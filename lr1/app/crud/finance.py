@@ -1,60 +1,89 @@
 import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Account, Transaction, Category, TransactionCategory, Budget, Goal, Notification, TransactionType
+import heapq
+import itertools
+from collections import defaultdict
+from types import SimpleNamespace
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy import func, or_, and_, insert
+from app.models import Account, AccountPeriodTotal, Transaction, Category, CategoryPeriodTotal, TransactionCategory, Budget, Goal, Notification, TransactionType
 from app.schemas.finance import AccountCreate, TransactionCreate, CategoryCreate, BudgetCreate, GoalCreate
+from app.crud.aggregates import new_deltas, add_delta, apply_deltas, apply_transaction, get_period_totals, month_key
+from app.crud.archive import (archived_month_rows, archived_months, get_archived_transactions, iter_archived_transactions,
+                              purge_account, remove_versions)
+from app.crud.forecasting import discard_forecast
+from app.crud.outbox import enqueue_budget_check
+from app.crud.notifications import adjust_unread
+from app.core.partitions import add_months, month_start
+from app.core.response_cache import analytics_cache
+from app.core.notifications import notification_event, queue_notifications
+
+TRANSACTION_OUT_LOAD = selectinload(Transaction.transaction_categories).selectinload(TransactionCategory.category)
+ACCOUNT_OUT_LOAD = selectinload(Account.transactions)\
+    .selectinload(Transaction.transaction_categories).selectinload(TransactionCategory.category)
+BUDGET_OUT_LOAD = joinedload(Budget.category)
 
 def create_account(db: Session, account: AccountCreate, user_id: int):
-    db_account = Account(user_id=user_id, name=account.name, balance=account.balance)
+    db_account = Account(user_id=user_id, name=account.name, balance=account.balance, opening_balance=account.balance)
     db.add(db_account)
     db.commit()
-    db.refresh(db_account)
-    return db_account
+    return get_account(db, db_account.id, user_id)
 
 def get_accounts(db: Session, user_id: int):
     return db.query(Account).filter(Account.user_id == user_id).all()
 
-def get_account(db: Session, account_id: int, user_id: int):
-    return db.query(Account).filter(Account.id == account_id, Account.user_id == user_id).first()
+def get_account(db: Session, account_id: int, user_id: int, eager: bool = True):
+    query = db.query(Account).filter(Account.id == account_id, Account.user_id == user_id)
+    if eager:
+        query = query.options(ACCOUNT_OUT_LOAD)
+    return query.first()
 
 def update_account(db: Session, account_id: int, account_data: AccountCreate, user_id: int):
-    db_account = get_account(db, account_id, user_id)
+    db_account = get_account(db, account_id, user_id, eager=False)
     if db_account:
         db_account.name = account_data.name
+        db_account.opening_balance = (db_account.opening_balance or 0.0) + (account_data.balance or 0.0) - (db_account.balance or 0.0)
         db_account.balance = account_data.balance
+        discard_forecast(db, user_id)
         db.commit()
-        db.refresh(db_account)
+        analytics_cache.invalidate(user_id, "accounts")
+        db_account = get_account(db, account_id, user_id)
     return db_account
 
+def _account_category_deltas(db: Session, user_id: int, account_id: int) -> dict:
+    # Reverses the account's expense allocations, live and archived, in the per-user category totals.
+    deltas = new_deltas()
+    query = db.query(TransactionCategory.category_id, TransactionCategory.transaction_date,
+                     func.sum(TransactionCategory.allocated_amount), func.count())\
+              .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                      Transaction.date == TransactionCategory.transaction_date))\
+              .filter(Transaction.user_id == user_id, Transaction.account_id == account_id,
+                      Transaction.type == TransactionType.expense)\
+              .group_by(TransactionCategory.category_id, TransactionCategory.transaction_date)
+    rows = [(category_id, date, amount, count) for category_id, date, amount, count in query]
+    for row in iter_archived_transactions(db, user_id, account_id=account_id, type=TransactionType.expense):
+        rows.extend((category_id, row["date"], allocated_amount, 1) for category_id, allocated_amount in row["categories"])
+    for category_id, date, amount, count in rows:
+        entry = deltas["categories"].setdefault((category_id, month_key(date)), [0.0, 0])
+        entry[0] -= amount
+        entry[1] -= count
+    return deltas
+
 def delete_account(db: Session, account_id: int, user_id: int) -> bool:
-    db_account = get_account(db, account_id, user_id)
+    db_account = get_account(db, account_id, user_id, eager=False)
     if db_account:
+        # The account's own totals go with it; the category totals are shared with other accounts.
+        apply_deltas(db, user_id, _account_category_deltas(db, user_id, account_id))
+        superseded = purge_account(db, user_id, account_id)
         db.delete(db_account)
+        discard_forecast(db, user_id)
         db.commit()
+        remove_versions(user_id, superseded)
+        analytics_cache.invalidate(user_id, "transactions")
         return True
     return False
 
-def check_budget_exceedance(db: Session, user_id: int, category_id: int):
-    budgets = db.query(Budget).filter(Budget.user_id == user_id, Budget.category_id == category_id).all()
-    for budget in budgets:
-        if budget.start_date and budget.end_date:
-            total_spent = db.query(func.sum(TransactionCategory.allocated_amount))\
-                .join(Transaction, Transaction.id == TransactionCategory.transaction_id)\
-                .filter(
-                    Transaction.user_id == user_id,
-                    Transaction.type == TransactionType.expense,
-                    TransactionCategory.category_id == category_id,
-                    Transaction.date >= budget.start_date,
-                    Transaction.date <= budget.end_date
-                ).scalar() or 0.0
-            if total_spent > budget.limit_amount:
-                category = db.query(Category).filter(Category.id == category_id).first()
-                title = "Budget Exceeded"
-                message = f"Budget exceeded for category '{category.name}'. Limit: {budget.limit_amount}, Spent: {total_spent}"
-                create_notification(db, user_id, title, message)
-
 def create_transaction(db: Session, transaction: TransactionCreate, user_id: int):
-    db_account = get_account(db, transaction.account_id, user_id)
+    db_account = get_account(db, transaction.account_id, user_id, eager=False)
     if not db_account:
         raise ValueError("Account not found")
     for tc in transaction.categories:
@@ -67,50 +96,346 @@ def create_transaction(db: Session, transaction: TransactionCreate, user_id: int
         amount=transaction.amount,
         date=transaction.date if transaction.date else datetime.date.today(),
         description=transaction.description,
-        type=transaction.type
+        type=TransactionType(transaction.type.value)
     )
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    db.flush()
     for tc in transaction.categories:
         db_tc = TransactionCategory(
             transaction_id=db_transaction.id,
             category_id=tc.category_id,
+            transaction_date=db_transaction.date,
             allocated_amount=tc.allocated_amount
         )
         db.add(db_tc)
+    apply_transaction(db, db_transaction, categories=[(tc.category_id, tc.allocated_amount) for tc in transaction.categories])
+    if db_transaction.type == TransactionType.expense:
+        # Budgets are checked by the outbox worker, so the write does not wait on them.
+        enqueue_budget_check(db, user_id, {tc.category_id: {db_transaction.date} for tc in transaction.categories},
+                             db_transaction.id)
+    discard_forecast(db, user_id)
     db.commit()
-    db.refresh(db_transaction)
-    for tc in transaction.categories:
-        check_budget_exceedance(db, user_id, tc.category_id)
-    return db_transaction
+    analytics_cache.invalidate(user_id, "transactions")
+    return get_transaction(db, db_transaction.id, user_id)
+
+def _transactions_query(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None,
+                        account_id: int = None, type: TransactionType = None, category_id: int = None):
+    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    if date_from:
+        query = query.filter(Transaction.date >= date_from)
+    if date_to:
+        query = query.filter(Transaction.date <= date_to)
+    if account_id:
+        query = query.filter(Transaction.account_id == account_id)
+    if type:
+        query = query.filter(Transaction.type == type)
+    if category_id:
+        categories = [TransactionCategory.category_id == category_id]
+        if date_from:
+            categories.append(TransactionCategory.transaction_date >= date_from)
+        if date_to:
+            categories.append(TransactionCategory.transaction_date <= date_to)
+        query = query.filter(Transaction.transaction_categories.any(and_(*categories)))
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+def bulk_create_transactions(db: Session, transactions: list, user_id: int, chunk_size: int = 1000, errors: list = None):
+    errors = errors if errors is not None else []
+    account_ids = {t.account_id for _, t in transactions}
+    category_ids = {tc.category_id for _, t in transactions for tc in t.categories}
+    known_accounts = {row[0] for row in db.query(Account.id).filter(Account.user_id == user_id, Account.id.in_(account_ids))}
+    known_categories = {row[0] for row in db.query(Category.id).filter(Category.id.in_(category_ids))}
+    valid = []
+    for row_number, t in transactions:
+        missing = [tc.category_id for tc in t.categories if tc.category_id not in known_categories]
+        if t.account_id not in known_accounts:
+            errors.append({"row": row_number, "detail": "Account not found"})
+        elif missing:
+            errors.append({"row": row_number, "detail": f"Category with id {missing[0]} not found"})
+        else:
+            valid.append(t)
+    today = datetime.date.today()
+    affected_categories = {}
+    first_id = None
+    deltas = new_deltas()
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        ids = db.scalars(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            [{
+                "user_id": user_id,
+                "account_id": t.account_id,
+                "amount": t.amount,
+                "date": t.date or today,
+                "description": t.description,
+                "type": TransactionType(t.type.value),
+            } for t in chunk]
+        ).all()
+        first_id = first_id or ids[0]
+        category_rows = [
+            {"transaction_id": transaction_id, "category_id": tc.category_id, "transaction_date": t.date or today,
+             "allocated_amount": tc.allocated_amount}
+            for transaction_id, t in zip(ids, chunk) for tc in t.categories
+        ]
+        if category_rows:
+            db.execute(insert(TransactionCategory), category_rows)
+        for t in chunk:
+            if t.type.value == "expense":
+                for tc in t.categories:
+                    affected_categories.setdefault(tc.category_id, set()).add(t.date or today)
+        for t in chunk:
+            add_delta(deltas, t.account_id, t.date or today, TransactionType(t.type.value), t.amount,
+                      categories=[(tc.category_id, tc.allocated_amount) for tc in t.categories])
+    apply_deltas(db, user_id, deltas)
+    enqueue_budget_check(db, user_id, affected_categories, first_id)
+    discard_forecast(db, user_id)
+    db.commit()
+    analytics_cache.invalidate(user_id, "transactions")
+    return {"created": len(valid), "errors": sorted(errors, key=lambda error: error["row"])}
+
+def get_account_totals(db: Session, account_id: int, user_id: int, month: str = None):
+    return get_period_totals(db, user_id, account_id=account_id, month=month)
+
+def _after(query, after: tuple = None):
+    if after:
+        after_date, after_id = after
+        # The redundant date bound lets PostgreSQL prune partitions newer than the cursor.
+        query = query.filter(Transaction.date <= after_date, or_(
+            Transaction.date < after_date,
+            and_(Transaction.date == after_date, Transaction.id < after_id)
+        ))
+    return query
+
+# Transactions older than the cold storage horizon live in per-month archive files (app.crud.archive).
+# Listings merge them with the live rows on (date, id), so pages and cursors work across the boundary.
+# Archived rows are read-only: lookups, updates and deletes by id only see live transactions.
+def _transaction_key(transaction) -> tuple:
+    return transaction.date, transaction.id
+
+def _archived_categories(db: Session, rows: list) -> dict:
+    ids = {category_id for row in rows for category_id, _ in row["categories"]}
+    return {category.id: category for category in db.query(Category).filter(Category.id.in_(ids))} if ids else {}
+
+def _archived_out(rows: list, categories: dict) -> list:
+    # Shaped like Transaction objects for TransactionOut, never attached to the session.
+    return [SimpleNamespace(
+        id=row["id"], user_id=row["user_id"], account_id=row["account_id"], amount=row["amount"], date=row["date"],
+        description=row["description"], type=row["type"],
+        transaction_categories=[SimpleNamespace(allocated_amount=allocated_amount, category=categories[category_id])
+                                for category_id, allocated_amount in row["categories"] if category_id in categories],
+    ) for row in rows]
+
+def get_archived_transaction_outs(db: Session, user_id: int, after: tuple = None, limit: int = None, **filters):
+    rows = get_archived_transactions(db, user_id, after=after, limit=limit, **filters)
+    return _archived_out(rows, _archived_categories(db, rows))
+
+def get_archived_month_outs(db: Session, user_id: int, month: str, version: str, **filters):
+    rows = list(archived_month_rows(user_id, month, version, **filters))
+    return _archived_out(rows, _archived_categories(db, rows))
 
-def get_transactions(db: Session, user_id: int):
-    return db.query(Transaction).filter(Transaction.user_id == user_id).all()
+def iter_archived_transaction_outs(db: Session, user_id: int, **filters):
+    # Newest month first, with only the month being merged held in memory.
+    for month, version in archived_months(db, user_id, filters.get("date_from"), filters.get("date_to")):
+        yield from get_archived_month_outs(db, user_id, month, version, **filters)
 
-def get_transaction(db: Session, transaction_id: int, user_id: int):
-    return db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == user_id).first()
+def get_transactions(db: Session, user_id: int, after: tuple = None, limit: int = 100, **filters):
+    query = _after(_transactions_query(db, user_id, **filters), after)
+    transactions = query.options(TRANSACTION_OUT_LOAD).limit(limit).all()
+    archived = get_archived_transaction_outs(db, user_id, after=after, limit=limit, **filters)
+    if archived:
+        transactions = list(itertools.islice(heapq.merge(transactions, archived, key=_transaction_key, reverse=True), limit))
+    return transactions
+
+# Row builders for the fast serialization path and for sparse fieldsets: plain column tuples
+# shaped like the *Out schemas, without loading ORM objects or validating them again through
+# pydantic. Only the requested columns are selected and only the requested relations are joined.
+ACCOUNT_FIELDS = {"name": Account.name, "balance": Account.balance, "id": Account.id, "user_id": Account.user_id}
+TRANSACTION_FIELDS = {
+    "account_id": Transaction.account_id, "amount": Transaction.amount, "date": Transaction.date,
+    "description": Transaction.description, "type": Transaction.type, "id": Transaction.id, "user_id": Transaction.user_id,
+}
+BUDGET_FIELDS = {
+    "category_id": Budget.category_id, "period": Budget.period, "limit_amount": Budget.limit_amount,
+    "start_date": Budget.start_date, "end_date": Budget.end_date, "id": Budget.id, "user_id": Budget.user_id,
+}
+ACCOUNT_EXPANSIONS = ("transactions",)
+TRANSACTION_EXPANSIONS = ("categories",)
+BUDGET_EXPANSIONS = ("category",)
+
+def _columns(fields: dict, names: list, required: tuple) -> list:
+    return [fields[name] for name in names] + [fields[name] for name in required if name not in names]
+
+def _row_dict(row, names: list) -> dict:
+    return {name: value.value if isinstance(value, TransactionType) else value for name, value in zip(names, row)}
+
+def _category_rows(db: Session, condition, dates: list = None) -> dict:
+    query = db.query(TransactionCategory.transaction_id, TransactionCategory.allocated_amount,
+                     Category.name, Category.description, Category.id)\
+              .join(Category, Category.id == TransactionCategory.category_id)\
+              .filter(condition)
+    if dates:
+        query = query.filter(TransactionCategory.transaction_date.between(min(dates), max(dates)))
+    rows = query.order_by(TransactionCategory.transaction_id, TransactionCategory.category_id)
+    categories = {}
+    for transaction_id, allocated_amount, name, description, category_id in rows:
+        categories.setdefault(transaction_id, []).append({
+            "allocated_amount": allocated_amount,
+            "category": {"name": name, "description": description, "id": category_id},
+        })
+    return categories
+
+def _key_indexes(names: list) -> tuple:
+    # Rows carry the requested columns followed by date and id when those were not requested.
+    date_index = names.index("date") if "date" in names else len(names)
+    id_index = names.index("id") if "id" in names else len(names) + ("date" not in names)
+    return date_index, id_index
+
+def _transaction_dicts(rows: list, names: list, categories: dict = None) -> list:
+    _, id_index = _key_indexes(names)
+    result = []
+    for row in rows:
+        item = _row_dict(row, names)
+        if categories is not None:
+            item["transaction_categories"] = categories.get(row[id_index], [])
+        result.append(item)
+    return result
+
+def get_transaction_rows(db: Session, user_id: int, after: tuple = None, limit: int = 100, fields: list = None,
+                         expand: tuple = TRANSACTION_EXPANSIONS, transaction_id: int = None, **filters):
+    names = list(fields or TRANSACTION_FIELDS)
+    date_index, id_index = _key_indexes(names)
+    query = _after(_transactions_query(db, user_id, **filters), after)
+    if transaction_id:
+        query = query.filter(Transaction.id == transaction_id)
+    rows = query.with_entities(*_columns(TRANSACTION_FIELDS, names, ("date", "id"))).limit(limit).all()
+    categories = None
+    if "categories" in expand:
+        categories = _category_rows(db, TransactionCategory.transaction_id.in_([row[id_index] for row in rows]),
+                                    [row[date_index] for row in rows]) if rows else {}
+    items = list(zip([(row[date_index], row[id_index]) for row in rows], _transaction_dicts(rows, names, categories)))
+    archived = [] if transaction_id else get_archived_transactions(db, user_id, after=after, limit=limit, **filters)
+    if archived:
+        archived_items = _archived_dicts(db, archived, names, "categories" in expand)
+        items = list(itertools.islice(heapq.merge(items, archived_items, key=lambda item: item[0], reverse=True), limit))
+    last_key = items[-1][0] if items else None
+    return [item for _, item in items], last_key
+
+def _archived_dicts(db: Session, rows: list, names: list, categories: bool) -> list:
+    lookup = _archived_categories(db, rows) if categories else {}
+    items = []
+    for row in rows:
+        item = {name: row[name] for name in names}
+        if categories:
+            item["transaction_categories"] = [{
+                "allocated_amount": allocated_amount,
+                "category": {"name": lookup[category_id].name, "description": lookup[category_id].description,
+                             "id": category_id},
+            } for category_id, allocated_amount in row["categories"] if category_id in lookup]
+        items.append(((row["date"], row["id"]), item))
+    return items
+
+def get_account_rows(db: Session, user_id: int, account_id: int = None, fields: list = None, expand: tuple = (),
+                     limit: int = None):
+    names = list(fields or ACCOUNT_FIELDS)
+    query = db.query(*_columns(ACCOUNT_FIELDS, names, ("id",))).filter(Account.user_id == user_id)
+    if account_id:
+        query = query.filter(Account.id == account_id)
+    accounts = query.order_by(Account.id).all()
+    result = [_row_dict(row, names) for row in accounts]
+    if "transactions" in expand and accounts:
+        id_index = names.index("id") if "id" in names else len(names)
+        position = func.row_number().over(partition_by=Transaction.account_id,
+                                          order_by=(Transaction.date.desc(), Transaction.id.desc())).label("position")
+        ranked = db.query(Transaction.id, position).filter(Transaction.user_id == user_id)
+        if account_id:
+            ranked = ranked.filter(Transaction.account_id == account_id)
+        ranked = ranked.subquery()
+        selected = db.query(ranked.c.id)
+        if limit:
+            selected = selected.filter(ranked.c.position <= limit)
+        transaction_names = list(TRANSACTION_FIELDS)
+        rows = db.query(*TRANSACTION_FIELDS.values()).filter(Transaction.id.in_(selected))\
+                 .order_by(Transaction.account_id, Transaction.date.desc(), Transaction.id.desc()).all()
+        transactions = {}
+        for item in _transaction_dicts(rows, transaction_names, _category_rows(db, TransactionCategory.transaction_id.in_(selected))):
+            transactions.setdefault(item["account_id"], []).append(item)
+        for row, item in zip(accounts, result):
+            item["transactions"] = transactions.get(row[id_index], [])
+    return result
+
+def get_budget_rows(db: Session, user_id: int, fields: list = None, expand: tuple = BUDGET_EXPANSIONS):
+    names = list(fields or BUDGET_FIELDS)
+    columns = _columns(BUDGET_FIELDS, names, ())
+    query = db.query(*columns).filter(Budget.user_id == user_id)
+    if "category" in expand:
+        query = query.join(Category, Category.id == Budget.category_id)\
+                     .add_columns(Category.name, Category.description, Category.id)
+    result = []
+    for row in query.order_by(Budget.id):
+        item = _row_dict(row, names)
+        if "category" in expand:
+            item["category"] = {"name": row[-3], "description": row[-2], "id": row[-1]}
+        result.append(item)
+    return result
+
+def iter_transactions(db: Session, user_id: int, batch_size: int = 1000, **filters):
+    query = _transactions_query(db, user_id, **filters)\
+        .options(TRANSACTION_OUT_LOAD).yield_per(batch_size)
+    archived = iter_archived_transaction_outs(db, user_id, **filters)
+    for db_transaction in heapq.merge(query, archived, key=_transaction_key, reverse=True):
+        yield db_transaction
+
+def get_transaction(db: Session, transaction_id: int, user_id: int, eager: bool = True):
+    query = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == user_id)
+    if eager:
+        query = query.options(TRANSACTION_OUT_LOAD)
+    return query.first()
+
+def _move_transaction(db: Session, db_transaction: Transaction, date: datetime.date):
+    # A new date can move the row to another partition. Category rows are re-inserted after the
+    # transaction moves instead of relying on ON UPDATE CASCADE across partitions.
+    category_rows = [
+        {"transaction_id": db_transaction.id, "category_id": tc.category_id, "transaction_date": date,
+         "allocated_amount": tc.allocated_amount}
+        for tc in db_transaction.transaction_categories
+    ]
+    for tc in db_transaction.transaction_categories:
+        db.expunge(tc)
+    db.expire(db_transaction, ["transaction_categories"])
+    db.query(TransactionCategory).filter(TransactionCategory.transaction_id == db_transaction.id)\
+      .delete(synchronize_session=False)
+    db_transaction.date = date
+    db.flush()
+    if category_rows:
+        db.execute(insert(TransactionCategory), category_rows)
 
 def update_transaction(db: Session, transaction_id: int, transaction_data: TransactionCreate, user_id: int):
-    db_transaction = get_transaction(db, transaction_id, user_id)
+    db_transaction = get_transaction(db, transaction_id, user_id, eager=False)
     if db_transaction:
-        db_account = get_account(db, transaction_data.account_id, user_id)
+        db_account = get_account(db, transaction_data.account_id, user_id, eager=False)
         if not db_account:
             raise ValueError("Account not found")
+        apply_transaction(db, db_transaction, sign=-1)
+        if transaction_data.date and transaction_data.date != db_transaction.date:
+            _move_transaction(db, db_transaction, transaction_data.date)
         db_transaction.account_id = transaction_data.account_id
         db_transaction.amount = transaction_data.amount
-        db_transaction.date = transaction_data.date if transaction_data.date else db_transaction.date
         db_transaction.description = transaction_data.description
-        db_transaction.type = transaction_data.type
+        db_transaction.type = TransactionType(transaction_data.type.value)
+        apply_transaction(db, db_transaction)
+        discard_forecast(db, user_id)
         db.commit()
-        db.refresh(db_transaction)
+        analytics_cache.invalidate(user_id, "transactions")
+        db_transaction = get_transaction(db, transaction_id, user_id)
     return db_transaction
 
 def delete_transaction(db: Session, transaction_id: int, user_id: int) -> bool:
-    db_transaction = get_transaction(db, transaction_id, user_id)
+    db_transaction = get_transaction(db, transaction_id, user_id, eager=False)
     if db_transaction:
+        apply_transaction(db, db_transaction, sign=-1)
         db.delete(db_transaction)
+        discard_forecast(db, user_id)
         db.commit()
+        analytics_cache.invalidate(user_id, "transactions")
         return True
     return False
 
@@ -118,6 +443,7 @@ def create_category(db: Session, category: CategoryCreate):
     db_category = Category(name=category.name, description=category.description)
     db.add(db_category)
     db.commit()
+    analytics_cache.invalidate(None, "categories")
     db.refresh(db_category)
     return db_category
 
@@ -133,6 +459,7 @@ def update_category(db: Session, category_id: int, category_data: CategoryCreate
         db_category.name = category_data.name
         db_category.description = category_data.description
         db.commit()
+        analytics_cache.invalidate(None, "categories")
         db.refresh(db_category)
     return db_category
 
@@ -141,6 +468,7 @@ def delete_category(db: Session, category_id: int) -> bool:
     if db_category:
         db.delete(db_category)
         db.commit()
+        analytics_cache.invalidate(None, "categories")
         return True
     return False
 
@@ -157,18 +485,22 @@ def create_budget(db: Session, budget: BudgetCreate, user_id: int):
         end_date=budget.end_date
     )
     db.add(db_budget)
+    discard_forecast(db, user_id)
     db.commit()
-    db.refresh(db_budget)
-    return db_budget
+    analytics_cache.invalidate(user_id, "budgets")
+    return get_budget(db, db_budget.id, user_id)
 
 def get_budgets(db: Session, user_id: int):
-    return db.query(Budget).filter(Budget.user_id == user_id).all()
+    return db.query(Budget).options(BUDGET_OUT_LOAD).filter(Budget.user_id == user_id).all()
 
-def get_budget(db: Session, budget_id: int, user_id: int):
-    return db.query(Budget).filter(Budget.id == budget_id, Budget.user_id == user_id).first()
+def get_budget(db: Session, budget_id: int, user_id: int, eager: bool = True):
+    query = db.query(Budget).filter(Budget.id == budget_id, Budget.user_id == user_id)
+    if eager:
+        query = query.options(BUDGET_OUT_LOAD)
+    return query.first()
 
 def update_budget(db: Session, budget_id: int, budget_data: BudgetCreate, user_id: int):
-    db_budget = get_budget(db, budget_id, user_id)
+    db_budget = get_budget(db, budget_id, user_id, eager=False)
     if db_budget:
         db_category = get_category(db, budget_data.category_id)
         if not db_category:
@@ -178,15 +510,19 @@ def update_budget(db: Session, budget_id: int, budget_data: BudgetCreate, user_i
         db_budget.limit_amount = budget_data.limit_amount
         db_budget.start_date = budget_data.start_date
         db_budget.end_date = budget_data.end_date
+        discard_forecast(db, user_id)
         db.commit()
-        db.refresh(db_budget)
+        analytics_cache.invalidate(user_id, "budgets")
+        db_budget = get_budget(db, budget_id, user_id)
     return db_budget
 
 def delete_budget(db: Session, budget_id: int, user_id: int) -> bool:
-    db_budget = get_budget(db, budget_id, user_id)
+    db_budget = get_budget(db, budget_id, user_id, eager=False)
     if db_budget:
         db.delete(db_budget)
+        discard_forecast(db, user_id)
         db.commit()
+        analytics_cache.invalidate(user_id, "budgets")
         return True
     return False
 
@@ -199,6 +535,7 @@ def create_goal(db: Session, goal: GoalCreate, user_id: int):
         due_date=goal.due_date
     )
     db.add(db_goal)
+    discard_forecast(db, user_id)
     db.commit()
     db.refresh(db_goal)
     return db_goal
@@ -216,6 +553,7 @@ def update_goal(db: Session, goal_id: int, goal_data: GoalCreate, user_id: int):
         db_goal.target_amount = goal_data.target_amount
         db_goal.current_amount = goal_data.current_amount
         db_goal.due_date = goal_data.due_date
+        discard_forecast(db, user_id)
         db.commit()
         db.refresh(db_goal)
     return db_goal
@@ -224,43 +562,116 @@ def delete_goal(db: Session, goal_id: int, user_id: int) -> bool:
     db_goal = get_goal(db, goal_id, user_id)
     if db_goal:
         db.delete(db_goal)
+        discard_forecast(db, user_id)
         db.commit()
         return True
     return False
 
-def get_expense_analysis(db: Session, user_id: int):
-    analysis = (
+def _split_range(date_from: datetime.date = None, date_to: datetime.date = None) -> tuple:
+    # Whole months of a date range are answered from the rollups, which also cover archived months.
+    # Days at either end that do not make up a whole month are summed from the raw rows instead.
+    edges = []
+    month_from = month_to = None
+    if date_from:
+        month_from = month_start(date_from)
+        if date_from != month_from:
+            month_from = add_months(month_from, 1)
+            month_end = month_from - datetime.timedelta(days=1)
+            edges.append((date_from, min(month_end, date_to) if date_to else month_end))
+    if date_to:
+        month_to = month_start(date_to)
+        if date_to != add_months(month_to, 1) - datetime.timedelta(days=1):
+            start = max(month_to, date_from) if date_from else month_to
+            if not edges or start > edges[0][1]:
+                edges.append((start, date_to))
+            month_to = add_months(month_to, -1)
+    return month_from and month_key(month_from), month_to and month_key(month_to), edges
+
+def _raw_expenses(db: Session, user_id: int, edges: list) -> tuple:
+    # Expense totals per month and per category over partial months, from live and archived rows.
+    months, categories = defaultdict(float), defaultdict(float)
+    for start, end in edges:
+        query = db.query(Transaction.date, Transaction.amount)\
+                  .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense,
+                          Transaction.date.between(start, end))
+        for date, amount in query:
+            months[month_key(date)] += amount
+        query = db.query(TransactionCategory.category_id, TransactionCategory.allocated_amount)\
+                  .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                          Transaction.date == TransactionCategory.transaction_date))\
+                  .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense,
+                          TransactionCategory.transaction_date.between(start, end))
+        for category_id, allocated_amount in query:
+            categories[category_id] += allocated_amount
+        for row in iter_archived_transactions(db, user_id, date_from=start, date_to=end, type=TransactionType.expense):
+            months[month_key(row["date"])] += row["amount"]
+            for category_id, allocated_amount in row["categories"]:
+                categories[category_id] += allocated_amount
+    return months, categories
+
+def get_expense_analysis(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None):
+    month_from, month_to, edges = _split_range(date_from, date_to)
+    query = (
        db.query(
          Category.name,
-         func.sum(TransactionCategory.allocated_amount).label("total_expense")
+         func.sum(CategoryPeriodTotal.total).label("total_expense")
        )
-       .join(TransactionCategory, TransactionCategory.category_id == Category.id)
-       .join(Transaction, Transaction.id == TransactionCategory.transaction_id)
-       .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense)
-       .group_by(Category.name)
-       .all()
+       .join(CategoryPeriodTotal, CategoryPeriodTotal.category_id == Category.id)
+       .filter(CategoryPeriodTotal.user_id == user_id, CategoryPeriodTotal.count > 0)
     )
-    return [{"category": row[0], "total_expense": row[1]} for row in analysis]
+    if month_from:
+        query = query.filter(CategoryPeriodTotal.month >= month_from)
+    if month_to:
+        query = query.filter(CategoryPeriodTotal.month <= month_to)
+    totals = dict(query.group_by(Category.name).all())
+    _, categories = _raw_expenses(db, user_id, edges)
+    if categories:
+        names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(categories)))
+        for category_id, amount in categories.items():
+            if category_id in names:
+                totals[names[category_id]] = totals.get(names[category_id], 0.0) + amount
+    return [{"category": name, "total_expense": total} for name, total in totals.items()]
 
 def create_notification(db: Session, user_id: int, title: str, message: str):
     notification = Notification(user_id=user_id, title=title, message=message)
     db.add(notification)
+    db.flush()
+    adjust_unread(db, user_id, 1)
+    queue_notifications(db, [notification_event(notification)])
     db.commit()
     db.refresh(notification)
     return notification
 
-def get_notifications(db: Session, user_id: int):
-    return db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc()).all()
+def get_notification_events(db: Session, user_id: int, after_id: int, limit: int) -> list:
+    # Replay for the push streams, oldest first.
+    query = db.query(Notification.id, Notification.user_id, Notification.title, Notification.message, Notification.created_at)\
+              .filter(Notification.user_id == user_id, Notification.id > after_id)
+    return [notification_event(row) for row in query.order_by(Notification.id).limit(limit)]
+
+def get_last_notification_id(db: Session, user_id: int) -> int:
+    return db.query(func.coalesce(func.max(Notification.id), 0)).filter(Notification.user_id == user_id).scalar()
 
 def get_dashboard_summary(db: Session, user_id: int):
-    total_income = db.query(func.sum(Transaction.amount)).filter(Transaction.user_id == user_id, Transaction.type == TransactionType.income).scalar() or 0.0
-    total_expense = db.query(func.sum(Transaction.amount)).filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense).scalar() or 0.0
+    totals = dict(db.query(AccountPeriodTotal.type, func.sum(AccountPeriodTotal.total))
+                  .filter(AccountPeriodTotal.user_id == user_id)
+                  .group_by(AccountPeriodTotal.type).all())
+    total_income = totals.get(TransactionType.income) or 0.0
+    total_expense = totals.get(TransactionType.expense) or 0.0
     net_savings = total_income - total_expense
     return {"total_income": total_income, "total_expense": total_expense, "net_savings": net_savings}
 
-def get_spending_trends(db: Session, user_id: int):
-    trends = db.query(func.to_char(Transaction.date, 'YYYY-MM').label('month'),
-                      func.sum(Transaction.amount).label('total_expense'))\
-               .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense)\
-               .group_by('month').order_by('month').all()
-    return [{"month": row[0], "total_expense": row[1]} for row in trends]
+def get_spending_trends(db: Session, user_id: int, date_from: datetime.date = None, date_to: datetime.date = None):
+    month_from, month_to, edges = _split_range(date_from, date_to)
+    query = db.query(AccountPeriodTotal.month,
+                     func.sum(AccountPeriodTotal.total).label('total_expense'))\
+              .filter(AccountPeriodTotal.user_id == user_id, AccountPeriodTotal.type == TransactionType.expense,
+                      AccountPeriodTotal.count > 0)
+    if month_from:
+        query = query.filter(AccountPeriodTotal.month >= month_from)
+    if month_to:
+        query = query.filter(AccountPeriodTotal.month <= month_to)
+    trends = dict(query.group_by(AccountPeriodTotal.month).all())
+    months, _ = _raw_expenses(db, user_id, edges)
+    for month, amount in months.items():
+        trends[month] = trends.get(month, 0.0) + amount
+    return [{"month": month, "total_expense": trends[month]} for month in sorted(trends)]
@@ -0,0 +1,189 @@
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func, union_all
+from app.models import Account, Budget, Goal, User, UserForecast
+from app.crud.analytics import load_frame, period_index
+from app.crud.budgets import budget_window, _spent_query, MAX_WINDOWS_PER_QUERY
+from app.core.partitions import add_months, month_start
+
+FORECAST_HISTORY_MONTHS = int(os.getenv("FORECAST_HISTORY_MONTHS", "24"))
+FORECAST_HORIZON_MONTHS = int(os.getenv("FORECAST_HORIZON_MONTHS", "12"))
+FORECAST_MAX_YEARS = int(os.getenv("FORECAST_MAX_YEARS", "10"))
+FORECAST_ALPHA = float(os.getenv("FORECAST_ALPHA", "0.3"))
+FORECAST_BATCH_SIZE = int(os.getenv("FORECAST_BATCH_SIZE", "100"))
+
+
+def monthly_series(frame, first: int, months: int) -> tuple:
+    # Rows of the matrix: income, expense, then expense allocations per category; one column per month.
+    index = period_index(frame.date, "month") - first
+    income = np.bincount(index[~frame.expense], weights=frame.amount[~frame.expense], minlength=months)
+    expense = np.bincount(index[frame.expense], weights=frame.amount[frame.expense], minlength=months)
+    mask = frame.category_expense
+    category_ids, row = np.unique(frame.category_id[mask], return_inverse=True)
+    cells = row * months + period_index(frame.category_date[mask], "month") - first
+    categories = np.bincount(cells, weights=frame.allocated[mask], minlength=len(category_ids) * months)
+    return category_ids.tolist(), np.vstack([income, expense, categories.reshape(len(category_ids), months)])
+
+
+def fit(series: np.ndarray, first: int, alpha: float = FORECAST_ALPHA) -> tuple:
+    # Seasonal averages by month of year (once two full years are available) and simple
+    # exponential smoothing of the deseasonalised level, for all series at once.
+    count, months = series.shape
+    month_of_year = (first + np.arange(months)) % 12
+    seasonal = np.ones((count, 12))
+    if months >= 24:
+        by_month = np.stack([series[:, month_of_year == month].mean(axis=1) for month in range(12)], axis=1)
+        mean = series.mean(axis=1, keepdims=True)
+        seasonal = np.divide(by_month, mean, out=np.ones_like(by_month), where=mean > 0)
+    factors = seasonal[:, month_of_year]
+    deseasonalised = np.divide(series, factors, out=np.zeros(series.shape), where=factors > 0)
+    level = deseasonalised[:, 0] if months else np.zeros(count)
+    for month in range(1, months):
+        level = alpha * deseasonalised[:, month] + (1 - alpha) * level
+    return level, seasonal
+
+
+def project(level: np.ndarray, seasonal: np.ndarray, first: int, months: int) -> np.ndarray:
+    return level[:, None] * seasonal[:, (first + np.arange(months)) % 12]
+
+
+def daily_rates(forecast: np.ndarray, current: int, days: np.ndarray) -> np.ndarray:
+    # Spreads each forecast month evenly over its days; days[0] is tomorrow.
+    months = days.astype("datetime64[M]")
+    lengths = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    return forecast[:, months.astype(np.int64) - current] / lengths
+
+
+def _first_reached(cumulative: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # Index of the first day each target is reached, or -1.
+    reached = cumulative[None, :] >= targets[:, None]
+    return np.where(reached.any(axis=1), reached.argmax(axis=1), -1)
+
+
+def _spent(db: Session, windows: list) -> dict:
+    spent = {}
+    for start in range(0, len(windows), MAX_WINDOWS_PER_QUERY):
+        chunk = windows[start:start + MAX_WINDOWS_PER_QUERY]
+        queries = [_spent_query(index, budget, window) for index, (budget, window) in enumerate(chunk, start)]
+        spent.update(db.execute(union_all(*queries) if len(queries) > 1 else queries[0]).all())
+    return spent
+
+
+def compute_forecast(db: Session, user_id: int, today: datetime.date = None) -> dict:
+    today = today or datetime.date.today()
+    current = int(period_index(np.array([today], dtype="datetime64[D]"), "month")[0])
+    history_from = add_months(month_start(today), -FORECAST_HISTORY_MONTHS)
+    frame = load_frame(db, user_id, history_from, month_start(today) - datetime.timedelta(days=1))
+    # History starts at the user's first month with data, so months before they joined do not drag the level down.
+    first = int(period_index(frame.date, "month").min()) if len(frame) else current
+    category_ids, series = monthly_series(frame, first, current - first)
+    level, seasonal = fit(series, first)
+    days = np.arange(np.datetime64(today) + 1, np.datetime64(today) + 1 + 366 * FORECAST_MAX_YEARS)
+    forecast = project(level, seasonal, current, int(period_index(days[-1:], "month")[0]) - current + 1)
+    rates = daily_rates(forecast, current, days)
+    net = np.cumsum(rates[0] - rates[1])
+
+    balance = db.query(func.coalesce(func.sum(Account.balance), 0.0)).filter(Account.user_id == user_id).scalar()
+    offsets = period_index(days, "month") - current
+    horizon = offsets < FORECAST_HORIZON_MONTHS
+    income = np.bincount(offsets[horizon], weights=rates[0][horizon], minlength=FORECAST_HORIZON_MONTHS)
+    expense = np.bincount(offsets[horizon], weights=rates[1][horizon], minlength=FORECAST_HORIZON_MONTHS)
+    balances = balance + np.cumsum(income - expense)
+    months = [{"month": f"{add_months(month_start(today), offset):%Y-%m}", "income": month_income, "expense": month_expense,
+               "net": month_income - month_expense, "balance": month_balance}
+              for offset, (month_income, month_expense, month_balance)
+              in enumerate(zip(income.tolist(), expense.tolist(), balances.tolist()))]
+    monthly_net = float((forecast[0, :12] - forecast[1, :12]).mean())
+
+    goals = db.query(Goal).filter(Goal.user_id == user_id).order_by(Goal.id).all()
+    remaining = np.array([goal.target_amount - (goal.current_amount or 0.0) for goal in goals], dtype=np.float64)
+    reached = _first_reached(net, remaining)
+    goal_projections = {}
+    for goal, left, index in zip(goals, remaining.tolist(), reached.tolist()):
+        projected = today if left <= 0 else (days[index].item() if index >= 0 else None)
+        goal_projections[str(goal.id)] = {
+            "goal_id": goal.id, "target_amount": goal.target_amount, "current_amount": goal.current_amount,
+            "due_date": goal.due_date and goal.due_date.isoformat(), "monthly_contribution": monthly_net,
+            "projected_completion_date": projected and projected.isoformat(),
+            "on_track": (projected is not None and projected <= goal.due_date) if goal.due_date else None,
+        }
+
+    windows = []
+    for budget in db.query(Budget).filter(Budget.user_id == user_id).order_by(Budget.id):
+        window = budget_window(budget, today)
+        if window is not None and window[0] <= today <= window[1]:
+            windows.append((budget, window))
+    spent_by_index = _spent(db, windows) if windows else {}
+    rows = {category_id: row for row, category_id in enumerate(category_ids, 2)}
+    budget_projections = {}
+    for index, (budget, (start, end)) in enumerate(windows):
+        spent = spent_by_index.get(index) or 0.0
+        remaining_days = min((end - today).days, len(days))
+        burn = np.cumsum(rates[rows[budget.category_id]][:remaining_days]) if budget.category_id in rows else np.zeros(remaining_days)
+        projected_spent = spent + (float(burn[-1]) if remaining_days else 0.0)
+        overrun = today if spent > budget.limit_amount else None
+        if overrun is None:
+            crossed = _first_reached(spent + burn, np.array([budget.limit_amount]))[0] if remaining_days else -1
+            overrun = days[crossed].item() if crossed >= 0 and spent + burn[crossed] > budget.limit_amount else None
+        budget_projections[str(budget.id)] = {
+            "budget_id": budget.id, "category_id": budget.category_id, "limit_amount": budget.limit_amount,
+            "window_start": start.isoformat(), "window_end": end.isoformat(), "spent": spent,
+            "projected_spent": projected_spent, "projected_overrun_date": overrun and overrun.isoformat(),
+            "will_exceed": projected_spent > budget.limit_amount,
+        }
+    return {"as_of": today.isoformat(), "months": months, "goals": goal_projections, "budgets": budget_projections}
+
+
+def refresh_forecast(db: Session, user_id: int, today: datetime.date = None) -> dict:
+    payload = compute_forecast(db, user_id, today)
+    db_forecast = db.get(UserForecast, user_id)
+    if db_forecast is None:
+        db_forecast = UserForecast(user_id=user_id)
+        db.add(db_forecast)
+    db_forecast.payload = payload
+    db_forecast.computed_at = datetime.datetime.utcnow()
+    db.commit()
+    return payload
+
+
+def get_forecast(db: Session, user_id: int, today: datetime.date = None):
+    # One primary key read. A forecast from an earlier day is treated as missing.
+    db_forecast = db.get(UserForecast, user_id)
+    today = today or datetime.date.today()
+    if db_forecast is None or db_forecast.payload.get("as_of") != today.isoformat():
+        return None
+    return db_forecast.payload
+
+
+def discard_forecast(db: Session, user_id: int):
+    # Every write to transactions, balances, goals or budgets drops the stored forecast, inside its
+    # own transaction; the next read computes a fresh one.
+    db.query(UserForecast).filter(UserForecast.user_id == user_id).delete(synchronize_session=False)
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused by the child.
+    from app.database import engine
+    engine.dispose(close=False)
+
+
+def forecast_users(user_ids: list, today: datetime.date = None) -> int:
+    from app.database import SessionLocal
+    with SessionLocal() as db:
+        for user_id in user_ids:
+            refresh_forecast(db, user_id, today)
+    return len(user_ids)
+
+
+def run_batch(db: Session, workers: int = None, user_ids: list = None, today: datetime.date = None,
+              batch_size: int = FORECAST_BATCH_SIZE) -> int:
+    user_ids = user_ids or [row[0] for row in db.query(User.id).order_by(User.id)]
+    db.close()
+    batches = [user_ids[start:start + batch_size] for start in range(0, len(user_ids), batch_size)]
+    if workers == 1:
+        return sum(forecast_users(batch, today) for batch in batches)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return sum(pool.map(forecast_users, batches, [today] * len(batches)))
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import logging
+import os
+from collections import Counter
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from app.database import SessionLocal
+from app.models import Notification, NotificationCounter
+from app.crud.aggregates import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_RETENTION_BATCH = int(os.getenv("NOTIFICATION_RETENTION_BATCH", "1000"))
+NOTIFICATION_RETENTION_INTERVAL = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL", "3600"))
+BUDGET_ALERT_TITLES = ("Budget Exceeded", "Budget Warning")
+BUDGET_ALERT_FIGURES = ". Limit:"
+
+
+def adjust_unread(db: Session, user_id: int, delta: int):
+    if not delta:
+        return
+    stmt = dialect_insert(db)(NotificationCounter).values(user_id=user_id, unread=max(delta, 0))
+    db.execute(stmt.on_conflict_do_update(index_elements=[NotificationCounter.user_id],
+                                          set_={"unread": NotificationCounter.unread + delta}))
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    counter = db.get(NotificationCounter, user_id)
+    return max(counter.unread, 0) if counter else 0
+
+
+def get_notifications(db: Session, user_id: int, before_id: int = None, limit: int = 100, unread: bool = False) -> list:
+    # Newest first, keyset paginated on id.
+    query = db.query(Notification).filter(Notification.user_id == user_id)
+    if unread:
+        query = query.filter(Notification.read_at.is_(None))
+    if before_id:
+        query = query.filter(Notification.id < before_id)
+    return query.order_by(Notification.id.desc()).limit(limit).all()
+
+
+def mark_read(db: Session, user_id: int, ids: list = None, up_to_id: int = None) -> int:
+    # Marks the given ids, or everything up to and including up_to_id, in one UPDATE. Only rows
+    # that were unread are returned, so the counter stays exact under concurrent requests.
+    stmt = update(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None))
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    if up_to_id is not None:
+        stmt = stmt.where(Notification.id <= up_to_id)
+    updated = len(db.execute(stmt.values(read_at=datetime.datetime.utcnow()).returning(Notification.id)).all())
+    adjust_unread(db, user_id, -updated)
+    db.commit()
+    return updated
+
+
+def _delete(db: Session, ids: list) -> int:
+    # Deletes one batch and moves the unread counters by the unread rows that actually went.
+    deleted = db.execute(delete(Notification).where(Notification.id.in_(ids))
+                         .returning(Notification.user_id, Notification.read_at)).all()
+    for user_id, count in Counter(user_id for user_id, read_at in deleted if read_at is None).items():
+        adjust_unread(db, user_id, -count)
+    db.commit()
+    return len(deleted)
+
+
+def purge_read(db: Session, before: datetime.datetime, batch_size: int = NOTIFICATION_RETENTION_BATCH) -> int:
+    # Short transactions of at most batch_size rows each, so no lock is held for long.
+    purged = 0
+    while True:
+        ids = db.scalars(select(Notification.id).where(Notification.read_at < before)
+                         .order_by(Notification.id).limit(batch_size)).all()
+        if ids:
+            purged += _delete(db, ids)
+        if len(ids) < batch_size:
+            return purged
+
+
+def budget_alert(category: str, limit: float, spent: float, threshold: float = 1.0) -> tuple:
+    # (title, message); _alert_subject reads the subject back as the text before the figures.
+    if threshold < 1:
+        title, subject = "Budget Warning", f"{threshold:.0%} of budget reached for category '{category}'"
+    elif threshold > 1:
+        title, subject = "Budget Exceeded", f"{threshold:.0%} of budget exceeded for category '{category}'"
+    else:
+        title, subject = "Budget Exceeded", f"Budget exceeded for category '{category}'"
+    return title, f"{subject}{BUDGET_ALERT_FIGURES} {limit}, Spent: {spent}"
+
+
+def _alert_subject(title: str, message: str) -> tuple:
+    # "Budget exceeded for category 'Food'. Limit: 100, Spent: 120" -> the part before the figures.
+    return title, message.split(BUDGET_ALERT_FIGURES)[0]
+
+
+def collapse_alerts(db: Session, batch_size: int = NOTIFICATION_RETENTION_BATCH) -> int:
+    # Budget alerts written before dedup keys existed repeat once per expense. Only the newest
+    # alert per user and subject is kept.
+    user_ids = db.scalars(select(Notification.user_id).where(Notification.dedup_key.is_(None),
+                                                             Notification.title.in_(BUDGET_ALERT_TITLES)).distinct()).all()
+    collapsed = 0
+    for user_id in user_ids:
+        seen, duplicates, after = set(), [], None
+        while True:
+            query = select(Notification.id, Notification.title, Notification.message)\
+                .where(Notification.user_id == user_id, Notification.dedup_key.is_(None),
+                       Notification.title.in_(BUDGET_ALERT_TITLES))
+            if after is not None:
+                query = query.where(Notification.id < after)
+            rows = db.execute(query.order_by(Notification.id.desc()).limit(batch_size)).all()
+            for id, title, message in rows:
+                subject = _alert_subject(title, message)
+                if subject in seen:
+                    duplicates.append(id)
+                seen.add(subject)
+            db.commit()
+            if len(rows) < batch_size:
+                break
+            after = rows[-1][0]
+        for start in range(0, len(duplicates), batch_size):
+            collapsed += _delete(db, duplicates[start:start + batch_size])
+    return collapsed
+
+
+def compact_notifications(db: Session, retention_days: int = NOTIFICATION_RETENTION_DAYS,
+                          batch_size: int = NOTIFICATION_RETENTION_BATCH) -> dict:
+    before = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+    return {"collapsed": collapse_alerts(db, batch_size), "purged": purge_read(db, before, batch_size)}
+
+
+class NotificationRetention:
+    def __init__(self, session_factory, interval: float = NOTIFICATION_RETENTION_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.last_run = None
+        self._task = None
+
+    async def run(self) -> dict:
+        def compact():
+            with self.session_factory() as db:
+                return compact_notifications(db)
+        result = await asyncio.to_thread(compact)
+        self.last_run = {"at": datetime.datetime.utcnow().isoformat(), **result}
+        if result["collapsed"] or result["purged"]:
+            logger.info("Notification retention: collapsed %s, purged %s", result["collapsed"], result["purged"])
+        return result
+
+    async def _monitor(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logger.warning("Notification retention failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+notification_retention = NotificationRetention(SessionLocal)
@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import logging
+import os
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select
+from app.database import SessionLocal
+from app.models import OutboxDeadLetter, OutboxEvent
+from app.crud.aggregates import dialect_insert
+from app.crud.budgets import evaluate_budgets
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY", "5"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+# In-app drain for single-process setups; set to 0 when app.outbox_worker runs separately.
+OUTBOX_APP_INTERVAL = float(os.getenv("OUTBOX_APP_INTERVAL", "1"))
+
+
+def enqueue(db: Session, user_id: int, kind: str, payload: dict, idempotency_key: str):
+    # Part of the caller's transaction: the event exists if and only if the write committed.
+    # Enqueueing the same key twice is a no-op.
+    stmt = dialect_insert(db)(OutboxEvent).values(user_id=user_id, kind=kind, payload=payload, idempotency_key=idempotency_key,
+                                                  attempts=0, available_at=datetime.datetime.utcnow())
+    db.execute(stmt.on_conflict_do_nothing(index_elements=[OutboxEvent.idempotency_key]))
+
+
+def enqueue_budget_check(db: Session, user_id: int, affected: dict, transaction_id: int):
+    # affected: {category_id: {dates}} as for evaluate_budgets; keyed by the first transaction the write created.
+    if affected:
+        payload = {"categories": {str(category_id): sorted(date.isoformat() for date in dates)
+                                  for category_id, dates in affected.items()}}
+        enqueue(db, user_id, "budget_check", payload, f"budget_check:{user_id}:{transaction_id}")
+
+
+def _check_budgets(db: Session, user_id: int, payloads: list):
+    # All of a user's pending checks in the batch become one evaluation.
+    affected = defaultdict(set)
+    for payload in payloads:
+        for category_id, dates in payload["categories"].items():
+            affected[int(category_id)].update(datetime.date.fromisoformat(date) for date in dates)
+    evaluate_budgets(db, user_id, affected, commit=False)
+
+
+HANDLERS = {"budget_check": _check_budgets}
+
+
+def _claim(db: Session, batch_size: int, now: datetime.datetime) -> list:
+    # SKIP LOCKED lets several workers drain the outbox without handling an event twice.
+    return db.query(OutboxEvent).filter(OutboxEvent.available_at <= now)\
+        .order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+
+def _retry(db: Session, events: list, error: Exception, now: datetime.datetime) -> int:
+    # Exponential backoff; after OUTBOX_MAX_ATTEMPTS the events move to the dead letter table.
+    dead = 0
+    for event in events:
+        event.attempts += 1
+        event.last_error = f"{type(error).__name__}: {error}"[:500]
+        if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+            db.add(OutboxDeadLetter(user_id=event.user_id, kind=event.kind, payload=event.payload,
+                                    idempotency_key=event.idempotency_key, attempts=event.attempts,
+                                    last_error=event.last_error, created_at=event.created_at, failed_at=now))
+            db.delete(event)
+            dead += 1
+        else:
+            event.available_at = now + datetime.timedelta(seconds=OUTBOX_RETRY_DELAY * 2 ** (event.attempts - 1))
+    return dead
+
+
+def drain_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE, now: datetime.datetime = None) -> dict:
+    # One transaction per batch: each user's side effects run in a savepoint and their events are
+    # deleted in the same commit, so a crash leaves them pending rather than half applied.
+    now = now or datetime.datetime.utcnow()
+    events = _claim(db, batch_size, now)
+    groups = defaultdict(list)
+    for event in events:
+        groups[(event.kind, event.user_id)].append(event)
+    done, retried, dead = [], 0, 0
+    for (kind, user_id), group in groups.items():
+        # Notification pushes queued by a failed group must not go out with the batch's commit.
+        queued = len(db.info.get("notification_events", ()))
+        try:
+            with db.begin_nested():
+                HANDLERS[kind](db, user_id, [event.payload for event in group])
+            done.extend(event.id for event in group)
+        except Exception as e:
+            del db.info.get("notification_events", [])[queued:]
+            logger.warning("Outbox %s for user %s failed: %s", kind, user_id, e)
+            group_dead = _retry(db, group, e, now)
+            dead += group_dead
+            retried += len(group) - group_dead
+    if done:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(done)))
+    db.commit()
+    return {"claimed": len(events), "processed": len(done), "retried": retried, "dead": dead}
+
+
+def drain(db: Session, batch_size: int = OUTBOX_BATCH_SIZE, max_batches: int = None) -> dict:
+    # Batches until the due events run out; events waiting for a retry are left for later passes.
+    totals = {"processed": 0, "retried": 0, "dead": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = drain_batch(db, batch_size)
+        batches += 1
+        for key in totals:
+            totals[key] += result[key]
+        if result["claimed"] < batch_size:
+            break
+    return totals
+
+
+def requeue_dead_letters(db: Session, ids: list = None) -> int:
+    # Dead letters go back to the outbox with a fresh attempt count.
+    query = select(OutboxDeadLetter)
+    if ids:
+        query = query.where(OutboxDeadLetter.id.in_(ids))
+    letters = db.scalars(query.order_by(OutboxDeadLetter.id)).all()
+    for letter in letters:
+        enqueue(db, letter.user_id, letter.kind, letter.payload, letter.idempotency_key)
+        db.delete(letter)
+    db.commit()
+    return len(letters)
+
+
+def outbox_stats(db: Session) -> dict:
+    now = datetime.datetime.utcnow()
+    pending, oldest = db.query(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).one()
+    return {
+        "pending": pending,
+        "due": db.query(func.count(OutboxEvent.id)).filter(OutboxEvent.available_at <= now).scalar(),
+        "retrying": db.query(func.count(OutboxEvent.id)).filter(OutboxEvent.attempts > 0).scalar(),
+        "dead_letters": db.query(func.count(OutboxDeadLetter.id)).scalar(),
+        "oldest_age_seconds": (now - oldest).total_seconds() if oldest else None,
+    }
+
+
+class OutboxDrainer:
+    def __init__(self, session_factory, interval: float = OUTBOX_APP_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.last_run = None
+        self._task = None
+
+    async def run(self) -> dict:
+        def run_drain():
+            with self.session_factory() as db:
+                return drain(db)
+        result = await asyncio.to_thread(run_drain)
+        if any(result.values()):
+            self.last_run = {"at": datetime.datetime.utcnow().isoformat(), **result}
+        return result
+
+    async def _monitor(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logger.warning("Outbox drain failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox_drainer = OutboxDrainer(SessionLocal)
@@ -0,0 +1,177 @@
+import calendar
+import datetime
+import os
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from app.models import Account, Category, RecurringRule, Transaction, TransactionCategory, TransactionType
+from app.schemas.finance import RecurringRuleCreate
+from app.crud.aggregates import new_deltas, add_delta, apply_deltas
+from app.crud.outbox import enqueue_budget_check
+from app.crud.forecasting import discard_forecast
+from app.core.response_cache import analytics_cache
+
+RECURRING_RULE_CHUNK_SIZE = int(os.getenv("RECURRING_RULE_CHUNK_SIZE", "500"))
+
+
+def _shift_months(date: datetime.date, months: int) -> datetime.date:
+    # Keeps the day of month, clamped to the month's length (Jan 31 -> Feb 28 -> Mar 31).
+    index = date.year * 12 + date.month - 1 + months
+    year, month = index // 12, index % 12 + 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(rule: RecurringRule, n: int) -> datetime.date:
+    # The n-th occurrence (from 0) is always computed from start_date, so month-end clamping never drifts.
+    step = n * rule.interval
+    if rule.frequency == "daily":
+        return rule.start_date + datetime.timedelta(days=step)
+    if rule.frequency == "weekly":
+        return rule.start_date + datetime.timedelta(weeks=step)
+    return _shift_months(rule.start_date, step * (12 if rule.frequency == "yearly" else 1))
+
+
+def _next_date(rule: RecurringRule, n: int):
+    date = occurrence(rule, n)
+    return None if rule.end_date and date > rule.end_date else date
+
+
+def _first_after(rule: RecurringRule, after: datetime.date = None) -> int:
+    if after is None:
+        return 0
+    n = 0
+    while occurrence(rule, n) <= after:
+        n += 1
+    return n
+
+
+def _validate(db: Session, rule: RecurringRuleCreate, user_id: int):
+    if rule.interval < 1:
+        raise ValueError("interval must be at least 1")
+    if rule.end_date and rule.end_date < rule.start_date:
+        raise ValueError("end_date must not be before start_date")
+    if not db.query(Account.id).filter(Account.id == rule.account_id, Account.user_id == user_id).first():
+        raise ValueError("Account not found")
+    category_ids = {tc.category_id for tc in rule.categories}
+    known = {row[0] for row in db.query(Category.id).filter(Category.id.in_(category_ids))} if category_ids else set()
+    missing = [category_id for category_id in category_ids if category_id not in known]
+    if missing:
+        raise ValueError(f"Category with id {missing[0]} not found")
+
+
+def _apply_rule(db_rule: RecurringRule, rule: RecurringRuleCreate):
+    db_rule.account_id = rule.account_id
+    db_rule.amount = rule.amount
+    db_rule.type = TransactionType(rule.type.value)
+    db_rule.description = rule.description
+    db_rule.categories = [{"category_id": tc.category_id, "allocated_amount": tc.allocated_amount} for tc in rule.categories]
+    db_rule.frequency = rule.frequency.value
+    db_rule.interval = rule.interval
+    db_rule.start_date = rule.start_date
+    db_rule.end_date = rule.end_date
+    db_rule.active = rule.active
+    # A changed schedule continues after the last posted occurrence; nothing is posted twice.
+    db_rule.occurrence_count = _first_after(db_rule, db_rule.last_date)
+    db_rule.next_date = _next_date(db_rule, db_rule.occurrence_count)
+
+
+def create_recurring_rule(db: Session, rule: RecurringRuleCreate, user_id: int):
+    _validate(db, rule, user_id)
+    db_rule = RecurringRule(user_id=user_id)
+    _apply_rule(db_rule, rule)
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def get_recurring_rules(db: Session, user_id: int):
+    return db.query(RecurringRule).filter(RecurringRule.user_id == user_id).order_by(RecurringRule.id).all()
+
+
+def get_recurring_rule(db: Session, rule_id: int, user_id: int):
+    return db.query(RecurringRule).filter(RecurringRule.id == rule_id, RecurringRule.user_id == user_id).first()
+
+
+def update_recurring_rule(db: Session, rule_id: int, rule: RecurringRuleCreate, user_id: int):
+    db_rule = get_recurring_rule(db, rule_id, user_id)
+    if db_rule:
+        _validate(db, rule, user_id)
+        _apply_rule(db_rule, rule)
+        db.commit()
+        db.refresh(db_rule)
+    return db_rule
+
+
+def delete_recurring_rule(db: Session, rule_id: int, user_id: int) -> bool:
+    db_rule = get_recurring_rule(db, rule_id, user_id)
+    if db_rule:
+        db.delete(db_rule)
+        db.commit()
+        return True
+    return False
+
+
+def _due_rules(db: Session, today: datetime.date, chunk_size: int, user_id: int = None) -> list:
+    # SKIP LOCKED lets several scheduler processes share the work without posting the same rule twice.
+    query = db.query(RecurringRule).filter(RecurringRule.active.is_(True), RecurringRule.next_date <= today)
+    if user_id:
+        query = query.filter(RecurringRule.user_id == user_id)
+    return query.order_by(RecurringRule.id).limit(chunk_size).with_for_update(skip_locked=True).all()
+
+
+def materialize_chunk(db: Session, rules: list, today: datetime.date) -> tuple:
+    # Every due occurrence of the chunk's rules goes into one insert; rollups, rule cursors, the
+    # budget checks for the outbox and the forecast discard are written in the same commit.
+    # Returns the number posted.
+    rows, cursors = [], []
+    for rule in rules:
+        n, date = rule.occurrence_count, rule.next_date
+        while date is not None and date <= today:
+            rows.append((rule, date))
+            n += 1
+            date = _next_date(rule, n)
+        cursors.append({"id": rule.id, "occurrence_count": n, "next_date": date, "last_date": rows[-1][1]})
+    ids = db.scalars(
+        insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+        [{"user_id": rule.user_id, "account_id": rule.account_id, "amount": rule.amount, "date": date,
+          "description": rule.description, "type": rule.type} for rule, date in rows]
+    ).all()
+    category_rows = [
+        {"transaction_id": transaction_id, "category_id": tc["category_id"], "transaction_date": date,
+         "allocated_amount": tc["allocated_amount"]}
+        for transaction_id, (rule, date) in zip(ids, rows) for tc in rule.categories
+    ]
+    if category_rows:
+        db.execute(insert(TransactionCategory), category_rows)
+    deltas, affected, first_ids = defaultdict(new_deltas), defaultdict(dict), {}
+    for transaction_id, (rule, date) in zip(ids, rows):
+        categories = [(tc["category_id"], tc["allocated_amount"]) for tc in rule.categories]
+        add_delta(deltas[rule.user_id], rule.account_id, date, rule.type, rule.amount, categories=categories)
+        first_ids.setdefault(rule.user_id, transaction_id)
+        if rule.type == TransactionType.expense:
+            for category_id, _ in categories:
+                affected[rule.user_id].setdefault(category_id, set()).add(date)
+    for user_id, user_deltas in deltas.items():
+        apply_deltas(db, user_id, user_deltas)
+        enqueue_budget_check(db, user_id, affected.get(user_id), first_ids[user_id])
+        discard_forecast(db, user_id)
+    db.execute(update(RecurringRule), cursors)
+    db.commit()
+    for user_id in deltas:
+        analytics_cache.invalidate(user_id, "transactions")
+    return len(rows)
+
+
+def materialize_due(db: Session, today: datetime.date = None, chunk_size: int = RECURRING_RULE_CHUNK_SIZE,
+                    user_id: int = None) -> int:
+    # Posts every occurrence due on or before `today`. Safe to rerun or to run concurrently: an
+    # occurrence is posted in the same commit that advances its rule past it.
+    today = today or datetime.date.today()
+    posted = 0
+    while True:
+        rules = _due_rules(db, today, chunk_size, user_id)
+        if not rules:
+            db.commit()
+            return posted
+        posted += materialize_chunk(db, rules, today)
@@ -0,0 +1,166 @@
+import argparse
+import datetime
+import random
+import re
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+from app.database import engine
+from app.core import partitions
+from app.models import (
+    User, Account, Transaction, Category, TransactionCategory, Budget, Notification, AccountPeriodTotal, TransactionType
+)
+from app.crud.budgets import _spent_query
+from app.crud.finance import _transactions_query
+
+
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (\w+)(?! USING)", re.M),
+}
+HOT_TABLES = {"transactions", "transaction_categories", "notifications", "budgets", "account_period_totals"}
+PARTITION_SUFFIX = re.compile(r"_(\d{4}_\d{2}|default)$")
+PARTITION_SCAN = re.compile(r"\bon ((?:transactions|transaction_categories)_(?:\d{4}_\d{2}|default))\b")
+SEED_START = datetime.date(2020, 1, 1)
+SEED_DAYS = 5 * 365
+
+
+def seed(db: Session, users: int, transactions_per_user: int):
+    rng = random.Random(42)
+    user_ids = db.scalars(insert(User).returning(User.id), [
+        {"username": f"explain_{i}_{rng.random()}", "email": f"explain_{i}_{rng.random()}@example.com", "hashed_password": "x"}
+        for i in range(users)
+    ]).all()
+    category_ids = db.scalars(insert(Category).returning(Category.id), [
+        {"name": f"explain_{i}_{rng.random()}"} for i in range(20)
+    ]).all()
+    account_ids = db.scalars(insert(Account).returning(Account.id), [
+        {"user_id": user_id, "name": "explain", "balance": 0.0, "opening_balance": 0.0} for user_id in user_ids
+    ]).all()
+    start = SEED_START
+    for user_id, account_id in zip(user_ids, account_ids):
+        rows = [{
+            "user_id": user_id,
+            "account_id": account_id,
+            "amount": rng.uniform(1, 500),
+            "date": start + datetime.timedelta(days=rng.randint(0, SEED_DAYS)),
+            "type": rng.choice(list(TransactionType)),
+        } for _ in range(transactions_per_user)]
+        transaction_ids = db.scalars(insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), rows).all()
+        db.execute(insert(TransactionCategory), [
+            {"transaction_id": transaction_id, "category_id": rng.choice(category_ids), "transaction_date": row["date"],
+             "allocated_amount": row["amount"]}
+            for transaction_id, row in zip(transaction_ids, rows)
+        ])
+        totals = {}
+        for row in rows:
+            key = (account_id, row["date"].strftime("%Y-%m"), row["type"])
+            total, count = totals.get(key, (0.0, 0))
+            totals[key] = (total + row["amount"], count + 1)
+        db.execute(insert(AccountPeriodTotal), [
+            {"account_id": key[0], "month": key[1], "type": key[2], "user_id": user_id, "total": total, "count": count}
+            for key, (total, count) in totals.items()
+        ])
+        db.execute(insert(Notification), [
+            {"user_id": user_id, "title": "explain", "message": "explain",
+             "created_at": datetime.datetime(2020, 1, 1) + datetime.timedelta(hours=i)} for i in range(50)
+        ])
+        db.execute(insert(Budget), [
+            {"user_id": user_id, "category_id": category_id, "period": "monthly", "limit_amount": 100.0}
+            for category_id in category_ids
+        ])
+    db.flush()
+    return user_ids[len(user_ids) // 2], category_ids[0]
+
+
+def hot_queries(db: Session, user_id: int, category_id: int) -> dict:
+    budget = Budget(id=0, user_id=user_id, category_id=category_id)
+    window = (datetime.date(2022, 1, 1), datetime.date(2022, 1, 31))
+    return {
+        "get_transactions": _transactions_query(db, user_id).limit(100).statement,
+        "get_transactions filtered": _transactions_query(
+            db, user_id, date_from=window[0], date_to=window[1], type=TransactionType.expense
+        ).limit(100).statement,
+        "evaluate_budgets": _spent_query(0, budget, window),
+        "get_dashboard_summary": select(AccountPeriodTotal.type, func.sum(AccountPeriodTotal.total))
+            .where(AccountPeriodTotal.user_id == user_id).group_by(AccountPeriodTotal.type),
+        "get_spending_trends": select(AccountPeriodTotal.month, func.sum(AccountPeriodTotal.total))
+            .where(AccountPeriodTotal.user_id == user_id, AccountPeriodTotal.type == TransactionType.expense)
+            .group_by(AccountPeriodTotal.month),
+        "get_notifications": select(Notification).where(Notification.user_id == user_id)
+            .order_by(Notification.id.desc()).limit(50),
+        "get_budgets": select(Budget).where(Budget.user_id == user_id, Budget.category_id.in_([category_id])),
+    }
+
+
+def pruned_queries(db: Session, user_id: int, category_id: int) -> dict:
+    # Date bounded queries and the number of monthly partitions per table each may touch.
+    budget = Budget(id=0, user_id=user_id, category_id=category_id)
+    window = (datetime.date(2022, 1, 1), datetime.date(2022, 1, 31))
+    return {
+        "get_transactions filtered": (_transactions_query(
+            db, user_id, date_from=window[0], date_to=window[1], type=TransactionType.expense
+        ).limit(100).statement, 1),
+        "get_transactions by category": (_transactions_query(
+            db, user_id, date_from=window[0], date_to=window[1], category_id=category_id
+        ).limit(100).statement, 1),
+        "evaluate_budgets": (_spent_query(0, budget, window), 1),
+        "get_transaction_rows categories": (select(TransactionCategory.transaction_id).where(
+            TransactionCategory.transaction_id.in_([1, 2, 3]),
+            TransactionCategory.transaction_date.between(window[0], window[1])
+        ), 1),
+    }
+
+
+def explain(db: Session, statement) -> str:
+    dialect = db.get_bind().dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.execute(text(prefix + sql)).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed data in a rolled back transaction and check hot finance queries use indexes and prune partitions")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transactions-per-user", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    pattern = SEQ_SCAN_PATTERNS.get(engine.dialect.name)
+    if pattern is None:
+        raise SystemExit(f"Unsupported dialect: {engine.dialect.name}")
+    failures = 0
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        db = Session(bind=connection)
+        try:
+            partitioned = partitions.is_partitioned(connection)
+            if partitioned:
+                partitions.ensure_partitions(connection, SEED_START, SEED_START + datetime.timedelta(days=SEED_DAYS))
+            user_id, category_id = seed(db, args.users, args.transactions_per_user)
+            db.execute(text("ANALYZE"))
+            for name, statement in hot_queries(db, user_id, category_id).items():
+                plan = explain(db, statement)
+                scans = HOT_TABLES.intersection(PARTITION_SUFFIX.sub("", table) for table in pattern.findall(plan))
+                failures += bool(scans)
+                print(f"{'FAIL' if scans else 'ok':4} {name}" + (f" (sequential scan on {', '.join(sorted(scans))})" if scans else ""))
+                if args.verbose or scans:
+                    print("     " + plan.replace("\n", "\n     "))
+            for name, (statement, months) in (pruned_queries(db, user_id, category_id).items() if partitioned else ()):
+                plan = explain(db, statement)
+                scanned = set(PARTITION_SCAN.findall(plan))
+                per_table = {}
+                for table in scanned:
+                    per_table[PARTITION_SUFFIX.sub("", table)] = per_table.get(PARTITION_SUFFIX.sub("", table), 0) + 1
+                unpruned = any(count > months for count in per_table.values())
+                failures += unpruned
+                print(f"{'FAIL' if unpruned else 'ok':4} {name} prunes to {', '.join(sorted(scanned)) or 'no partitions'}")
+                if args.verbose or unpruned:
+                    print("     " + plan.replace("\n", "\n     "))
+        finally:
+            db.close()
+            transaction.rollback()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
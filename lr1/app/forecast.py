@@ -0,0 +1,26 @@
+import argparse
+import datetime
+import time
+from app.database import SessionLocal
+from app.crud.forecasting import run_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute cashflow, goal and budget forecasts for every user (run nightly)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 runs in-process)")
+    parser.add_argument("--user-id", type=int, nargs="+", default=None)
+    parser.add_argument("--batch-size", type=int, default=100, help="users per worker task")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=None, help="forecast date (default: today)")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        count = run_batch(db, workers=args.workers, user_ids=args.user_id, today=args.as_of, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"{count} forecast(s) stored in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import time
+from sqlalchemy import create_engine, text
+from app.core.request_metrics import RequestMetrics, RequestMetricsMiddleware, instrument_engine
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def endpoint(engine=None, statements: int = 0):
+    async def app(scope, receive, send):
+        if statements:
+            with engine.connect() as connection:
+                for _ in range(statements):
+                    connection.execute(text("SELECT 1")).all()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+
+async def measure(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/finance/transactions", "query_string": b"", "headers": []}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request and per-statement cost of request instrumentation")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--statements", type=int, default=10, help="SQL statements per request in the SQL cases")
+    parser.add_argument("--rounds", type=int, default=5, help="cases run interleaved, best round kept")
+    args = parser.parse_args()
+    plain, instrumented = create_engine("sqlite://"), create_engine("sqlite://")
+    instrument_engine(instrumented)
+    sql_requests = max(args.requests // args.statements, 1)
+    cases = [
+        ("no SQL, bare", endpoint(), args.requests, None),
+        ("no SQL, instrumented", RequestMetricsMiddleware(endpoint(), RequestMetrics(), slow_seconds=0), args.requests, 0),
+        (f"{args.statements} SQL, bare", endpoint(plain, args.statements), sql_requests, None),
+        (f"{args.statements} SQL, instrumented", RequestMetricsMiddleware(endpoint(instrumented, args.statements), RequestMetrics(),
+                                                        slow_seconds=0), sql_requests, 2),
+        (f"{args.statements} SQL, slow log capture", RequestMetricsMiddleware(endpoint(instrumented, args.statements), RequestMetrics(),
+                                                            slow_seconds=3600), sql_requests, 2),
+    ]
+    loop = asyncio.new_event_loop()
+    # Cases are interleaved and the best round kept, so background noise hits every case alike.
+    timings = [float("inf")] * len(cases)
+    for _ in range(args.rounds):
+        for index, (name, app, requests, baseline) in enumerate(cases):
+            timings[index] = min(timings[index], loop.run_until_complete(measure(app, requests)))
+    print(f"{'case':32} {'us/request':>11} {'overhead us':>12} {'us/statement':>13}")
+    for (name, app, requests, baseline), elapsed in zip(cases, timings):
+        overhead = elapsed - timings[baseline] if baseline is not None else 0.0
+        per_statement = (overhead - (timings[1] - timings[0])) / args.statements if baseline == 2 else 0.0
+        print(f"{name:32} {elapsed * 1e6:11.2f} {overhead * 1e6:12.2f} {per_statement * 1e6:13.2f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
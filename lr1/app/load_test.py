@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import time
+import uuid
+import httpx
+
+
+async def prepare(client: httpx.AsyncClient) -> dict:
+    username = f"load_{uuid.uuid4().hex[:8]}"
+    await client.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "secret"})
+    response = await client.post("/auth/login", data={"username": username, "password": "secret"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    account = (await client.post("/finance/accounts", json={"name": "load", "balance": 0}, headers=headers)).json()
+    await client.post("/finance/transactions/bulk", headers=headers, json=[
+        {"account_id": account["id"], "amount": 10.0 + i, "type": "expense" if i % 3 else "income"} for i in range(200)
+    ])
+    return headers
+
+
+async def run_level(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int, requests: int) -> dict:
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                errors += response.status_code >= 400
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+        "errors": errors,
+    }
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        headers = await prepare(client)
+        print(f"{'path':32} {'clients':>8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for path in args.paths:
+            for concurrency in args.concurrency:
+                result = await run_level(client, path, headers, concurrency, max(args.requests, concurrency * 5))
+                print(f"{path:32} {concurrency:8} {result['rps']:10.1f} {result['p50']:9.1f} {result['p99']:9.1f} {result['errors']:7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of a running API at several client counts")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--paths", nargs="+", default=["/finance/dashboard", "/finance/transactions", "/finance/accounts"])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import datetime
 import enum
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Enum, ForeignKey, Index, JSON, Boolean, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -24,25 +24,64 @@ class User(Base):
 
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        Index("ix_accounts_user_id", "user_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
     balance = Column(Float, default=0.0)
+    opening_balance = Column(Float, default=0.0)
     user = relationship("User", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account", cascade="all, delete-orphan")
+    period_totals = relationship("AccountPeriodTotal", back_populates="account", cascade="all, delete-orphan")
+    recurring_rules = relationship("RecurringRule", back_populates="account", cascade="all, delete-orphan")
 
+# On PostgreSQL transactions and transaction_categories are range partitioned by month (see the
+# partition_transactions_by_month migration and app.core.partitions). The primary keys there include
+# the partition column; ids still come from one sequence, so the ORM keeps identifying rows by id.
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_date_id", "user_id", "date", "id"),
+        Index("ix_transactions_user_type_date", "user_id", "type", "date", postgresql_include=["amount"]),
+        Index("ix_transactions_account_id", "account_id"),
+        {"sqlite_autoincrement": True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
     amount = Column(Float, nullable=False)
-    date = Column(Date, default=datetime.date.today)
+    date = Column(Date, nullable=False, default=datetime.date.today)
     description = Column(String)
     type = Column(Enum(TransactionType), nullable=False)
     user = relationship("User", back_populates="transactions")
     account = relationship("Account", back_populates="transactions")
-    transaction_categories = relationship("TransactionCategory", back_populates="transaction", cascade="all, delete-orphan")
+    transaction_categories = relationship("TransactionCategory", back_populates="transaction", cascade="all, delete-orphan",
+                                          order_by="TransactionCategory.category_id")
+
+# Months of a user's history moved to cold storage (app.crud.archive). The rows live in the
+# versioned file named by (user_id, month, version); the rollups for the month stay in place.
+class ArchivedMonth(Base):
+    __tablename__ = "archived_months"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    version = Column(String, nullable=False)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class AccountPeriodTotal(Base):
+    __tablename__ = "account_period_totals"
+    __table_args__ = (
+        Index("ix_account_period_totals_user_type_month", "user_id", "type", "month", postgresql_include=["total", "count"]),
+    )
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    type = Column(Enum(TransactionType), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    account = relationship("Account", back_populates="period_totals")
 
 class Category(Base):
     __tablename__ = "categories"
@@ -51,17 +90,35 @@ class Category(Base):
     description = Column(String, nullable=True)
     transaction_categories = relationship("TransactionCategory", back_populates="category", cascade="all, delete-orphan")
     budgets = relationship("Budget", back_populates="category", cascade="all, delete-orphan")
+    period_totals = relationship("CategoryPeriodTotal", back_populates="category", cascade="all, delete-orphan")
+
+class CategoryPeriodTotal(Base):
+    __tablename__ = "category_period_totals"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    category = relationship("Category", back_populates="period_totals")
 
 class TransactionCategory(Base):
     __tablename__ = "transaction_categories"
+    __table_args__ = (
+        Index("ix_transaction_categories_category_transaction", "category_id", "transaction_id",
+              postgresql_include=["allocated_amount"]),
+    )
     transaction_id = Column(Integer, ForeignKey("transactions.id"), primary_key=True)
     category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    transaction_date = Column(Date, nullable=False)
     allocated_amount = Column(Float, nullable=False)
     transaction = relationship("Transaction", back_populates="transaction_categories")
     category = relationship("Category", back_populates="transaction_categories")
 
 class Budget(Base):
     __tablename__ = "budgets"
+    __table_args__ = (
+        Index("ix_budgets_user_category", "user_id", "category_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
@@ -74,6 +131,9 @@ class Budget(Base):
 
 class Goal(Base):
     __tablename__ = "goals"
+    __table_args__ = (
+        Index("ix_goals_user_id", "user_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
@@ -82,11 +142,90 @@ class Goal(Base):
     due_date = Column(Date, nullable=True)
     user = relationship("User", back_populates="goals")
 
+# Materialized by app.crud.recurring. occurrence_count is how many occurrences have been posted and
+# next_date the next one due (None once the rule has ended); both advance in the same commit as the
+# inserted transactions, so a restarted scheduler never posts an occurrence twice.
+class RecurringRule(Base):
+    __tablename__ = "recurring_rules"
+    __table_args__ = (
+        Index("ix_recurring_rules_user_id", "user_id"),
+        Index("ix_recurring_rules_next_date", "next_date"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    type = Column(Enum(TransactionType), nullable=False)
+    description = Column(String, nullable=True)
+    categories = Column(JSON, nullable=False, default=list)
+    frequency = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)
+    active = Column(Boolean, nullable=False, default=True)
+    occurrence_count = Column(Integer, nullable=False, default=0)
+    next_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    account = relationship("Account", back_populates="recurring_rules")
+
+# Precomputed by app.crud.forecasting (nightly batch or on first read); one row per user.
+class UserForecast(Base):
+    __tablename__ = "user_forecasts"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    payload = Column(JSON, nullable=False)
+
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_user_unread", "user_id", "id",
+              postgresql_where=text("read_at IS NULL"), sqlite_where=text("read_at IS NULL")),
+        Index("ix_notifications_read_at", "read_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
     message = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    dedup_key = Column(String, unique=True, nullable=True)
+    read_at = Column(DateTime, nullable=True)
     user = relationship("User", back_populates="notifications")
+
+# Unread notifications per user, kept in step with inserts, mark-read and retention (app.crud.notifications)
+# so the unread badge is a primary key read instead of a COUNT(*).
+class NotificationCounter(Base):
+    __tablename__ = "notification_counters"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+
+# Side effects of writes (budget checks and the alerts they raise), inserted in the same
+# transaction as the write and drained by app.crud.outbox.
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_available_at", "available_at", "id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    available_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Outbox events that kept failing; kept for inspection and requeued by hand.
+class OutboxDeadLetter(Base):
+    __tablename__ = "outbox_dead_letters"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    idempotency_key = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, default=datetime.datetime.utcnow)
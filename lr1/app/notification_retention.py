@@ -0,0 +1,20 @@
+import argparse
+import json
+from app.database import SessionLocal
+from app.crud.notifications import compact_notifications, NOTIFICATION_RETENTION_BATCH, NOTIFICATION_RETENTION_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collapse repeated budget alerts and purge old read notifications")
+    parser.add_argument("--retention-days", type=int, default=NOTIFICATION_RETENTION_DAYS,
+                        help="delete read notifications older than this many days")
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATION_RETENTION_BATCH, help="rows per transaction")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        result = compact_notifications(db, retention_days=args.retention_days, batch_size=args.batch_size)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+import argparse
+import json
+import logging
+import signal
+import threading
+from app.database import SessionLocal
+from app.crud.outbox import drain, outbox_stats, requeue_dead_letters, OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def run(interval: float = OUTBOX_POLL_INTERVAL, batch_size: int = OUTBOX_BATCH_SIZE, stop: threading.Event = None,
+        once: bool = False, session_factory=SessionLocal) -> int:
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set():
+        with session_factory() as db:
+            try:
+                result = drain(db, batch_size)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Outbox drain failed: %s", e)
+                result = {"processed": 0, "retried": 0, "dead": 0}
+        if any(result.values()):
+            logger.info("Outbox: processed %(processed)s, retried %(retried)s, dead-lettered %(dead)s", result)
+        processed += result["processed"]
+        if once:
+            break
+        stop.wait(interval)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process outbox events (budget checks and alerts) for all users")
+    parser.add_argument("--once", action="store_true", help="drain what is due and exit (for cron)")
+    parser.add_argument("--interval", type=float, default=OUTBOX_POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE, help="events per transaction")
+    parser.add_argument("--stats", action="store_true", help="print the outbox backlog and exit")
+    parser.add_argument("--requeue", type=int, nargs="*", metavar="ID",
+                        help="move dead letters (all, or the given ids) back to the outbox and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.stats or args.requeue is not None:
+        with SessionLocal() as db:
+            if args.requeue is not None:
+                print(f"{requeue_dead_letters(db, args.requeue)} dead letter(s) requeued")
+            else:
+                print(json.dumps(outbox_stats(db)))
+        return 0
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    processed = run(args.interval, args.batch_size, stop=stop, once=args.once)
+    print(f"{processed} outbox event(s) processed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
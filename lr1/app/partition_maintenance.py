@@ -0,0 +1,24 @@
+import argparse
+import json
+from app.database import engine
+from app.core import partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming monthly transaction partitions and archive old ones")
+    parser.add_argument("--months-ahead", type=int, default=partitions.PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--retention-months", type=int, default=partitions.PARTITION_RETENTION_MONTHS,
+                        help="detach partitions older than this many months (0 keeps everything)")
+    parser.add_argument("--drop", action="store_true", help="drop detached partitions instead of moving them to the archive schema")
+    args = parser.parse_args()
+    with engine.begin() as connection:
+        if not partitions.is_partitioned(connection):
+            raise SystemExit("transactions is not a partitioned table (run the Alembic migrations on PostgreSQL)")
+        result = partitions.maintain(connection, months_ahead=args.months_ahead,
+                                     retention_months=args.retention_months, drop=args.drop)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
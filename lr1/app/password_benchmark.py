@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core import security
+
+
+COST_SETTINGS = [
+    ("scrypt", {"n": 2 ** 12, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 14, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 15, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 17, "r": 8, "p": 1}),
+    ("pbkdf2_sha256", {"iterations": 100000}),
+    ("pbkdf2_sha256", {"iterations": 600000}),
+]
+
+
+async def measure(hashed: str, executor: ThreadPoolExecutor, logins: int, concurrency: int) -> tuple:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with semaphore:
+            started = time.perf_counter()
+            await loop.run_in_executor(executor, security.verify_password, "correct horse battery staple", hashed)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return logins / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password verification (login) throughput per KDF cost setting")
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=security.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    print(f"{'scheme':15} {'cost':28} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for scheme, cost in COST_SETTINGS:
+            hashed = security.hash_password("correct horse battery staple", scheme=scheme, cost=cost)
+            throughput, p50, p99 = asyncio.run(measure(hashed, executor, args.logins, args.concurrency))
+            cost_label = ",".join(f"{key}={value}" for key, value in cost.items())
+            print(f"{scheme:15} {cost_label:28} {throughput:10.1f} {p50 * 1000:9.1f} {p99 * 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+from app.core.rate_limit import MemoryBackend, RateLimiter, RateLimitMiddleware
+from app.core.security import generate_jwt
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def scope(path: str, method: str = "GET", token: str = None, ip: str = "10.0.0.1") -> dict:
+    headers = [(b"host", b"testserver"), (b"accept", b"application/json")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": method, "path": path, "query_string": b"", "headers": headers, "client": (ip, 50000)}
+
+
+async def measure(app, scopes: list, requests: int) -> float:
+    count = len(scopes)
+    started = time.perf_counter()
+    for index in range(requests):
+        await app(scopes[index % count], receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def fastapi_app(limiter: RateLimiter = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/finance/transactions")
+    async def transactions():
+        return {}
+
+    if limiter:
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request overhead of the rate limit middleware")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=10000, help="distinct users/IPs in the many-clients cases")
+    args = parser.parse_args()
+    # Limits high enough that every request is admitted and the full path runs.
+    limiter = RateLimiter(MemoryBackend(), {"user": (1e9, 1e9), "ip": (1e9, 1e9), "auth_ip": (1e9, 1e9)},
+                          {"analytics": 1000, "writes": 1000, "auth": 1000})
+    limited = RateLimitMiddleware(endpoint, limiter)
+    tokens = [generate_jwt({"user_id": user_id}) for user_id in range(args.clients)]
+    cases = [
+        ("no middleware", endpoint, [scope("/finance/transactions")]),
+        ("anonymous, one IP", limited, [scope("/finance/transactions")]),
+        ("one user (JWT)", limited, [scope("/finance/transactions", token=tokens[0])]),
+        ("one user, analytics slot", limited, [scope("/finance/analysis/series", token=tokens[0])]),
+        (f"{args.clients} users (JWT)", limited, [scope("/finance/transactions", token=token) for token in tokens]),
+        (f"{args.clients} IPs", limited, [scope("/finance/transactions", ip=f"10.{i // 65536}.{i // 256 % 256}.{i % 256}")
+                                          for i in range(args.clients)]),
+        # For scale: the same empty route through FastAPI's routing and JSON response.
+        ("FastAPI route, no middleware", fastapi_app(), [scope("/finance/transactions")]),
+        ("FastAPI route, rate limited", fastapi_app(limiter), [scope("/finance/transactions", token=tokens[0])]),
+    ]
+    loop = asyncio.new_event_loop()
+    baseline = None
+    print(f"{'case':32} {'us/request':>11} {'overhead us':>12}")
+    for name, app, scopes in cases:
+        loop.run_until_complete(measure(app, scopes, min(args.requests, 10000)))
+        elapsed = min(loop.run_until_complete(measure(app, scopes, args.requests)) for _ in range(3))
+        baseline = elapsed if baseline is None or name.endswith("no middleware") else baseline
+        print(f"{name:32} {elapsed * 1e6:11.2f} {(elapsed - baseline) * 1e6:12.2f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
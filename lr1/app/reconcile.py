@@ -0,0 +1,24 @@
+import argparse
+import json
+from app.database import SessionLocal
+from app.crud.aggregates import reconcile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild account balances and monthly rollups from raw transactions")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--fix", action="store_true", help="write the rebuilt values instead of only reporting drift")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        drift = reconcile(db, user_id=args.user_id, fix=args.fix)
+    finally:
+        db.close()
+    for item in drift:
+        print(json.dumps(item))
+    print(f"{len(drift)} drifted aggregate(s){' fixed' if args.fix else ''}")
+    return 1 if drift and not args.fix else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+import argparse
+import datetime
+import logging
+import os
+import signal
+import threading
+from app.database import SessionLocal
+from app.crud.recurring import materialize_due, RECURRING_RULE_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+RECURRING_POLL_INTERVAL = float(os.getenv("RECURRING_POLL_INTERVAL", "300"))
+
+
+def run(clock=datetime.date.today, interval: float = RECURRING_POLL_INTERVAL, chunk_size: int = RECURRING_RULE_CHUNK_SIZE,
+        stop: threading.Event = None, once: bool = False, session_factory=SessionLocal) -> int:
+    # clock is read once per pass, so tests can pass a frozen one and step it between passes.
+    stop = stop or threading.Event()
+    posted = 0
+    while not stop.is_set():
+        with session_factory() as db:
+            try:
+                count = materialize_due(db, clock(), chunk_size=chunk_size)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Recurring transactions failed: %s", e)
+                count = 0
+        if count:
+            logger.info("Posted %s recurring transaction(s) for %s", count, clock())
+        posted += count
+        if once:
+            break
+        stop.wait(interval)
+    return posted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post due recurring transactions for all users")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit (for cron)")
+    parser.add_argument("--interval", type=float, default=RECURRING_POLL_INTERVAL, help="seconds between passes")
+    parser.add_argument("--chunk-size", type=int, default=RECURRING_RULE_CHUNK_SIZE, help="rules per bulk insert")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=None,
+                        help="post occurrences up to this date instead of today")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    clock = (lambda: args.as_of) if args.as_of else datetime.date.today
+    posted = run(clock, args.interval, args.chunk_size, stop=stop, once=args.once)
+    print(f"{posted} recurring transaction(s) posted")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
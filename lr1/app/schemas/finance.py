@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 import enum
 
 class TransactionTypeEnum(str, enum.Enum):
@@ -17,13 +17,26 @@ class AccountCreate(AccountBase):
 class AccountUpdate(AccountBase):
     pass
 
-class AccountOut(AccountBase):
+class AccountSummaryOut(AccountBase):
     id: int
     user_id: int
+    class Config:
+        orm_mode = True
+
+class AccountOut(AccountSummaryOut):
     transactions: List['TransactionOut'] = []
     class Config:
         orm_mode = True
 
+class AccountPeriodTotalOut(BaseModel):
+    account_id: int
+    month: str
+    type: TransactionTypeEnum
+    total: float
+    count: int
+    class Config:
+        orm_mode = True
+
 class TransactionCategoryBase(BaseModel):
     allocated_amount: float
 
@@ -55,6 +68,14 @@ class TransactionOut(TransactionBase):
     class Config:
         orm_mode = True
 
+class BulkImportError(BaseModel):
+    row: int
+    detail: str
+
+class BulkImportOut(BaseModel):
+    created: int
+    errors: List[BulkImportError] = []
+
 class CategoryBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -131,9 +152,21 @@ class NotificationOut(NotificationBase):
     id: int
     user_id: int
     created_at: datetime.datetime
+    read_at: Optional[datetime.datetime] = None
     class Config:
         orm_mode = True
 
+class NotificationMarkRead(BaseModel):
+    ids: Optional[List[int]] = None
+    up_to_id: Optional[int] = None
+
+class NotificationMarkReadOut(BaseModel):
+    updated: int
+    unread: int
+
+class NotificationUnreadOut(BaseModel):
+    unread: int
+
 class DashboardSummary(BaseModel):
     total_income: float
     total_expense: float
@@ -147,6 +180,99 @@ class SpendingTrend(BaseModel):
     class Config:
         orm_mode = True
 
+class AnalysisPeriodOut(BaseModel):
+    period: str
+    total: float
+    count: int
+    rolling_average: float
+
+class YearOverYearOut(BaseModel):
+    month: str
+    total: float
+    previous_year_total: Optional[float] = None
+    change: Optional[float] = None
+    change_pct: Optional[float] = None
+
+class PercentilesOut(BaseModel):
+    count: int
+    percentiles: Dict[str, Optional[float]]
+
+class CategoryPercentilesOut(PercentilesOut):
+    category: str
+
+class AmountPercentilesOut(BaseModel):
+    overall: PercentilesOut
+    categories: List[CategoryPercentilesOut] = []
+
+class AccountFlowOut(BaseModel):
+    account_id: int
+    name: str
+    income: float
+    expense: float
+    net: float
+    count: int
+
+class RecurringFrequencyEnum(str, enum.Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+    yearly = "yearly"
+
+class RecurringRuleBase(BaseModel):
+    account_id: int
+    amount: float
+    type: TransactionTypeEnum
+    description: Optional[str] = None
+    categories: List[TransactionCategoryCreate] = []
+    frequency: RecurringFrequencyEnum
+    interval: int = 1
+    start_date: datetime.date
+    end_date: Optional[datetime.date] = None
+    active: bool = True
+
+class RecurringRuleCreate(RecurringRuleBase):
+    pass
+
+class RecurringRuleOut(RecurringRuleBase):
+    id: int
+    user_id: int
+    occurrence_count: int
+    next_date: Optional[datetime.date]
+    last_date: Optional[datetime.date]
+    class Config:
+        orm_mode = True
+
+class ForecastMonthOut(BaseModel):
+    month: str
+    income: float
+    expense: float
+    net: float
+    balance: float
+
+class ForecastOut(BaseModel):
+    as_of: datetime.date
+    months: List[ForecastMonthOut]
+
+class GoalProjectionOut(BaseModel):
+    goal_id: int
+    target_amount: float
+    current_amount: Optional[float]
+    due_date: Optional[datetime.date]
+    monthly_contribution: float
+    projected_completion_date: Optional[datetime.date]
+    on_track: Optional[bool]
+
+class BudgetProjectionOut(BaseModel):
+    budget_id: int
+    category_id: int
+    limit_amount: float
+    window_start: Optional[datetime.date]
+    window_end: datetime.date
+    spent: float
+    projected_spent: float
+    projected_overrun_date: Optional[datetime.date]
+    will_exceed: bool
+
 AccountOut.update_forward_refs()
 TransactionOut.update_forward_refs()
 TransactionCategoryOut.update_forward_refs()
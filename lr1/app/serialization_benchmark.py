@@ -0,0 +1,89 @@
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+from typing import List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models import User, Account, Transaction, Category, TransactionCategory, TransactionType
+from app.schemas.finance import TransactionOut
+from app.crud.finance import get_transactions, get_transaction_rows
+from app.core.serialization import FastJSONResponse, orjson
+
+
+def seed(db: Session, rows: int) -> int:
+    rng = random.Random(42)
+    user_id = db.scalar(insert(User).returning(User.id), {"username": f"bench_{rows}", "email": f"bench_{rows}@example.com", "hashed_password": "x"})
+    account_id = db.scalar(insert(Account).returning(Account.id), {"user_id": user_id, "name": "bench", "balance": 0.0, "opening_balance": 0.0})
+    category_ids = db.scalars(insert(Category).returning(Category.id), [{"name": f"bench_{rows}_{i}"} for i in range(20)]).all()
+    start = datetime.date(2020, 1, 1)
+    for offset in range(0, rows, 10000):
+        chunk = [{
+            "user_id": user_id,
+            "account_id": account_id,
+            "amount": round(rng.uniform(1, 500), 2),
+            "date": start + datetime.timedelta(days=rng.randint(0, 5 * 365)),
+            "description": rng.choice([None, "groceries", "rent", "salary"]),
+            "type": rng.choice(list(TransactionType)),
+        } for _ in range(min(10000, rows - offset))]
+        transaction_ids = db.scalars(insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), chunk).all()
+        db.execute(insert(TransactionCategory), [
+            {"transaction_id": transaction_id, "category_id": rng.choice(category_ids), "transaction_date": row["date"],
+             "allocated_amount": row["amount"]}
+            for transaction_id, row in zip(transaction_ids, chunk)
+        ])
+    db.commit()
+    return user_id
+
+
+def model_path(db: Session, user_id: int, rows: int) -> bytes:
+    transactions = get_transactions(db, user_id, limit=rows)
+    content = TypeAdapter(List[TransactionOut]).dump_python(
+        [TransactionOut.model_validate(t, from_attributes=True) for t in transactions], mode="json")
+    return JSONResponse(content).body
+
+
+def fast_path(db: Session, user_id: int, rows: int) -> bytes:
+    return FastJSONResponse(get_transaction_rows(db, user_id, limit=rows)[0]).body
+
+
+def measure(path, db: Session, user_id: int, rows: int, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        body = path(db, user_id, rows)
+        timings.append(time.perf_counter() - started)
+    db.expunge_all()
+    tracemalloc.start()
+    path(db, user_id, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(body), min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the pydantic and fast serialization paths for transaction lists")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    print(f"encoder: {'orjson' if orjson else 'json'}")
+    print(f"{'rows':>8} {'path':6} {'bytes':>12} {'ms':>9} {'MB/s':>8} {'peak MB':>8}")
+    for rows in args.rows:
+        with Session(engine) as db:
+            user_id = seed(db, rows)
+            for name, path in (("model", model_path), ("fast", fast_path)):
+                size, elapsed, peak = measure(path, db, user_id, rows, args.repeat)
+                print(f"{rows:8} {name:6} {size:12} {elapsed * 1000:9.1f} {size / elapsed / 1e6:8.1f} {peak / 1e6:8.1f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
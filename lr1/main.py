@@ -1,10 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import auth, finance
+from app.api import auth, finance, internal, metrics
+from app.database import partitions, replicas
+from app.core.security import INTERNAL_TOKEN
+from app.core.notifications import notification_broker
+from app.crud.notifications import notification_retention
+from app.crud.outbox import outbox_drainer
+from app.core.rate_limit import RateLimitMiddleware, RATE_LIMIT_ENABLED
+from app.core.request_metrics import RequestMetricsMiddleware, REQUEST_METRICS_ENABLED
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    replicas.start()
+    partitions.start()
+    await notification_broker.start()
+    notification_retention.start()
+    outbox_drainer.start()
+    yield
+    await outbox_drainer.stop()
+    await notification_retention.stop()
+    await notification_broker.stop()
+    await partitions.stop()
+    await replicas.stop()
+
+app = FastAPI(lifespan=lifespan)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+# Added last so it is outermost: rejected requests and the limiter's own time are measured too.
+if REQUEST_METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(finance.router, prefix="/finance", tags=["finance"])
+# Operator endpoints need INTERNAL_TOKEN as a bearer token and are left out entirely without one.
+if INTERNAL_TOKEN:
+    app.include_router(internal.router, prefix="/internal", tags=["internal"], include_in_schema=False)
+    app.include_router(metrics.router, tags=["internal"], include_in_schema=False)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+# The app reads its settings at import time, so the test environment goes in first.
+_workdir = tempfile.mkdtemp(prefix="finance-tests-")
+# TEST_DATABASE_URL runs the suite against another database, e.g. PostgreSQL; it is dropped and recreated per test.
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_workdir}/test.db")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ["COLD_STORAGE_DIR"] = os.path.join(_workdir, "cold_storage")
+os.environ["ANALYTICS_CACHE_BACKEND"] = "memory"
+os.environ["SCRYPT_N"] = "1024"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["OUTBOX_APP_INTERVAL"] = "0"
+os.environ["NOTIFICATION_RETENTION_INTERVAL"] = "0"
+os.environ["INTERNAL_TOKEN"] = "internal-test-token"
+
+import contextlib
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import models  # noqa: F401 - registers the tables
+from app.database import Base, SessionLocal, async_engine, engine
+from app.api.auth import principal_cache
+from app.core.response_cache import analytics_cache
+import main
+
+
+Base.metadata.drop_all(engine)
+Base.metadata.create_all(engine)
+
+
+def reset_database():
+    # Rows are deleted rather than tables recreated, which would invalidate the statements
+    # asyncpg has prepared on pooled connections.
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    analytics_cache.invalidate_all()
+    principal_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    # One event loop for the whole session, as pooled async connections are bound to it. The outbox
+    # drainer and retention are off, so tests drive the outbox and scheduler themselves.
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    reset_database()
+    return app_client
+
+
+@pytest.fixture(scope="session")
+def session_factory():
+    return SessionLocal
+
+
+@pytest.fixture(scope="session")
+def login(app_client):
+    def login(username: str) -> dict:
+        app_client.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "password"})
+        response = app_client.post("/auth/login", data={"username": username, "password": "password"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_statements():
+    # Counts every statement sent to the database, from both the sync and the async engine.
+    engines = (engine, async_engine.sync_engine)
+
+    @contextlib.contextmanager
+    def count():
+        counter = StatementCounter()
+        for target in engines:
+            event.listen(target, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", counter)
+    return count
@@ -0,0 +1,81 @@
+import pytest
+from app import reconcile as reconcile_cli
+from app.crud.aggregates import reconcile
+from app.models import Account, AccountPeriodTotal
+
+
+@pytest.fixture
+def accounts(client, login):
+    headers = login("balanced")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    ids = [client.post("/finance/accounts", json={"name": name, "balance": 100}, headers=headers).json()["id"]
+           for name in ("checking", "savings")]
+    return headers, user_id, ids
+
+
+def balances(client, headers, ids: list) -> list:
+    return [client.get(f"/finance/accounts/{account_id}", headers=headers).json()["balance"] for account_id in ids]
+
+
+def totals(client, headers, account_id: int, **params) -> dict:
+    response = client.get(f"/finance/accounts/{account_id}/totals", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return {(row["month"], row["type"]): (row["total"], row["count"]) for row in response.json()}
+
+
+def test_balances_and_totals_follow_every_write(client, accounts):
+    headers, _, (checking, savings) = accounts
+    post = lambda payload: client.post("/finance/transactions", json=payload, headers=headers).json()["id"]
+    salary = post({"account_id": checking, "amount": 1000, "type": "income", "date": "2025-01-31"})
+    rent = post({"account_id": checking, "amount": 600, "type": "expense", "date": "2025-02-01"})
+    post({"account_id": checking, "amount": 50, "type": "expense", "date": "2025-02-14"})
+    assert balances(client, headers, [checking, savings]) == pytest.approx([450, 100])
+    assert totals(client, headers, checking) == {
+        ("2025-01", "income"): (1000, 1), ("2025-02", "expense"): (650, 2)}
+    assert totals(client, headers, checking, month="2025-02") == {("2025-02", "expense"): (650, 2)}
+
+    # Moving the rent to another account, month and type reverses it everywhere it was counted.
+    response = client.put(f"/finance/transactions/{rent}", headers=headers,
+                          json={"account_id": savings, "amount": 600, "type": "income", "date": "2025-03-01"})
+    assert response.status_code == 200, response.text
+    assert balances(client, headers, [checking, savings]) == pytest.approx([1050, 700])
+    assert totals(client, headers, checking) == {
+        ("2025-01", "income"): (1000, 1), ("2025-02", "expense"): (50, 1)}
+    assert totals(client, headers, savings) == {("2025-03", "income"): (600, 1)}
+
+    assert client.delete(f"/finance/transactions/{salary}", headers=headers).status_code == 200
+    assert balances(client, headers, [checking, savings]) == pytest.approx([50, 700])
+    assert totals(client, headers, checking) == {("2025-02", "expense"): (50, 1)}
+
+
+def test_manual_balance_edit_stays_reconcilable(client, accounts, session_factory):
+    headers, user_id, (checking, _) = accounts
+    client.post("/finance/transactions", json={"account_id": checking, "amount": 30, "type": "expense"}, headers=headers)
+    client.put(f"/finance/accounts/{checking}", json={"name": "checking", "balance": 500}, headers=headers)
+    client.post("/finance/transactions", json={"account_id": checking, "amount": 20, "type": "income"}, headers=headers)
+    assert balances(client, headers, [checking]) == pytest.approx([520])
+    with session_factory() as db:
+        assert reconcile(db, user_id=user_id) == []
+
+
+def test_reconcile_reports_and_fixes_drift(client, accounts, session_factory, monkeypatch, capsys):
+    headers, user_id, (checking, savings) = accounts
+    client.post("/finance/transactions", headers=headers,
+                json={"account_id": checking, "amount": 70, "type": "expense", "date": "2025-04-04"})
+    with session_factory() as db:
+        db.query(Account).filter(Account.id == savings).update({"balance": 1})
+        db.query(AccountPeriodTotal).filter(AccountPeriodTotal.account_id == checking).update({"total": 5})
+        db.commit()
+        drift = reconcile(db, user_id=user_id)
+        assert sorted(item["kind"] for item in drift) == ["account_period_totals", "balance"]
+        # Reporting alone changes nothing.
+        assert reconcile(db, user_id=user_id) == drift
+    # The CLI exits non-zero while there is unfixed drift.
+    monkeypatch.setattr("sys.argv", ["reconcile", "--user-id", str(user_id)])
+    assert reconcile_cli.main() == 1
+    assert capsys.readouterr().out.splitlines()[-1] == "2 drifted aggregate(s)"
+    with session_factory() as db:
+        assert reconcile(db, user_id=user_id, fix=True) == drift
+        assert reconcile(db, user_id=user_id) == []
+    assert balances(client, headers, [checking, savings]) == pytest.approx([30, 100])
+    assert totals(client, headers, checking) == {("2025-04", "expense"): (70, 1)}
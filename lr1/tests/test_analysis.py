@@ -0,0 +1,190 @@
+import collections
+import datetime
+import math
+import random
+import numpy as np
+import pytest
+from app.core.response_cache import analytics_cache
+from app.crud.analytics import period_index, rolling_mean
+from app.crud.archive import archive_transactions
+
+START = datetime.date(2024, 1, 1)
+# No transactions in May 2024, so the monthly series has a gap to fill.
+DAYS = [day for day in (START + datetime.timedelta(days=offset) for offset in range(0, 547, 3))
+        if (day.year, day.month) != (2024, 5)]
+
+
+@pytest.fixture
+def seeded(client, login):
+    rng = random.Random(18)
+    headers = login("analyst")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    categories = {client.post("/finance/categories", json={"name": name}, headers=headers).json()["id"]: name
+                  for name in ("food", "rent", "fun")}
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(3)]
+    transactions = []
+    for _ in range(120):
+        type = rng.choice(["expense", "expense", "income"])
+        amount = round(rng.uniform(1, 200), 2)
+        transaction = {"account_id": rng.choice(accounts), "amount": amount, "type": type,
+                       "date": rng.choice(DAYS).isoformat()}
+        if type == "expense":
+            transaction["categories"] = [{"category_id": rng.choice(list(categories)), "allocated_amount": amount}]
+        transactions.append(transaction)
+    assert client.post("/finance/transactions/bulk", json=transactions, headers=headers).status_code == 200
+    return headers, user_id, accounts, categories, transactions
+
+
+def get(client, headers, path: str, **params):
+    response = client.get(f"/finance/analysis/{path}", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def in_range(transactions: list, type: str = None, date_from: str = None, date_to: str = None) -> list:
+    return [row for row in transactions if (type is None or row["type"] == type)
+            and (date_from is None or row["date"] >= date_from) and (date_to is None or row["date"] <= date_to)]
+
+
+def rounded(value):
+    # Archived rows are summed in another order, so results are compared to well below a cent.
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    return value
+
+
+def percentile(values: list, q: float) -> float:
+    # Linear interpolation between closest ranks, numpy's default.
+    values = sorted(values)
+    position = q / 100 * (len(values) - 1)
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def test_period_index_and_rolling_mean():
+    days = np.array(["2025-06-01", "2025-06-02", "2025-06-08", "2025-06-09"], dtype="datetime64[D]")
+    weeks = period_index(days, "week")
+    # 2025-06-02 and 2025-06-09 are Mondays.
+    assert weeks[1] == weeks[2] == weeks[0] + 1 and weeks[3] == weeks[2] + 1
+    assert period_index(days, "month").tolist() == [period_index(days[:1], "month")[0]] * 4
+    assert rolling_mean(np.array([3.0, 6.0, 9.0, 0.0]), 2).tolist() == [3.0, 4.5, 7.5, 4.5]
+
+
+def test_monthly_series_fills_gaps(client, seeded):
+    headers, _, _, _, transactions = seeded
+    expenses = in_range(transactions, "expense")
+    totals, counts = collections.Counter(), collections.Counter()
+    for row in expenses:
+        totals[row["date"][:7]] += row["amount"]
+        counts[row["date"][:7]] += 1
+    series = get(client, headers, "series", window=3)
+    assert [row["period"] for row in series][:6] == ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"]
+    assert series[4]["total"] == 0 and series[4]["count"] == 0
+    assert len(series) == 18
+    for index, row in enumerate(series):
+        assert row["total"] == pytest.approx(totals[row["period"]])
+        assert row["count"] == counts[row["period"]]
+        window = [item["total"] for item in series[max(0, index - 2):index + 1]]
+        assert row["rolling_average"] == pytest.approx(sum(window) / len(window))
+    # The monthly series agrees with the rollup-based spending trends.
+    trends = client.get("/finance/trends/spending", headers=headers).json()
+    assert {row["month"]: row["total_expense"] for row in trends} == \
+        pytest.approx({row["period"]: row["total"] for row in series if row["count"]})
+
+
+def test_day_and_week_series_cover_the_requested_range(client, seeded):
+    headers, _, _, _, transactions = seeded
+    date_from, date_to = "2025-02-03", "2025-03-02"
+    expected = collections.Counter()
+    for row in in_range(transactions, "income", date_from, date_to):
+        expected[row["date"]] += row["amount"]
+    days = get(client, headers, "series", granularity="day", type="income", date_from=date_from, date_to=date_to)
+    assert [row["period"] for row in days][0] == date_from and days[-1]["period"] == date_to and len(days) == 28
+    assert {row["period"]: row["total"] for row in days if row["count"]} == pytest.approx(dict(expected))
+
+    weeks = get(client, headers, "series", granularity="week", type="income", date_from=date_from, date_to=date_to)
+    # Monday-based weeks, labelled by their Monday; 2025-03-02 is a Sunday.
+    assert [row["period"] for row in weeks] == ["2025-02-03", "2025-02-10", "2025-02-17", "2025-02-24"]
+    assert [row["total"] for row in weeks] == pytest.approx(
+        [sum(row["total"] for row in days[offset:offset + 7]) for offset in range(0, 28, 7)])
+
+
+def test_year_over_year(client, seeded):
+    headers, _, _, _, transactions = seeded
+    totals = collections.Counter()
+    for row in in_range(transactions, "expense"):
+        totals[row["date"][:7]] += row["amount"]
+    result = get(client, headers, "year-over-year", date_from="2025-01-01")
+    assert [row["month"] for row in result] == [f"2025-0{month}" for month in range(1, 7)]
+    for row in result:
+        previous = totals[f"2024-{row['month'][5:]}"]
+        assert row["total"] == pytest.approx(totals[row["month"]])
+        assert row["previous_year_total"] == pytest.approx(previous)
+        assert row["change"] == pytest.approx(totals[row["month"]] - previous)
+        assert row["change_pct"] == (pytest.approx((totals[row["month"]] - previous) / previous * 100) if previous else None)
+    # May 2024 had nothing, so there is no percentage to report.
+    assert result[4]["previous_year_total"] == 0 and result[4]["change_pct"] is None
+    # Without date_from the first year has no previous values.
+    assert get(client, headers, "year-over-year")[0]["previous_year_total"] is None
+
+
+def test_percentiles(client, seeded):
+    headers, _, _, categories, transactions = seeded
+    date_from = "2024-07-01"
+    expenses = in_range(transactions, "expense", date_from)
+    result = get(client, headers, "percentiles", percentiles="90,50,99.5", date_from=date_from)
+    assert result["overall"]["count"] == len(expenses)
+    assert list(result["overall"]["percentiles"]) == ["p50", "p90", "p99.5"]
+    assert result["overall"]["percentiles"] == pytest.approx(
+        {f"p{q:g}": percentile([row["amount"] for row in expenses], q) for q in (50, 90, 99.5)})
+    by_category = collections.defaultdict(list)
+    for row in expenses:
+        by_category[categories[row["categories"][0]["category_id"]]].append(row["amount"])
+    assert {row["category"]: (row["count"], row["percentiles"]["p50"]) for row in result["categories"]} == \
+        {name: (len(values), pytest.approx(percentile(values, 50))) for name, values in by_category.items()}
+
+    empty = get(client, headers, "percentiles", date_from="2030-01-01")
+    assert empty == {"overall": {"count": 0, "percentiles": {"p50": None, "p90": None, "p99": None}}, "categories": []}
+    for bad in ("", "50,abc", "101"):
+        assert client.get("/finance/analysis/percentiles", params={"percentiles": bad}, headers=headers).status_code == 400
+
+
+def test_account_flows_follow_renames(client, seeded):
+    headers, _, accounts, _, transactions = seeded
+    flows = get(client, headers, "accounts", date_to="2024-12-31")
+    assert [row["account_id"] for row in flows] == sorted(accounts)
+    for row in flows:
+        mine = [item for item in in_range(transactions, date_to="2024-12-31") if item["account_id"] == row["account_id"]]
+        income = sum(item["amount"] for item in mine if item["type"] == "income")
+        expense = sum(item["amount"] for item in mine if item["type"] == "expense")
+        assert (row["income"], row["expense"], row["net"], row["count"]) == \
+            (pytest.approx(income), pytest.approx(expense), pytest.approx(income - expense), len(mine))
+    client.put(f"/finance/accounts/{accounts[0]}", json={"name": "renamed", "balance": 0}, headers=headers)
+    assert get(client, headers, "accounts", date_to="2024-12-31")[0]["name"] == "renamed"
+
+
+def test_cached_series_see_new_transactions(client, seeded):
+    headers, _, accounts, _, _ = seeded
+    before = get(client, headers, "series", date_from="2025-06-01", date_to="2025-06-30")
+    client.post("/finance/transactions", headers=headers,
+                json={"account_id": accounts[0], "amount": 1000, "type": "expense", "date": "2025-06-15"})
+    after = get(client, headers, "series", date_from="2025-06-01", date_to="2025-06-30")
+    assert after[0]["total"] == pytest.approx(before[0]["total"] + 1000)
+    assert after[0]["count"] == before[0]["count"] + 1
+
+
+def test_results_match_after_archiving(client, session_factory, seeded):
+    headers, user_id, _, _, _ = seeded
+    queries = [("series", {}), ("series", {"granularity": "week", "date_from": "2024-11-20", "date_to": "2025-02-10"}),
+               ("year-over-year", {"date_from": "2025-01-01"}), ("percentiles", {}), ("accounts", {"date_from": "2024-03-15"})]
+    before = [rounded(get(client, headers, path, **params)) for path, params in queries]
+    with session_factory() as db:
+        assert archive_transactions(db, datetime.date(2025, 1, 1), user_id=user_id)
+    analytics_cache.invalidate_all()
+    assert [rounded(get(client, headers, path, **params)) for path, params in queries] == before
@@ -0,0 +1,196 @@
+import datetime
+import os
+import random
+import sys
+import pytest
+from app import archive_transactions as archive_cli
+from app.core.cold_storage import ColdStore, cold_store
+from app.core.response_cache import analytics_cache
+from app.crud.archive import archive_transactions, archived_months
+from app.models import Transaction
+
+ARCHIVE_BEFORE = datetime.date(2025, 3, 1)
+# The boundary month is archived, the one after it stays live, and both share day numbers.
+DATES = [datetime.date(2025, month, day).isoformat() for month in (1, 2, 3) for day in (1, 15, 28)]
+
+
+@pytest.fixture
+def seeded(client, login):
+    rng = random.Random(7)
+    headers = login("archivist")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    categories = [client.post("/finance/categories", json={"name": f"archive {i}"}, headers=headers).json()["id"]
+                  for i in range(2)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(2)]
+    transactions = []
+    for _ in range(45):
+        type = rng.choice(["expense", "income"])
+        amount = round(rng.uniform(1, 100), 2)
+        transaction = {"account_id": rng.choice(accounts), "amount": amount, "type": type, "date": rng.choice(DATES)}
+        if type == "expense":
+            transaction["categories"] = [{"category_id": rng.choice(categories), "allocated_amount": amount}]
+        transactions.append(transaction)
+    assert client.post("/finance/transactions/bulk", json=transactions, headers=headers).status_code == 200
+    return headers, user_id, accounts, categories
+
+
+def pages(client, headers, **params) -> list:
+    rows, cursor = [], None
+    while True:
+        response = client.get("/finance/transactions", headers=headers,
+                              params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        rows.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows
+
+
+def listed(rows: list) -> list:
+    for row in rows:
+        row.get("transaction_categories", []).sort(key=lambda tc: tc["category"]["id"])
+    return rows
+
+
+def archive(session_factory, user_id: int, before: datetime.date = ARCHIVE_BEFORE) -> list:
+    with session_factory() as db:
+        return archive_transactions(db, before, user_id=user_id)
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    return value
+
+
+@pytest.mark.parametrize("params", [{}, {"fields": "id,date,amount"}, {"expand": ""}])
+def test_pages_merge_archived_and_live_rows(client, session_factory, seeded, params):
+    headers, user_id, _, _ = seeded
+    before = listed(pages(client, headers, limit=1000, **params))
+    assert len(before) == 45
+    assert [item["month"] for item in archive(session_factory, user_id)] == ["2025-01", "2025-02"]
+    # Pages of 4 keep ending inside runs of equal dates, on both sides of the boundary.
+    after = listed(pages(client, headers, limit=4, **params))
+    assert after == before
+    assert [(row["date"], row["id"]) for row in after] == sorted(((row["date"], row["id"]) for row in after), reverse=True)
+
+
+@pytest.mark.parametrize("name", ["date_from", "date_to", "account_id", "type", "category_id"])
+def test_filters_apply_to_archived_rows(client, session_factory, seeded, name):
+    headers, user_id, accounts, categories = seeded
+    value = {"date_from": "2025-02-15", "date_to": "2025-02-15", "account_id": accounts[0], "type": "income",
+             "category_id": categories[1]}[name]
+    before = listed(pages(client, headers, limit=1000, **{name: value}))
+    assert 0 < len(before) < 45
+    archive(session_factory, user_id)
+    assert listed(pages(client, headers, limit=3, **{name: value})) == before
+
+
+def test_archived_rows_are_read_only(client, session_factory, seeded):
+    headers, user_id, accounts, _ = seeded
+    old = pages(client, headers, limit=1000, date_to="2025-01-31")[0]["id"]
+    archive(session_factory, user_id)
+    with session_factory() as db:
+        assert db.query(Transaction).filter(Transaction.date < ARCHIVE_BEFORE).count() == 0
+    assert any(row["id"] == old for row in pages(client, headers, limit=1000))
+    assert client.get(f"/finance/transactions/{old}", headers=headers).status_code == 404
+    response = client.put(f"/finance/transactions/{old}", headers=headers,
+                          json={"account_id": accounts[0], "amount": 1, "type": "income", "date": "2025-01-01"})
+    assert response.status_code == 404
+    assert client.delete(f"/finance/transactions/{old}", headers=headers).status_code == 404
+
+
+def test_rearchiving_merges_backdated_rows_into_a_new_version(client, session_factory, seeded):
+    headers, user_id, accounts, _ = seeded
+    archive(session_factory, user_id)
+    with session_factory() as db:
+        versions = dict(archived_months(db, user_id))
+    assert sorted(versions) == ["2025-01", "2025-02"]
+    backdated = client.post("/finance/transactions", headers=headers,
+                            json={"account_id": accounts[0], "amount": 5, "type": "income", "date": "2025-01-15"}).json()
+    before = listed(pages(client, headers, limit=1000))
+    assert backdated["id"] in [row["id"] for row in before]
+
+    assert archive(session_factory, user_id) == [{"user_id": user_id, "month": "2025-01", "transactions": 1}]
+    with session_factory() as db:
+        current = dict(archived_months(db, user_id))
+    assert current["2025-02"] == versions["2025-02"] and current["2025-01"] != versions["2025-01"]
+    # The superseded file is gone; only the new version is read.
+    assert not os.path.exists(cold_store.path(user_id, "2025-01", versions["2025-01"]))
+    assert os.path.exists(cold_store.path(user_id, "2025-01", current["2025-01"]))
+    assert listed(pages(client, headers, limit=4)) == before
+
+
+def test_analytics_over_archived_ranges(client, session_factory, seeded):
+    headers, user_id, _, _ = seeded
+    # Ranges that start or end mid-month read the partial months row by row.
+    ranges = [{}, {"date_from": "2025-01-10", "date_to": "2025-03-20"}, {"date_from": "2025-02-02"},
+              {"date_to": "2025-02-20"}]
+    paths = ["/finance/analysis/expenses", "/finance/trends/spending", "/finance/dashboard"]
+
+    def analytics():
+        # Archived rows are summed in another order, so totals are compared to the cent.
+        return [rounded(client.get(path, params=params, headers=headers).json()) for path in paths for params in ranges]
+    before = analytics()
+    archive(session_factory, user_id)
+    analytics_cache.invalidate_all()
+    assert analytics() == before
+
+
+def test_cold_store_reads_through_a_cache(tmp_path):
+    store = ColdStore(directory=str(tmp_path), cache_size=2)
+    rows = [{"id": i, "account_id": 1, "amount": float(i), "date": datetime.date(2025, 1, 1 + i % 3),
+             "description": None, "type": "expense", "categories": [(9, float(i)), (3, 0.0)]} for i in range(6)]
+    store.write(4, "2025-01", "v1", rows)
+    read = store.read(4, "2025-01", "v1")
+    assert [(row["date"], row["id"]) for row in read] == sorted(((row["date"], row["id"]) for row in rows), reverse=True)
+    assert read[0]["user_id"] == 4 and read[0]["categories"] == [(3, 0.0), (9, float(read[0]["id"]))]
+
+    # The second read is served from memory, even with the file gone.
+    os.remove(store.path(4, "2025-01", "v1"))
+    assert store.read(4, "2025-01", "v1") is read
+    assert store.stats()["cache"]["hits"] == 1
+    store.remove(4, "2025-01", "v1")
+    with pytest.raises(FileNotFoundError):
+        store.read(4, "2025-01", "v1")
+
+
+def test_cold_storage_stats_are_internal(client, session_factory, seeded):
+    headers, user_id, _, _ = seeded
+    assert client.get("/internal/db/cold-storage", headers=headers).status_code == 401
+    archive(session_factory, user_id)
+    internal = {"Authorization": f"Bearer {os.environ['INTERNAL_TOKEN']}"}
+    cache = lambda: client.get("/internal/db/cold-storage", headers=internal).json()["cache"]
+    start = cache()
+    # Each archived month is read from disk once, then served from the cache.
+    for _ in range(2):
+        pages(client, headers, limit=1000)
+    assert (cache()["misses"], cache()["hits"]) == (start["misses"] + 2, start["hits"] + 2)
+    assert client.get("/internal/db/cold-storage", headers=internal).json()["directory"] == cold_store.directory
+
+
+def test_cli_dry_run_then_archive(client, session_factory, seeded, monkeypatch, capsys):
+    _, user_id, _, _ = seeded
+    # A horizon long enough to reach back from today to before the seeded months.
+    today = datetime.date.today()
+    horizon = (today.year - 2025) * 12 + today.month - 2
+    monkeypatch.setattr(sys, "argv", ["archive_transactions", "--horizon-months", str(horizon),
+                                      "--user-id", str(user_id), "--dry-run"])
+    assert archive_cli.main() == 0
+    output = capsys.readouterr().out.splitlines()
+    assert output[-1].endswith("before 2025-03-01 would be archived")
+    with session_factory() as db:
+        assert archived_months(db, user_id) == []
+    monkeypatch.setattr(sys, "argv", ["archive_transactions", "--horizon-months", str(horizon), "--user-id", str(user_id)])
+    assert archive_cli.main() == 0
+    assert capsys.readouterr().out.splitlines()[:-1] == output[:-1]
+    with session_factory() as db:
+        assert [month for month, _ in archived_months(db, user_id)] == ["2025-02", "2025-01"]
+    monkeypatch.setattr(sys, "argv", ["archive_transactions", "--horizon-months", "0"])
+    with pytest.raises(SystemExit):
+        archive_cli.main()
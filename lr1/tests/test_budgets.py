@@ -0,0 +1,69 @@
+import datetime
+from types import SimpleNamespace
+import pytest
+from app.crud.budgets import budget_window
+from app.crud.notifications import _alert_subject, budget_alert
+from app.crud.outbox import drain
+
+DAY = datetime.date(2025, 2, 12)
+
+
+@pytest.mark.parametrize("period, start_date, end_date, expected", [
+    ("2025-05", datetime.date(2025, 4, 1), datetime.date(2025, 12, 31), (datetime.date(2025, 4, 1), datetime.date(2025, 12, 31))),
+    ("2025-05", None, None, (datetime.date(2025, 5, 1), datetime.date(2025, 5, 31))),
+    ("2024", None, None, (datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))),
+    ("daily", None, None, (DAY, DAY)),
+    ("Weekly", None, None, (datetime.date(2025, 2, 10), datetime.date(2025, 2, 16))),
+    ("monthly", None, None, (datetime.date(2025, 2, 1), datetime.date(2025, 2, 28))),
+    ("yearly", None, None, (datetime.date(2025, 1, 1), datetime.date(2025, 12, 31))),
+    # Unknown windows are not evaluated, rather than being treated as all time.
+    ("groceries", None, None, None),
+    ("monthly", datetime.date(2025, 1, 1), None, None),
+    ("monthly", None, datetime.date(2025, 12, 31), None),
+])
+def test_budget_window(period, start_date, end_date, expected):
+    budget = SimpleNamespace(period=period, start_date=start_date, end_date=end_date)
+    assert budget_window(budget, DAY) == expected
+
+
+@pytest.mark.parametrize("threshold, title, message", [
+    (0.8, "Budget Warning", "80% of budget reached for category 'Food'. Limit: 100.0, Spent: 85.0"),
+    (1.0, "Budget Exceeded", "Budget exceeded for category 'Food'. Limit: 100.0, Spent: 85.0"),
+    (1.5, "Budget Exceeded", "150% of budget exceeded for category 'Food'. Limit: 100.0, Spent: 85.0"),
+])
+def test_budget_alert_text(threshold, title, message):
+    assert budget_alert("Food", 100.0, 85.0, threshold) == (title, message)
+    assert _alert_subject(title, message) == (title, message.split(". Limit:")[0])
+
+
+def alerts(client, headers) -> list:
+    return [(row["title"], row["message"]) for row in client.get("/finance/notifications", headers=headers).json()]
+
+
+def test_budget_alerts_fire_once_per_window(client, login, session_factory):
+    headers = login("budgeted")
+    category_id = client.post("/finance/categories", json={"name": "Food"}, headers=headers).json()["id"]
+    account_id = client.post("/finance/accounts", json={"name": "main", "balance": 0}, headers=headers).json()["id"]
+    for period, start_date, end_date in [("2025-02", None, None), ("monthly", "2025-01-01", None),
+                                         ("sometimes", None, None)]:
+        response = client.post("/finance/budgets", headers=headers, json={
+            "category_id": category_id, "period": period, "limit_amount": 100, "start_date": start_date, "end_date": end_date})
+        assert response.status_code == 200, response.text
+
+    def spend(amount: float, date: str):
+        response = client.post("/finance/transactions", headers=headers, json={
+            "account_id": account_id, "amount": amount, "type": "expense", "date": date,
+            "categories": [{"category_id": category_id, "allocated_amount": amount}]})
+        assert response.status_code == 200, response.text
+        with session_factory() as db:
+            drain(db)
+
+    spend(60, "2025-02-03")
+    assert alerts(client, headers) == []
+    spend(60, "2025-02-20")
+    # Only the 2025-02 budget has a known window; the partial-date and unknown-period ones stay quiet.
+    assert alerts(client, headers) == [budget_alert("Food", 100.0, 120.0)]
+    spend(10, "2025-02-21")
+    spend(500, "2025-03-01")
+    assert alerts(client, headers) == [budget_alert("Food", 100.0, 120.0)]
+    assert client.get("/finance/notifications/unread-count", headers=headers).json()["unread"] == 1
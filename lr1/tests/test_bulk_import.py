@@ -0,0 +1,107 @@
+import pytest
+from app.database import engine
+
+
+@pytest.fixture
+def account(client, login):
+    headers = login("importer")
+    category_id = client.post("/finance/categories", json={"name": "imported"}, headers=headers).json()["id"]
+    account_id = client.post("/finance/accounts", json={"name": "main", "balance": 100}, headers=headers).json()["id"]
+    return headers, account_id, category_id
+
+
+def listing(client, headers) -> list:
+    return client.get("/finance/transactions", params={"limit": 1000}, headers=headers).json()
+
+
+def balance(client, headers, account_id: int) -> float:
+    return client.get(f"/finance/accounts/{account_id}", headers=headers).json()["balance"]
+
+
+def test_json_import_reports_bad_rows_and_keeps_the_rest(client, account):
+    headers, account_id, category_id = account
+    rows = [
+        {"account_id": account_id, "amount": 40, "type": "expense", "date": "2025-05-02",
+         "categories": [{"category_id": category_id, "allocated_amount": 40}]},
+        {"account_id": account_id, "amount": "lots", "type": "expense"},
+        {"account_id": account_id + 1000, "amount": 5, "type": "expense"},
+        {"account_id": account_id, "amount": 5, "type": "expense", "categories": [{"category_id": 999999, "allocated_amount": 5}]},
+        {"account_id": account_id, "amount": 15, "type": "income", "date": "2025-05-03"},
+    ]
+    response = client.post("/finance/transactions/bulk", json=rows, headers=headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][1]["detail"] == "Account not found"
+    assert result["errors"][2]["detail"] == "Category with id 999999 not found"
+
+    created = listing(client, headers)
+    assert [(row["date"], row["amount"], row["type"]) for row in created] == \
+        [("2025-05-03", 15.0, "income"), ("2025-05-02", 40.0, "expense")]
+    assert created[1]["transaction_categories"][0]["category"]["id"] == category_id
+    assert balance(client, headers, account_id) == pytest.approx(100 - 40 + 15)
+
+
+def test_chunks_are_committed_together(client, account):
+    headers, account_id, _ = account
+    rows = [{"account_id": account_id, "amount": index + 1, "type": "income", "date": "2025-06-01"} for index in range(7)]
+    response = client.post("/finance/transactions/bulk", params={"chunk_size": 2}, json=rows, headers=headers)
+    assert response.json() == {"created": 7, "errors": []}
+    created = listing(client, headers)
+    # Ids follow the input order across chunks.
+    assert [row["amount"] for row in sorted(created, key=lambda row: row["id"])] == [float(index + 1) for index in range(7)]
+    assert balance(client, headers, account_id) == pytest.approx(100 + 28)
+
+
+# SQLite cannot return ids from a multi-row INSERT in parameter order, so SQLAlchemy sends one
+# INSERT per row there; the batched statements are what PostgreSQL gets.
+@pytest.mark.skipif(engine.dialect.name != "postgresql", reason="row-at-a-time INSERT ... RETURNING on SQLite")
+def test_statement_count_does_not_grow_with_rows(client, account, count_statements):
+    headers, account_id, category_id = account
+    counts = []
+    for size in (5, 50):
+        rows = [{"account_id": account_id, "amount": 1, "type": "expense", "date": "2025-06-01",
+                 "categories": [{"category_id": category_id, "allocated_amount": 1}]} for _ in range(size)]
+        with count_statements() as counter:
+            assert client.post("/finance/transactions/bulk", json=rows, headers=headers).json()["created"] == size
+        counts.append(counter.count)
+    assert counts[0] == counts[1]
+
+
+def test_csv_upload(client, account):
+    headers, account_id, category_id = account
+    statement = ("Date,Amount,Description,Category_ID\n"
+                 "2025-04-01,-12.5,Coffee,{category}\n"
+                 "2025-04-02,1000,Salary,\n"
+                 "2025-04-03,oops,Broken,\n").format(category=category_id)
+    response = client.post("/finance/transactions/bulk", params={"account_id": account_id}, headers=headers,
+                           files={"file": ("statement.csv", statement.encode(), "text/csv")})
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+    assert [error["row"] for error in response.json()["errors"]] == [3]
+    created = listing(client, headers)
+    assert [(row["description"], row["type"], row["amount"]) for row in created] == \
+        [("Salary", "income", 1000.0), ("Coffee", "expense", 12.5)]
+    assert created[1]["transaction_categories"][0]["allocated_amount"] == 12.5
+
+
+def test_ofx_body(client, account):
+    headers, account_id, _ = account
+    statement = ("<OFX><BANKTRANLIST>"
+                 "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250407120000<TRNAMT>-20.00<NAME>Groceries</STMTTRN>"
+                 "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250408<TRNAMT>55.10<MEMO>Refund"
+                 "</BANKTRANLIST></OFX>")
+    response = client.post("/finance/transactions/bulk", params={"account_id": account_id}, headers=headers,
+                           content=statement)
+    assert response.json() == {"created": 2, "errors": []}
+    assert [(row["date"], row["description"], row["type"], row["amount"]) for row in listing(client, headers)] == \
+        [("2025-04-08", "Refund", "income", 55.1), ("2025-04-07", "Groceries", "expense", 20.0)]
+
+
+def test_malformed_requests(client, account):
+    headers, _, _ = account
+    assert client.post("/finance/transactions/bulk", json={"amount": 1}, headers=headers).status_code == 400
+    response = client.post("/finance/transactions/bulk", headers=headers, data={"note": "no file"},
+                           files={"other": ("x.csv", b"amount\n1\n", "text/csv")})
+    assert response.status_code == 400
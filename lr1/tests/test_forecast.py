@@ -0,0 +1,47 @@
+import datetime
+import pytest
+
+
+def test_forecast_follows_transaction_and_account_writes(client, login):
+    headers = login("forecaster")
+    today = datetime.date.today().isoformat()
+    category_id = client.post("/finance/categories", json={"name": "groceries"}, headers=headers).json()["id"]
+    account_id = client.post("/finance/accounts", json={"name": "main", "balance": 1000}, headers=headers).json()["id"]
+    budget_id = client.post("/finance/budgets", json={"category_id": category_id, "period": "monthly", "limit_amount": 500},
+                            headers=headers).json()["id"]
+
+    def spent() -> float:
+        response = client.get(f"/finance/budgets/{budget_id}/projection", headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()["spent"]
+
+    def expense(amount: float) -> dict:
+        return {"account_id": account_id, "amount": amount, "date": today, "type": "expense",
+                "categories": [{"category_id": category_id, "allocated_amount": amount}]}
+
+    # Each read below stores a forecast that the following write has to throw away.
+    assert spent() == 0
+    transaction_id = client.post("/finance/transactions", json=expense(40), headers=headers).json()["id"]
+    assert spent() == pytest.approx(40)
+    client.post("/finance/transactions/bulk", json=[expense(10), expense(5)], headers=headers)
+    assert spent() == pytest.approx(55)
+    # Moving the transaction out of this month takes its allocation out of the budget window.
+    update = expense(40)
+    update.pop("categories")
+    update["date"] = (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).isoformat()
+    client.put(f"/finance/transactions/{transaction_id}", json=update, headers=headers)
+    assert spent() == pytest.approx(15)
+    transaction_id = client.post("/finance/transactions", json=expense(7), headers=headers).json()["id"]
+    assert spent() == pytest.approx(22)
+    client.delete(f"/finance/transactions/{transaction_id}", headers=headers)
+    assert spent() == pytest.approx(15)
+
+    def balance() -> float:
+        return client.get("/finance/forecast", headers=headers).json()["months"][0]["balance"]
+
+    before = balance()
+    current = client.get(f"/finance/accounts/{account_id}", headers=headers).json()["balance"]
+    client.put(f"/finance/accounts/{account_id}", json={"name": "main", "balance": 5000}, headers=headers)
+    assert balance() == pytest.approx(before + 5000 - current)
+    client.delete(f"/finance/accounts/{account_id}", headers=headers)
+    assert spent() == 0
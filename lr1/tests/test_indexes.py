@@ -0,0 +1,65 @@
+import importlib.util
+import inspect
+import os
+import re
+from app import explain_check
+from app.database import Base
+from app.models import Transaction
+
+VERSIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic", "versions")
+INDEX_REVISION = "e91d3a7c5b28"
+
+
+class IndexOps:
+    # Stands in for alembic.op in the index revision, which only creates and drops indexes.
+    def __init__(self):
+        self.indexes = {}
+
+    def create_index(self, name, table, columns, **kw):
+        self.indexes[name] = (table, list(columns), kw.get("postgresql_include"))
+
+    def drop_index(self, name, table_name=None, **kw):
+        self.indexes.pop(name, None)
+
+
+def migrations() -> list:
+    modules = {}
+    for filename in os.listdir(VERSIONS):
+        if filename.endswith(".py"):
+            spec = importlib.util.spec_from_file_location(filename[:-3], os.path.join(VERSIONS, filename))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules[module.down_revision] = module
+    chain, revision = [], None
+    while revision in modules:
+        chain.append(modules[revision])
+        revision = modules[revision].revision
+    assert len(chain) == len(modules)
+    return chain
+
+
+def test_migration_matches_model_indexes():
+    chain = migrations()
+    position = [module.revision for module in chain].index(INDEX_REVISION)
+    ops = IndexOps()
+    chain[position].op = ops
+    chain[position].upgrade()
+    # Indexes a later revision replaces are no longer in the models.
+    dropped = {name for module in chain[position + 1:]
+               for name in re.findall(r"drop_index\('(\w+)'", inspect.getsource(module.upgrade))}
+    declared = {index.name: (table.name, [column.name for column in index.columns],
+                             index.dialect_options["postgresql"].get("include") or None)
+                for table in Base.metadata.tables.values() for index in table.indexes}
+    assert len(ops.indexes) == 9
+    for name, index in ops.indexes.items():
+        assert declared.get(name) == (None if name in dropped else index), name
+
+
+def test_hot_queries_use_indexes(client, session_factory, monkeypatch, capsys):
+    # Seeds inside a transaction that is rolled back, so the test database is left as it was.
+    monkeypatch.setattr("sys.argv", ["explain_check", "--users", "50", "--transactions-per-user", "100"])
+    assert explain_check.main() == 0, capsys.readouterr().out
+    output = capsys.readouterr().out
+    assert "get_transactions" in output and "FAIL" not in output
+    with session_factory() as db:
+        assert db.query(Transaction).count() == 0
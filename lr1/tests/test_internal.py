@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+INTERNAL = {"Authorization": f"Bearer {os.environ['INTERNAL_TOKEN']}"}
+PATHS = ["/internal/db/pool", "/internal/db/replicas", "/internal/cache/auth", "/internal/cache/analytics",
+         "/internal/rate-limits", "/internal/outbox", "/metrics"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_operator_endpoints_require_the_internal_token(client, login, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # A user's JWT is not enough.
+    assert client.get(path, headers=login("operator")).status_code == 401
+    assert client.get(path, headers=INTERNAL).status_code == 200
+
+
+def test_operator_endpoints_are_not_mounted_without_a_token():
+    script = "import json, main; print(json.dumps([route.path for route in main.app.routes]))"
+    env = {**os.environ, "INTERNAL_TOKEN": ""}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(__file__)))
+    routes = json.loads(result.stdout.strip().splitlines()[-1])
+    assert "/finance/accounts" in routes
+    assert not [path for path in routes if path.startswith("/internal") or path == "/metrics"]
+
+
+def test_auth_cache_stats_moved_off_the_user_api(client, login):
+    headers = login("cache")
+    client.get("/auth/users/me", headers=headers)
+    assert client.get("/auth/cache/stats", headers=headers).status_code == 404
+    stats = client.get("/internal/cache/auth", headers=INTERNAL).json()
+    assert stats["size"] >= 1
@@ -0,0 +1,158 @@
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app import notification_retention as retention_cli
+from app.crud.finance import create_notification
+from app.crud.notifications import (
+    NotificationRetention, adjust_unread, budget_alert, collapse_alerts, get_unread_count, mark_read, purge_read
+)
+from app.models import Notification
+
+INTERNAL = {"Authorization": f"Bearer {os.environ['INTERNAL_TOKEN']}"}
+
+
+@pytest.fixture
+def inbox(client, login, session_factory):
+    headers = login("reader")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    other_id = client.get("/auth/users/me", headers=login("bystander")).json()["id"]
+    with session_factory() as db:
+        ids = [create_notification(db, user_id, f"Note {i}", "").id for i in range(25)]
+        others = [create_notification(db, other_id, "Other", "").id for _ in range(3)]
+    return headers, user_id, other_id, ids, others
+
+
+def unread(client, headers) -> int:
+    return client.get("/finance/notifications/unread-count", headers=headers).json()["unread"]
+
+
+def assert_counters_exact(session_factory, *user_ids):
+    # The stored counter always equals the number of unread rows.
+    with session_factory() as db:
+        for user_id in user_ids:
+            rows = db.query(Notification).filter(Notification.user_id == user_id, Notification.read_at.is_(None)).count()
+            assert get_unread_count(db, user_id) == rows, user_id
+
+
+def pages(client, headers, **params) -> list:
+    result, cursor = [], None
+    while True:
+        response = client.get("/finance/notifications", headers=headers,
+                              params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        result.append([row["id"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return result
+
+
+def test_listing_pages_newest_first(client, inbox):
+    headers, _, _, ids, _ = inbox
+    assert pages(client, headers, limit=10) == [ids[::-1][:10], ids[::-1][10:20], ids[::-1][20:]]
+    # An exact multiple of the limit ends with an empty page.
+    assert pages(client, headers, limit=25) == [ids[::-1], []]
+    assert client.get("/finance/notifications", params={"cursor": "?!"}, headers=headers).status_code == 400
+
+
+def test_mark_read_keeps_the_counter_exact(client, inbox, session_factory):
+    headers, user_id, other_id, ids, others = inbox
+    assert unread(client, headers) == 25
+    mark = lambda body: client.post("/finance/notifications/read", json=body, headers=headers).json()
+    # Someone else's ids are ignored.
+    assert mark({"ids": ids[:3] + others}) == {"updated": 3, "unread": 22}
+    assert mark({"ids": ids[:5]}) == {"updated": 2, "unread": 20}
+    assert mark({"up_to_id": ids[9]}) == {"updated": 5, "unread": 15}
+    assert mark({"up_to_id": ids[9]}) == {"updated": 0, "unread": 15}
+    assert mark({"ids": ids[10:20], "up_to_id": ids[14]}) == {"updated": 5, "unread": 10}
+    assert client.post("/finance/notifications/read", json={}, headers=headers).status_code == 400
+
+    unread_ids = [id for page in pages(client, headers, limit=4, unread="true") for id in page]
+    assert unread_ids == ids[15:][::-1]
+    assert_counters_exact(session_factory, user_id, other_id)
+    assert client.get("/finance/notifications", params={"limit": 1}, headers=headers).json()[0]["read_at"] is None
+
+
+def test_concurrent_mark_read(inbox, session_factory):
+    _, user_id, _, ids, _ = inbox
+
+    def mark(up_to_id):
+        with session_factory() as db:
+            return mark_read(db, user_id, up_to_id=up_to_id)
+
+    with ThreadPoolExecutor(4) as pool:
+        updated = list(pool.map(mark, [ids[i] for i in (24, 12, 20, 5, 24, 18)]))
+    # Each row is counted by exactly one of the overlapping updates.
+    assert sum(updated) == 25
+    assert_counters_exact(session_factory, user_id)
+
+
+def test_purge_read_only_moves_the_counter_for_unread_rows(client, inbox, session_factory):
+    headers, user_id, other_id, ids, others = inbox
+    long_ago = datetime.datetime.utcnow() - datetime.timedelta(days=400)
+    with session_factory() as db:
+        mark_read(db, user_id, up_to_id=ids[9])
+        # Old read rows go; an old unread row and recently read rows stay.
+        db.query(Notification).filter(Notification.id.in_(ids[:6])).update({"read_at": long_ago},
+                                                                          synchronize_session=False)
+        db.query(Notification).filter(Notification.id.in_(others[:1])).update({"created_at": long_ago},
+                                                                              synchronize_session=False)
+        db.commit()
+        assert purge_read(db, long_ago + datetime.timedelta(days=1), batch_size=4) == 6
+    remaining = [id for page in pages(client, headers) for id in page]
+    assert sorted(remaining) == ids[6:]
+    assert unread(client, headers) == 15
+    assert_counters_exact(session_factory, user_id, other_id)
+    with session_factory() as db:
+        assert db.get(Notification, others[0]) is not None
+
+
+def legacy_alerts(session_factory, user_id: int, specs: list) -> list:
+    # Budget alerts as written before dedup keys: one per expense, with the figures in the message.
+    with session_factory() as db:
+        rows = []
+        for category, spent, read in specs:
+            title, message = budget_alert(category, 100.0, spent)
+            rows.append(Notification(user_id=user_id, title=title, message=message,
+                                     read_at=datetime.datetime.utcnow() if read else None))
+        db.add_all(rows)
+        db.flush()
+        adjust_unread(db, user_id, sum(1 for _, _, read in specs if not read))
+        db.commit()
+        return [row.id for row in rows]
+
+
+def test_collapse_keeps_the_newest_alert_per_subject(client, inbox, session_factory):
+    headers, user_id, other_id, ids, _ = inbox
+    alerts = legacy_alerts(session_factory, user_id, [
+        ("Food", 120.0, False), ("Rent", 130.0, True), ("Food", 140.0, True), ("Food", 150.0, False),
+        ("Rent", 160.0, False), ("Food", 170.0, False)])
+    other_alert = legacy_alerts(session_factory, other_id, [("Food", 120.0, False)])
+    assert unread(client, headers) == 29
+    with session_factory() as db:
+        # Small batches page through the alerts and delete in several transactions.
+        assert collapse_alerts(db, batch_size=2) == 4
+        assert collapse_alerts(db, batch_size=2) == 0
+    remaining = [id for page in pages(client, headers) for id in page]
+    assert sorted(remaining) == ids + [alerts[4], alerts[5]]
+    assert unread(client, headers) == 27
+    assert_counters_exact(session_factory, user_id, other_id)
+    with session_factory() as db:
+        assert db.get(Notification, other_alert[0]) is not None
+
+
+def test_retention_job_and_cli(client, inbox, session_factory, monkeypatch, capsys):
+    headers, user_id, other_id, ids, _ = inbox
+    legacy_alerts(session_factory, user_id, [("Food", 120.0, False), ("Food", 130.0, False)])
+    with session_factory() as db:
+        mark_read(db, user_id, ids=ids[:4])
+    retention = NotificationRetention(session_factory, interval=0)
+    result = client.portal.call(retention.run)
+    assert result == {"collapsed": 1, "purged": 0} and retention.last_run["collapsed"] == 1
+
+    monkeypatch.setattr("sys.argv", ["notification_retention", "--retention-days", "-1", "--batch-size", "3"])
+    assert retention_cli.main() == 0
+    assert capsys.readouterr().out.strip() == '{"collapsed": 0, "purged": 4}'
+    assert unread(client, headers) == 22
+    assert_counters_exact(session_factory, user_id, other_id)
+    assert "retention" in client.get("/internal/notifications", headers=INTERNAL).json()
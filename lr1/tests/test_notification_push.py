@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.api.finance import sse_notifications
+from app.core import notifications
+from app.core.notifications import (
+    LocalBackend, NotificationBroker, PostgresBackend, build_backend, notification_broker, notification_event
+)
+from app.crud.finance import create_notification
+from app.database import engine
+from app.models import Notification
+
+INTERNAL = {"Authorization": f"Bearer {os.environ['INTERNAL_TOKEN']}"}
+
+
+def event(id: int, user_id: int = 1) -> dict:
+    return {"id": id, "user_id": user_id, "title": f"n{id}", "message": "", "created_at": "2025-01-01T00:00:00"}
+
+
+class Store:
+    # Stands in for the notifications table behind the replay fetch.
+    def __init__(self, ids=()):
+        self.events = [event(id) for id in ids]
+        self.fetches = 0
+
+    async def fetch(self, user_id: int, after_id: int, limit: int) -> list:
+        self.fetches += 1
+        return [item for item in self.events if item["user_id"] == user_id and item["id"] > after_id][:limit]
+
+
+def ids(items: list) -> list:
+    return [None if item is None else item["id"] for item in items]
+
+
+def test_replay_then_live_without_duplicates():
+    async def run():
+        broker = NotificationBroker(LocalBackend())
+        store = Store(range(1, 251))
+        stream = broker.events(1, 1, store.fetch, heartbeat=0.05)
+        # Replay comes in batches of NOTIFICATION_REPLAY_BATCH, oldest first.
+        replayed = [await anext(stream) for _ in range(249)]
+        assert ids(replayed) == list(range(2, 251)) and store.fetches == 3
+        assert broker.stats()["subscriptions"] == 1
+        # A live event that was already replayed is skipped; other users' events never arrive.
+        broker.dispatch([event(250), event(251, user_id=2), event(252)])
+        assert ids([await anext(stream), await anext(stream)]) == [252, None]
+        await stream.aclose()
+        assert broker.stats() == {"backend": "LocalBackend", "users": 0, "subscriptions": 0, "published": 3, "overflows": 0}
+    asyncio.run(run())
+
+
+def test_slow_consumer_catches_up_from_the_database():
+    async def run():
+        broker = NotificationBroker(LocalBackend(), queue_size=2)
+        store = Store()
+        stream = broker.events(1, 0, store.fetch, heartbeat=1)
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        store.events.append(event(1))
+        broker.dispatch([event(1)])
+        assert (await pending)["id"] == 1
+        # Three events into a queue of two: the queue is dropped rather than grown.
+        store.events.extend(event(id) for id in (2, 3, 4))
+        broker.dispatch([event(2), event(3), event(4)])
+        assert broker.stats()["overflows"] == 1
+        assert ids([await anext(stream) for _ in range(3)]) == [2, 3, 4]
+        # A listener reconnect marks every stream as lagged in the same way.
+        store.events.append(event(5))
+        broker.mark_all_lagged()
+        assert (await anext(stream))["id"] == 5
+        await stream.aclose()
+        assert broker.stats()["overflows"] == 1 and not broker.subscribers
+    asyncio.run(run())
+
+
+class RecordingBackend(LocalBackend):
+    def __init__(self):
+        super().__init__()
+        self.prepared, self.delivered = [], []
+
+    def prepare(self, session, events):
+        self.prepared.append([item["id"] for item in events])
+
+    def deliver(self, events):
+        self.delivered.append([item["id"] for item in events])
+
+
+def test_events_are_published_on_commit_only(client, login, session_factory, monkeypatch):
+    user_id = client.get("/auth/users/me", headers=login("pushed")).json()["id"]
+    backend = RecordingBackend()
+    monkeypatch.setattr(notification_broker, "backend", backend)
+    with session_factory() as db:
+        created = create_notification(db, user_id, "Hello", "world").id
+        assert backend.prepared == backend.delivered == [[created]]
+        db.add(Notification(user_id=user_id, title="Lost", message=""))
+        db.flush()
+        notifications.queue_notifications(db, [event(10 ** 6, user_id)])
+        db.rollback()
+        # Events dropped with the rollback are not sent by a later commit.
+        db.commit()
+    assert backend.delivered == [[created]]
+
+
+def test_backends():
+    backend = PostgresBackend("postgresql+asyncpg://user:secret@db:5432/finance")
+    assert backend.url == "postgresql://user:secret@db:5432/finance"
+    assert isinstance(build_backend("local"), LocalBackend)
+    with pytest.raises(ValueError):
+        build_backend("carrier-pigeon")
+
+
+@pytest.mark.skipif(engine.dialect.name != "postgresql", reason="LISTEN/NOTIFY needs PostgreSQL")
+def test_postgres_backend_delivers_committed_rows(client, login, session_factory, monkeypatch):
+    user_id = client.get("/auth/users/me", headers=login("notified")).json()["id"]
+    broker = NotificationBroker(PostgresBackend(engine.url.render_as_string(hide_password=False)))
+    # The sessions' commit hooks send NOTIFY through this backend; deliver does nothing.
+    monkeypatch.setattr(notification_broker, "backend", broker.backend)
+
+    async def nothing_to_replay(user_id, after_id, limit):
+        return []
+
+    async def run():
+        await broker.start()
+        stream = broker.events(user_id, 0, nothing_to_replay, heartbeat=0.05)
+        try:
+            # Subscribes, then gives the listener time to connect.
+            assert await anext(stream) is None
+            await asyncio.sleep(0.5)
+            created = await asyncio.to_thread(notify, session_factory, user_id, "Listened")
+            while True:
+                item = await asyncio.wait_for(anext(stream), 5)
+                if item is not None:
+                    return created, item
+        finally:
+            await stream.aclose()
+            await broker.stop()
+
+    created, item = client.portal.call(run)
+    assert item == created
+
+
+def notify(session_factory, user_id: int, title: str, message: str = "") -> dict:
+    with session_factory() as db:
+        return notification_event(create_notification(db, user_id, title, message))
+
+
+def test_websocket_replays_then_pushes(client, login, session_factory):
+    headers = login("listener")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    token = headers["Authorization"].removeprefix("Bearer ")
+    first = notify(session_factory, user_id, "First")
+    second = notify(session_factory, user_id, "Second")
+    with client.websocket_connect(f"/finance/notifications/ws?access_token={token}&last_id={first['id']}") as websocket:
+        assert websocket.receive_json() == {"event": "notification", "data": second}
+        assert client.get("/internal/notifications", headers=INTERNAL).json()["subscriptions"] == 1
+        # Committed from this thread, delivered through the broker on the app's event loop.
+        third = notify(session_factory, user_id, "Third")
+        assert websocket.receive_json() == {"event": "notification", "data": third}
+    with pytest.raises(WebSocketDisconnect) as rejected:
+        with client.websocket_connect("/finance/notifications/ws?access_token=nope") as websocket:
+            websocket.receive_json()
+    assert rejected.value.code == 1008
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_sse_frames(client, login, session_factory):
+    headers = login("sse")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    assert client.get("/finance/notifications/stream").status_code == 401
+    created = notify(session_factory, user_id, "Budget", "over")
+
+    async def frames():
+        stream = sse_notifications(ConnectedRequest(), user_id, 0)
+        try:
+            return [await anext(stream) for _ in range(2)]
+        finally:
+            await stream.aclose()
+
+    retry, frame = client.portal.call(frames)
+    assert retry == "retry: 3000\n\n"
+    header, data = frame.removesuffix("\n\n").split("\ndata: ")
+    assert header == f"id: {created['id']}\nevent: notification"
+    assert json.loads(data) == created
@@ -0,0 +1,129 @@
+import datetime
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import explain_check
+from app.core import partitions
+from app.database import engine
+
+LR1 = os.path.dirname(os.path.dirname(__file__))
+TODAY = datetime.date.today()
+BACKDATED = datetime.date(TODAY.year - 3, 2, 10)
+postgresql = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="partitioning needs PostgreSQL")
+
+
+def test_month_arithmetic():
+    assert partitions.add_months(datetime.date(2025, 11, 1), 3) == datetime.date(2026, 2, 1)
+    assert partitions.add_months(datetime.date(2025, 1, 1), -1) == datetime.date(2024, 12, 1)
+    assert partitions.month_start(datetime.date(2025, 2, 28)) == datetime.date(2025, 2, 1)
+    assert partitions.partition_name("transactions", datetime.date(2025, 2, 1)) == "transactions_2025_02"
+
+
+def test_maintenance_is_a_no_op_without_partitions():
+    # SQLite test databases and PostgreSQL databases built with create_all are not partitioned.
+    with engine.connect() as connection:
+        assert partitions.maintain(connection) == {"created": [], "archived": []}
+        assert partitions.oldest_partition_month(connection) is None
+
+
+@pytest.fixture(scope="module")
+def partitioned():
+    # A scratch database migrated with Alembic, where transactions is partitioned by month.
+    name = f"{engine.url.database}_partitions"
+    admin = engine.execution_options(isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+        connection.execute(text(f"CREATE DATABASE {name}"))
+    url = engine.url.set(database=name)
+    env = {**os.environ, "DATABASE_URL": url.render_as_string(hide_password=False)}
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], env=env, cwd=LR1, check=True, capture_output=True)
+    scratch = create_engine(url)
+    with scratch.begin() as connection:
+        user_id = connection.execute(text(
+            "INSERT INTO users (username, email, hashed_password) VALUES ('p', 'p@example.com', 'x') RETURNING id")).scalar()
+        account_id = connection.execute(text(
+            "INSERT INTO accounts (user_id, name, balance, opening_balance) VALUES (:user_id, 'a', 0, 0) RETURNING id"),
+            {"user_id": user_id}).scalar()
+        category_id = connection.execute(text("INSERT INTO categories (name) VALUES ('c') RETURNING id")).scalar()
+    yield scratch, user_id, account_id, category_id
+    scratch.dispose()
+    with admin.connect() as connection:
+        connection.execute(text(f"DROP DATABASE {name} WITH (FORCE)"))
+
+
+def insert_transaction(connection, user_id: int, account_id: int, category_id: int, date: datetime.date) -> int:
+    transaction_id = connection.execute(text(
+        "INSERT INTO transactions (user_id, account_id, amount, date, type) "
+        "VALUES (:user_id, :account_id, 10, :date, 'expense') RETURNING id"),
+        {"user_id": user_id, "account_id": account_id, "date": date}).scalar()
+    connection.execute(text(
+        "INSERT INTO transaction_categories (transaction_id, category_id, transaction_date, allocated_amount) "
+        "VALUES (:transaction_id, :category_id, :date, 10)"),
+        {"transaction_id": transaction_id, "category_id": category_id, "date": date})
+    return transaction_id
+
+
+def located(connection, table: str, column: str, value: int) -> str:
+    return connection.execute(text(f"SELECT tableoid::regclass::text FROM {table} WHERE {column} = :value"),
+                              {"value": value}).scalar()
+
+
+@postgresql
+def test_maintenance_creates_months_ahead_and_moves_backdated_rows(partitioned):
+    scratch, user_id, account_id, category_id = partitioned
+    with scratch.begin() as connection:
+        assert partitions.is_partitioned(connection)
+        assert partitions.oldest_partition_month(connection) == partitions.month_start(TODAY)
+        transaction_id = insert_transaction(connection, user_id, account_id, category_id, BACKDATED)
+        assert located(connection, "transactions", "id", transaction_id) == "transactions_default"
+
+        far_ahead = partitions.add_months(partitions.month_start(TODAY), 14)
+        result = partitions.maintain(connection, months_ahead=14)
+        month = partitions.month_start(BACKDATED)
+        assert result["created"][-4:] == [partitions.partition_name("transactions", far_ahead),
+                                          partitions.partition_name("transaction_categories", far_ahead),
+                                          partitions.partition_name("transactions", month),
+                                          partitions.partition_name("transaction_categories", month)]
+        assert located(connection, "transactions", "id", transaction_id) == partitions.partition_name("transactions", month)
+        assert located(connection, "transaction_categories", "transaction_id", transaction_id) == \
+            partitions.partition_name("transaction_categories", month)
+        assert partitions.default_months(connection) == []
+        assert partitions.maintain(connection, months_ahead=14) == {"created": [], "archived": []}
+
+
+@postgresql
+def test_retention_detaches_old_month_pairs(partitioned):
+    scratch, user_id, account_id, category_id = partitioned
+    month = partitions.month_start(BACKDATED)
+    with scratch.begin() as connection:
+        partitions.ensure_partitions(connection, month, month)
+        insert_transaction(connection, user_id, account_id, category_id, BACKDATED)
+        archived = partitions.archive_partitions(connection, partitions.add_months(month, 1))
+        assert archived == [partitions.partition_name("transaction_categories", month),
+                            partitions.partition_name("transactions", month)]
+        assert connection.execute(text("SELECT COUNT(*) FROM transactions WHERE date = :date"), {"date": BACKDATED}).scalar() == 0
+        assert connection.execute(text(
+            f"SELECT COUNT(*) FROM {partitions.PARTITION_ARCHIVE_SCHEMA}.{archived[1]}")).scalar() >= 1
+        assert partitions.oldest_partition_month(connection) > month
+
+
+@postgresql
+def test_date_bounded_queries_prune_to_one_month(partitioned):
+    scratch, _, _, _ = partitioned
+    with scratch.connect() as connection:
+        transaction = connection.begin()
+        db = Session(bind=connection)
+        try:
+            partitions.ensure_partitions(connection, explain_check.SEED_START,
+                                         explain_check.SEED_START + datetime.timedelta(days=explain_check.SEED_DAYS))
+            user_id, category_id = explain_check.seed(db, 5, 200)
+            for name, (statement, _) in explain_check.pruned_queries(db, user_id, category_id).items():
+                scanned = explain_check.PARTITION_SCAN.findall(explain_check.explain(db, statement))
+                assert scanned, name
+                assert all(table.endswith("_2022_01") for table in scanned), (name, scanned)
+        finally:
+            db.close()
+            transaction.rollback()
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+import pytest
+from app.core import security
+from app.models import User
+
+CHEAP = {"scrypt": {"n": 1024, "r": 8, "p": 1}, "pbkdf2_sha256": {"iterations": 1000}}
+
+
+@pytest.mark.parametrize("scheme", ["scrypt", "pbkdf2_sha256"])
+def test_hashes_are_salted_and_versioned(scheme):
+    hashed = security.hash_password("secret", scheme=scheme, cost=CHEAP[scheme])
+    assert hashed.startswith(scheme + "$")
+    assert security.hash_password("secret", scheme=scheme, cost=CHEAP[scheme]) != hashed
+    assert security.verify_password("secret", hashed)
+    assert not security.verify_password("Secret", hashed)
+
+
+def test_legacy_and_malformed_hashes():
+    assert security.verify_password("secret", hashlib.sha256(b"secret").hexdigest())
+    assert not security.verify_password("other", hashlib.sha256(b"secret").hexdigest())
+    assert not security.verify_password("secret", "scrypt$x$8$1$salt$key")
+    assert not security.verify_password("secret", "")
+    with pytest.raises(ValueError):
+        security.hash_password("secret", scheme="md5")
+
+
+def test_needs_rehash():
+    assert not security.needs_rehash(security.hash_password("secret"))
+    assert security.needs_rehash(hashlib.sha256(b"secret").hexdigest())
+    assert security.needs_rehash(security.hash_password("secret", scheme="scrypt", cost={"n": 512, "r": 8, "p": 1}))
+    assert security.needs_rehash(security.hash_password("secret", scheme="pbkdf2_sha256", cost=CHEAP["pbkdf2_sha256"]))
+
+
+def stored_hash(session_factory, username: str) -> str:
+    with session_factory() as db:
+        return db.query(User.hashed_password).filter(User.username == username).scalar()
+
+
+def test_login_upgrades_legacy_hashes(client, login, session_factory):
+    login("legacy")
+    with session_factory() as db:
+        db.query(User).filter(User.username == "legacy").update({"hashed_password": hashlib.sha256(b"password").hexdigest()})
+        db.commit()
+    assert client.post("/auth/login", data={"username": "legacy", "password": "wrong"}).status_code == 400
+    assert not stored_hash(session_factory, "legacy").startswith("scrypt$")
+    assert client.post("/auth/login", data={"username": "legacy", "password": "password"}).status_code == 200
+    upgraded = stored_hash(session_factory, "legacy")
+    assert upgraded.startswith("scrypt$") and not security.needs_rehash(upgraded)
+    assert client.post("/auth/login", data={"username": "legacy", "password": "password"}).status_code == 200
+
+
+def test_change_password(client, login):
+    headers = login("changer")
+    response = client.post("/auth/change-password", headers=headers,
+                           json={"old_password": "nope", "new_password": "better"})
+    assert response.status_code == 400
+    response = client.post("/auth/change-password", headers=headers,
+                           json={"old_password": "password", "new_password": "better"})
+    assert response.status_code == 200, response.text
+    assert client.post("/auth/login", data={"username": "changer", "password": "password"}).status_code == 400
+    assert client.post("/auth/login", data={"username": "changer", "password": "better"}).status_code == 200
+
+
+def test_full_hash_queue_answers_503(client, login, monkeypatch):
+    login("queued")
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(security, "_hash_slots", slots)
+    slots.acquire()
+    response = client.post("/auth/login", data={"username": "queued", "password": "password"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    slots.release()
+    assert client.post("/auth/login", data={"username": "queued", "password": "password"}).status_code == 200
@@ -0,0 +1,127 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.core.rate_limit import MemoryBackend, RateLimiter, RateLimitMiddleware, route_class
+from app.core.security import generate_jwt
+
+CONCURRENCY = {"analytics": 1, "writes": 2, "auth": 1}
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def limited(limits: dict, app=endpoint) -> tuple:
+    limiter = RateLimiter(MemoryBackend(), limits, CONCURRENCY, trust_forwarded=True)
+    return limiter, TestClient(RateLimitMiddleware(app, limiter))
+
+
+def get(client, path: str = "/finance/transactions", user_id: int = None, ip: str = "10.0.0.1", method: str = "GET"):
+    headers = {"X-Forwarded-For": ip}
+    if user_id is not None:
+        headers["Authorization"] = f"Bearer {generate_jwt({'user_id': user_id})}"
+    return client.request(method, path, headers=headers)
+
+
+def test_over_the_limit_answers_429_with_retry_after():
+    limiter, client = limited({"ip": (0.1, 2)})
+    assert [get(client).status_code for _ in range(2)] == [200, 200]
+    response = get(client)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "10"
+    assert response.json() == {"detail": "Too many requests, retry later"}
+    assert limiter.rejected == {"ip": 1}
+    # Another address has its own bucket.
+    assert get(client, ip="10.0.0.2").status_code == 200
+
+
+def test_authenticated_requests_are_charged_to_user_and_ip():
+    limiter, client = limited({"user": (0.1, 3), "ip": (0.1, 2)})
+    # One address, two users: the address runs out first.
+    assert [get(client, user_id=1).status_code, get(client, user_id=2).status_code] == [200, 200]
+    assert get(client, user_id=1).status_code == 429
+    assert limiter.rejected == {"ip": 1}
+    # One user spread over addresses: the user bucket still applies.
+    assert [get(client, user_id=3, ip=f"10.0.1.{i}").status_code for i in range(4)] == [200, 200, 200, 429]
+    assert limiter.rejected == {"ip": 1, "user": 1}
+
+
+def test_auth_routes_use_the_stricter_ip_bucket():
+    limiter, client = limited({"ip": (0.1, 10), "auth_ip": (0.1, 1)})
+    assert get(client, "/auth/login", method="POST").status_code == 200
+    assert get(client, "/auth/login", method="POST").status_code == 429
+    assert get(client, "/finance/transactions").status_code == 200
+    assert limiter.rejected == {"auth_ip": 1}
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/auth/login", "auth"),
+    ("GET", "/auth/users/me", None),
+    ("GET", "/finance/dashboard", "analytics"),
+    ("GET", "/finance/analysis/expenses", "analytics"),
+    ("GET", "/finance/accounts/1/projection", "analytics"),
+    ("POST", "/finance/transactions", "writes"),
+    ("DELETE", "/finance/accounts/1", "writes"),
+    ("GET", "/finance/transactions", None),
+])
+def test_route_class(method, path, expected):
+    assert route_class(method, path) == expected
+
+
+def test_concurrency_caps_per_route_class():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen[scope["path"]] = dict(limiter.active)
+        await endpoint(scope, receive, send)
+
+    limiter, client = limited({}, app)
+    assert get(client, "/finance/dashboard").status_code == 200
+    assert seen["/finance/dashboard"]["analytics"] == 1
+    assert limiter.active == {"analytics": 0, "writes": 0, "auth": 0}
+
+    limiter.active["analytics"] = CONCURRENCY["analytics"]
+    response = get(client, "/finance/dashboard")
+    assert response.status_code == 429 and response.headers["retry-after"] == "1"
+    # Other classes and unclassified routes are not held up by a full analytics slot.
+    assert get(client, "/finance/transactions", method="POST").status_code == 200
+    assert get(client, "/finance/transactions").status_code == 200
+    assert limiter.rejected == {"analytics": 1}
+
+    limiter.active["analytics"] = 0
+    assert limiter.acquire("writes") and limiter.acquire("writes") and not limiter.acquire("writes")
+    limiter.release("writes")
+    assert limiter.acquire("writes")
+    assert all(limiter.acquire(None) for _ in range(10))
+
+
+def test_full_backend_keeps_throttled_clients():
+    backend = MemoryBackend(max_keys=20)
+    now = 1000.0
+    assert backend.take("victim", 0.01, 1, now) == 0
+    for i in range(200):
+        now += 0.01
+        # A throttled client that keeps retrying stays throttled however many new keys arrive.
+        assert backend.take("victim", 0.01, 1, now) > 0
+        backend.take(f"spray:{i}", 0.01, 1, now)
+        assert backend.size() <= 20
+
+
+def test_full_backend_evicts_idle_buckets_first():
+    backend = MemoryBackend(max_keys=10)
+    for i in range(10):
+        backend.take(f"key:{i}", 0.01, 1, float(i))
+    backend.take("key:0", 0.01, 1, 10.0)
+    backend.take("new", 0.01, 1, 11.0)
+    assert backend.size() <= 10
+    assert "key:0" in backend._buckets and "key:1" not in backend._buckets
+
+
+def test_token_cache_is_bounded_without_clearing():
+    limiter = RateLimiter(MemoryBackend(), {}, {}, max_keys=10)
+    tokens = [generate_jwt({"user_id": user_id}) for user_id in range(30)]
+    for user_id, token in enumerate(tokens):
+        assert limiter.user_id(token) == user_id
+        assert len(limiter._tokens) <= 10
+    assert tokens[-1] in limiter._tokens and tokens[0] not in limiter._tokens
+    assert len(limiter._tokens) >= 9
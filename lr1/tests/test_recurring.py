@@ -0,0 +1,37 @@
+import datetime
+from app import recurring_worker
+from app.models import UserForecast
+
+
+def test_scheduler_clamps_month_end_and_reruns_post_nothing(client, login, session_factory):
+    headers = login("scheduler")
+    category_id = client.post("/finance/categories", json={"name": "rent"}, headers=headers).json()["id"]
+    account_id = client.post("/finance/accounts", json={"name": "main", "balance": 0}, headers=headers).json()["id"]
+    response = client.post("/finance/recurring", headers=headers, json={
+        "account_id": account_id, "amount": 100, "type": "expense", "frequency": "monthly",
+        "start_date": "2025-01-31", "categories": [{"category_id": category_id, "allocated_amount": 100}],
+    })
+    assert response.status_code == 200, response.text
+    # Stores a forecast that the postings have to discard.
+    assert client.get("/finance/forecast", headers=headers).status_code == 200
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+
+    today = datetime.date(2025, 3, 31)
+    clock = lambda: today
+    assert recurring_worker.run(clock=clock, once=True, session_factory=session_factory) == 3
+    dates = sorted(row["date"] for row in client.get("/finance/transactions", headers=headers).json())
+    assert dates == ["2025-01-31", "2025-02-28", "2025-03-31"]
+    with session_factory() as db:
+        assert db.query(UserForecast).filter(UserForecast.user_id == user_id).count() == 0
+
+    assert recurring_worker.run(clock=clock, once=True, session_factory=session_factory) == 0
+    today = datetime.date(2025, 4, 29)
+    assert recurring_worker.run(clock=clock, once=True, session_factory=session_factory) == 0
+    today = datetime.date(2025, 4, 30)
+    assert recurring_worker.run(clock=clock, once=True, session_factory=session_factory) == 1
+
+    rule = client.get("/finance/recurring", headers=headers).json()[0]
+    assert (rule["occurrence_count"], rule["last_date"], rule["next_date"]) == (4, "2025-04-30", "2025-05-31")
+    trends = {row["month"]: row["total_expense"] for row in client.get("/finance/trends/spending", headers=headers).json()}
+    assert trends == {"2025-01": 100, "2025-02": 100, "2025-03": 100, "2025-04": 100}
+    assert client.get("/finance/accounts", headers=headers).json()[0]["balance"] == -400
@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.replicas import Replica, ReplicaSet
+from app.database import (Base, RoutingSession, async_engine, async_url, engine_options, replicas, run_read,
+                          run_write, use_primary)
+from app.models import Category
+
+
+def make_replica(path, name: str) -> Replica:
+    # A SQLite file with the schema and one category naming the database, so a read shows where it went.
+    url = f"sqlite:///{path}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    with sync_engine.begin() as connection:
+        connection.execute(Category.__table__.insert(), {"name": name})
+    sync_engine.dispose()
+    return Replica(name, create_async_engine(async_url(url), **engine_options(async_url(url), is_async=True)))
+
+
+@pytest.fixture
+def two_replicas(tmp_path):
+    pair = [make_replica(tmp_path / "a.db", "replica-a"), make_replica(tmp_path / "b.db", "replica-b")]
+    yield pair
+    for replica in pair:
+        asyncio.run(replica.engine.dispose())
+
+
+def category_names(db) -> list:
+    return [name for name, in db.query(Category.name).order_by(Category.name)]
+
+
+def add_category(db, name: str):
+    db.add(Category(name=name))
+    db.flush()
+
+
+def test_round_robin_alternates(two_replicas):
+    replica_set = ReplicaSet(two_replicas)
+    assert [replica_set.choose().name for _ in range(4)] == ["replica-a", "replica-b", "replica-a", "replica-b"]
+    assert [replica.selected for replica in two_replicas] == [2, 2]
+
+
+def test_least_loaded_avoids_busy_replica(two_replicas):
+    replica_set = ReplicaSet(two_replicas, strategy="least_loaded")
+    a, b = two_replicas
+    # Equal load: ties go to the replica chosen least often.
+    assert [replica_set.choose().name for _ in range(4)] == ["replica-a", "replica-b", "replica-a", "replica-b"]
+
+    async def hold_connection():
+        async with a.engine.connect():
+            assert a.load() == 1 and b.load() == 0
+            return [replica_set.choose().name for _ in range(3)]
+
+    assert asyncio.run(hold_connection()) == ["replica-b"] * 3
+    assert a.load() == 0
+
+
+def test_unknown_strategy_is_rejected(two_replicas):
+    with pytest.raises(ValueError):
+        ReplicaSet(two_replicas, strategy="random")
+
+
+def test_unhealthy_replica_is_ejected_and_readmitted(two_replicas, tmp_path):
+    # The directory does not exist yet, so SQLite cannot open the file.
+    missing = tmp_path / "missing" / "c.db"
+    url = async_url(f"sqlite:///{missing}")
+    broken = Replica("replica-c", create_async_engine(url, **engine_options(url, is_async=True)))
+    replica_set = ReplicaSet([two_replicas[0], broken])
+
+    async def check():
+        await replica_set.check_all()
+        return [replica.healthy for replica in replica_set.replicas]
+
+    assert asyncio.run(check()) == [True, False]
+    assert broken.last_error and broken.last_check
+    assert {replica_set.choose().name for _ in range(4)} == {"replica-a"}
+
+    two_replicas[0].healthy = False
+    assert replica_set.choose() is None
+
+    missing.parent.mkdir()
+    assert asyncio.run(check()) == [True, True]
+    assert broken.last_error is None
+    assert {replica_set.choose().name for _ in range(4)} == {"replica-a", "replica-c"}
+    asyncio.run(broken.engine.dispose())
+
+
+def test_routing_session_pins_reads_after_writes(client, two_replicas, session_factory, monkeypatch):
+    with session_factory() as db:
+        db.add(Category(name="primary"))
+        db.commit()
+    monkeypatch.setattr(replicas, "replicas", two_replicas)
+    monkeypatch.setattr(replicas, "strategy", "round_robin")
+    sessions = async_sessionmaker(async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False)
+
+    async def routed():
+        seen = {}
+        async with sessions() as db:
+            # A read session sticks to the replica it started on.
+            seen["read"] = await run_read(db, category_names)
+            seen["read again"] = await run_read(db, category_names)
+            seen["replica"] = db.sync_session.info["replica"].name
+        async with sessions() as db:
+            seen["next session"] = await run_read(db, category_names)
+        async with sessions() as db:
+            await run_write(db, add_category, "written")
+            seen["after write"] = await run_read(db, category_names)
+        async with sessions() as db:
+            use_primary(db)
+            seen["pinned"] = await run_read(db, category_names)
+            assert "replica" not in db.sync_session.info
+        return seen
+
+    seen = client.portal.call(routed)
+    assert seen["read"] == seen["read again"] == [seen["replica"]]
+    assert {seen["read"][0], seen["next session"][0]} == {"replica-a", "replica-b"}
+    # Once the session has written, reads see the primary, including the uncommitted row.
+    assert seen["after write"] == ["primary", "written"]
+    assert seen["pinned"] == ["primary"]
@@ -0,0 +1,125 @@
+import logging
+import os
+import subprocess
+import sys
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core import request_metrics as request_metrics_module
+from app.core.metrics import Histogram, render_histograms
+from app.core.request_metrics import RequestMetrics, RequestMetricsMiddleware, request_metrics
+from app.database import SessionLocal
+
+INTERNAL = {"Authorization": f"Bearer {os.environ['INTERNAL_TOKEN']}"}
+ACCOUNT_ROUTE = "/finance/accounts/{account_id}"
+
+
+def key(method: str, route: str, status: str) -> tuple:
+    return (("method", method), ("route", route), ("status", status))
+
+
+def observed(metrics: RequestMetrics, series: tuple) -> tuple:
+    # (requests, statements, response bytes) recorded so far for one series.
+    histograms = metrics.series.get(series)
+    if histograms is None:
+        return 0, 0, 0
+    latency, _, statements, _, size = histograms
+    return latency.count, statements.sum, size.sum
+
+
+def test_histograms_render_as_prometheus_text():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 9):
+        histogram.observe(value)
+    assert histogram.cumulative() == ([(1, 2), (5, 3)], 4, 13.5)
+    assert render_histograms("x", "An example", {(("route", 'a"b'),): histogram, (): Histogram((1,))}) == [
+        "# HELP x An example", "# TYPE x histogram",
+        'x_bucket{route="a\\"b",le="1"} 2', 'x_bucket{route="a\\"b",le="5"} 3', 'x_bucket{route="a\\"b",le="+Inf"} 4',
+        'x_sum{route="a\\"b"} 13.5', 'x_count{route="a\\"b"} 4',
+        'x_bucket{le="1"} 0', 'x_bucket{le="+Inf"} 0', "x_sum 0", "x_count 0",
+    ]
+
+
+def test_requests_are_recorded_under_their_route_template(client, login, count_statements):
+    headers = login("measured")
+    ids = [client.post("/finance/accounts", json={"name": f"a{i}", "balance": 0}, headers=headers).json()["id"]
+           for i in range(2)]
+    series = key("GET", ACCOUNT_ROUTE, "2xx")
+    before = observed(request_metrics, series)
+    with count_statements() as counter:
+        responses = [client.get(f"/finance/accounts/{account_id}", headers=headers) for account_id in ids]
+    requests, statements, size = observed(request_metrics, series)
+    # Both ids land in one series, with every statement from the async engine counted.
+    assert requests - before[0] == 2
+    assert statements - before[1] == counter.count > 0
+    assert size - before[2] == sum(len(response.content) for response in responses)
+    assert not [labels for labels in request_metrics.series if str(ids[0]) in dict(labels)["route"]]
+
+    missing = observed(request_metrics, key("GET", ACCOUNT_ROUTE, "4xx"))[0]
+    unmatched = observed(request_metrics, key("GET", "unmatched", "4xx"))[0]
+    assert client.get("/finance/accounts/999999", headers=headers).status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+    assert observed(request_metrics, key("GET", ACCOUNT_ROUTE, "4xx"))[0] == missing + 1
+    assert observed(request_metrics, key("GET", "unmatched", "4xx"))[0] == unmatched + 1
+
+
+def test_metrics_endpoint(client, login):
+    client.get("/auth/users/me", headers=login("scraped"))
+    response = client.get("/metrics", headers=INTERNAL)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    for name in ("http_request_duration_seconds", "http_request_db_seconds", "http_request_sql_statements",
+                 "http_request_db_rows", "http_response_size_bytes", "db_pool_checkout_wait_seconds"):
+        assert f"# TYPE {name} histogram" in lines
+    assert any(line.startswith('http_request_sql_statements_count{method="GET",route="/auth/users/me",status="2xx"}')
+               for line in lines)
+
+
+def sql_app(statements: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work/{n}")
+    def work(n: int):
+        # A sync endpoint: it runs in the threadpool, in a copy of the request's context.
+        with SessionLocal() as db:
+            for _ in range(statements):
+                db.execute(text("SELECT 1"))
+        return {"n": n}
+    return app
+
+
+def test_slow_requests_are_logged_with_their_sql(monkeypatch, caplog):
+    monkeypatch.setattr(request_metrics_module, "SLOW_REQUEST_MAX_STATEMENTS", 2)
+    metrics = RequestMetrics()
+    with TestClient(RequestMetricsMiddleware(sql_app(5), metrics=metrics, slow_seconds=1e-9)) as client:
+        with caplog.at_level(logging.WARNING, logger="app.core.request_metrics"):
+            assert client.get("/work/7").json() == {"n": 7}
+    assert observed(metrics, key("GET", "/work/{n}", "2xx"))[:2] == (1, 5)
+    [record] = caplog.records
+    message = record.getMessage()
+    assert message.startswith("Slow request GET /work/{n} -> 200:") and "5 statement(s)" in message
+    assert message.count("SELECT 1") == 2 and message.endswith("... 3 more statement(s)")
+
+
+def test_fast_requests_are_not_logged(caplog):
+    with TestClient(RequestMetricsMiddleware(sql_app(1), metrics=RequestMetrics(), slow_seconds=60)) as client:
+        with caplog.at_level(logging.WARNING, logger="app.core.request_metrics"):
+            client.get("/work/1")
+    assert caplog.records == []
+
+
+def test_disabled_metrics_add_no_middleware_or_listeners():
+    script = ("import main\n"
+              "from sqlalchemy import event\n"
+              "from app.database import engine\n"
+              "from app.core.request_metrics import RequestMetricsMiddleware, _after_cursor_execute\n"
+              "print(any(m.cls is RequestMetricsMiddleware for m in main.app.user_middleware),"
+              " event.contains(engine, 'after_cursor_execute', _after_cursor_execute))")
+    results = []
+    for enabled in ("1", "0"):
+        env = {**os.environ, "REQUEST_METRICS_ENABLED": enabled}
+        result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(__file__)))
+        results.append(result.stdout.strip().splitlines()[-1])
+    assert results == ["True True", "False False"]
@@ -0,0 +1,73 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.api import finance
+from app.core.replicas import Replica
+from app.core.response_cache import MemoryBackend, ResponseCache, etag_matches
+from app.database import Base, replicas
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"x", W/"abc" , "y"', True),
+    ("*", True),
+    (' * ', True),
+    ('W/"abcd"', False),
+    ('W/"ab"', False),
+    ('"x,W/\\"abc\\""', False),
+    ('W/"abc"0', False),
+    ('"x" "abc"', False),
+    ("abc", False),
+    ("", False),
+])
+def test_etag_matches_whole_tags(header, matches):
+    assert etag_matches(header, 'W/"abc"') is matches
+
+
+def test_memory_backend_versions_are_bounded():
+    cache = ResponseCache(MemoryBackend(maxsize=3), dependencies={"dashboard": ("transactions",)})
+    first = cache.key(1, "dashboard")
+    assert cache.key(1, "dashboard") == first
+    for user_id in range(2, 50):
+        cache.invalidate(user_id, "transactions")
+    assert len(cache.backend._versions._data) <= 3
+    # The evicted versions come back as new ones, so nothing cached under the old key is served.
+    assert cache.key(1, "dashboard") != first
+
+
+def test_not_modified_for_listed_and_wildcard_tags(client, login):
+    headers = login("etags")
+    response = client.get("/finance/dashboard", headers=headers)
+    etag = response.headers["etag"]
+    strong = etag.removeprefix("W/")
+    for if_none_match in (etag, f'"other", {strong}', "*"):
+        assert client.get("/finance/dashboard", headers={**headers, "If-None-Match": if_none_match}).status_code == 304
+    assert client.get("/finance/dashboard", headers={**headers, "If-None-Match": etag + "0"}).status_code == 200
+
+
+@pytest.fixture
+def lagging_replica(tmp_path):
+    # A replica with the schema but none of the data: as far behind as a replica can be.
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    Base.metadata.create_all(create_engine(url))
+    replica = Replica("lagging", create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://")))
+    replicas.replicas.append(replica)
+    yield replica
+    replicas.replicas.remove(replica)
+
+
+def test_first_miss_after_invalidation_reads_the_primary(client, login, lagging_replica, monkeypatch):
+    headers = login("replicated")
+    client.get("/auth/users/me", headers=headers)
+    account_id = client.post("/finance/accounts", json={"name": "main", "balance": 0}, headers=headers).json()["id"]
+    client.post("/finance/transactions", json={"account_id": account_id, "amount": 25, "type": "income"}, headers=headers)
+    assert client.get("/finance/dashboard", headers=headers).json()["total_income"] == 25
+    assert lagging_replica.selected == 0
+
+    # Outside the window a miss is served by the replica, which has not seen the write.
+    client.post("/finance/transactions", json={"account_id": account_id, "amount": 5, "type": "income"}, headers=headers)
+    monkeypatch.setattr(finance, "ANALYTICS_CACHE_PRIMARY_SECONDS", 0)
+    assert client.get("/finance/dashboard", headers=headers).json()["total_income"] == 0
+    assert lagging_replica.selected > 0
@@ -0,0 +1,148 @@
+import datetime
+import random
+from collections import defaultdict
+import pytest
+from sqlalchemy import and_, func
+from app.crud.finance import get_dashboard_summary, get_expense_analysis, get_spending_trends
+from app.crud.aggregates import month_key
+from app.crud.archive import archive_transactions, iter_archived_transactions
+from app.models import Category, Transaction, TransactionCategory, TransactionType
+
+START = datetime.date(2025, 1, 1)
+DAYS = 540
+# Whole months, partial months at either end, a single month and open-ended ranges.
+RANGES = [
+    (None, None),
+    (datetime.date(2025, 3, 15), datetime.date(2025, 11, 10)),
+    (datetime.date(2025, 6, 1), datetime.date(2025, 6, 30)),
+    (datetime.date(2025, 6, 10), datetime.date(2025, 6, 20)),
+    (datetime.date(2025, 9, 2), None),
+    (None, datetime.date(2025, 4, 17)),
+]
+
+
+def raw_dashboard(db, user_id: int) -> dict:
+    totals = dict(db.query(Transaction.type, func.sum(Transaction.amount))
+                  .filter(Transaction.user_id == user_id).group_by(Transaction.type).all())
+    income = totals.get(TransactionType.income) or 0.0
+    expense = totals.get(TransactionType.expense) or 0.0
+    return {"total_income": income, "total_expense": expense, "net_savings": income - expense}
+
+
+def _in_range(query, column, date_from, date_to):
+    if date_from:
+        query = query.filter(column >= date_from)
+    if date_to:
+        query = query.filter(column <= date_to)
+    return query
+
+
+def raw_spending_trends(db, user_id: int, date_from=None, date_to=None) -> dict:
+    query = db.query(Transaction.date, func.sum(Transaction.amount))\
+              .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense)
+    months = defaultdict(float)
+    for date, amount in _in_range(query, Transaction.date, date_from, date_to).group_by(Transaction.date):
+        months[month_key(date)] += amount
+    return dict(months)
+
+
+def raw_expense_analysis(db, user_id: int, date_from=None, date_to=None) -> dict:
+    query = db.query(Category.name, func.sum(TransactionCategory.allocated_amount))\
+              .join(TransactionCategory, TransactionCategory.category_id == Category.id)\
+              .join(Transaction, and_(Transaction.id == TransactionCategory.transaction_id,
+                                      Transaction.date == TransactionCategory.transaction_date))\
+              .filter(Transaction.user_id == user_id, Transaction.type == TransactionType.expense)
+    return dict(_in_range(query, Transaction.date, date_from, date_to).group_by(Category.name).all())
+
+
+def assert_equivalent(session_factory, user_id: int, step: str):
+    with session_factory() as db:
+        assert get_dashboard_summary(db, user_id) == pytest.approx(raw_dashboard(db, user_id)), step
+        for date_from, date_to in RANGES:
+            label = f"{step} {date_from}..{date_to}"
+            trends = {row["month"]: row["total_expense"]
+                      for row in get_spending_trends(db, user_id, date_from=date_from, date_to=date_to)}
+            assert trends == pytest.approx(raw_spending_trends(db, user_id, date_from, date_to)), label
+            analysis = {row["category"]: row["total_expense"]
+                        for row in get_expense_analysis(db, user_id, date_from=date_from, date_to=date_to)}
+            assert analysis == pytest.approx(raw_expense_analysis(db, user_id, date_from, date_to)), label
+
+
+def random_transaction(rng: random.Random, accounts: list, categories: list) -> dict:
+    type = rng.choice(["expense", "expense", "income"])
+    amount = round(rng.uniform(1, 500), 2)
+    transaction = {"account_id": rng.choice(accounts), "amount": amount, "type": type,
+                   "date": (START + datetime.timedelta(days=rng.randrange(DAYS))).isoformat()}
+    if type == "expense":
+        chosen = rng.sample(categories, rng.randint(0, 2))
+        transaction["categories"] = [{"category_id": category_id, "allocated_amount": round(amount / len(chosen), 2)}
+                                     for category_id in chosen]
+    return transaction
+
+
+def test_rollups_match_raw_aggregates(client, login, session_factory):
+    rng = random.Random(20251017)
+    headers = login("rollups")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    categories = [client.post("/finance/categories", json={"name": f"category {i}"}, headers=headers).json()["id"]
+                  for i in range(5)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(3)]
+    # Another user's data must not leak into the totals.
+    other = login("neighbour")
+    other_account = client.post("/finance/accounts", json={"name": "other", "balance": 0}, headers=other).json()["id"]
+    client.post("/finance/transactions/bulk", headers=other,
+                json=[random_transaction(rng, [other_account], categories) for _ in range(50)])
+
+    ids = []
+    for _ in range(40):
+        response = client.post("/finance/transactions", json=random_transaction(rng, accounts, categories), headers=headers)
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+    assert_equivalent(session_factory, user_id, "create")
+
+    response = client.post("/finance/transactions/bulk", headers=headers,
+                           json=[random_transaction(rng, accounts, categories) for _ in range(300)])
+    assert response.status_code == 200, response.text
+    assert_equivalent(session_factory, user_id, "bulk import")
+
+    ids.extend(row["id"] for row in client.get("/finance/transactions?limit=1000", headers=headers).json() if row["id"] not in ids)
+    for transaction_id in rng.sample(ids, 60):
+        # Changes amount, date (often into another month), type and account, keeping the allocations.
+        update = random_transaction(rng, accounts, categories)
+        update.pop("categories", None)
+        response = client.put(f"/finance/transactions/{transaction_id}", json=update, headers=headers)
+        assert response.status_code == 200, response.text
+    assert_equivalent(session_factory, user_id, "update")
+
+    for transaction_id in rng.sample(ids, 50):
+        assert client.delete(f"/finance/transactions/{transaction_id}", headers=headers).status_code == 200
+    assert_equivalent(session_factory, user_id, "delete")
+
+    assert client.delete(f"/finance/accounts/{accounts[0]}", headers=headers).status_code == 200
+    assert_equivalent(session_factory, user_id, "account delete")
+
+
+def test_account_delete_reverses_archived_allocations(client, login, session_factory):
+    rng = random.Random(7)
+    headers = login("archived")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    categories = [client.post("/finance/categories", json={"name": f"archived {i}"}, headers=headers).json()["id"]
+                  for i in range(3)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(2)]
+    client.post("/finance/transactions/bulk", headers=headers,
+                json=[random_transaction(rng, accounts, categories) for _ in range(200)])
+    with session_factory() as db:
+        assert archive_transactions(db, datetime.date(2025, 10, 1), user_id=user_id)
+    assert client.delete(f"/finance/accounts/{accounts[0]}", headers=headers).status_code == 200
+
+    with session_factory() as db:
+        expected = defaultdict(float, raw_expense_analysis(db, user_id))
+        names = dict(db.query(Category.id, Category.name))
+        for row in iter_archived_transactions(db, user_id, type=TransactionType.expense):
+            assert row["account_id"] == accounts[1]
+            for category_id, allocated_amount in row["categories"]:
+                expected[names[category_id]] += allocated_amount
+        analysis = {row["category"]: row["total_expense"] for row in get_expense_analysis(db, user_id)}
+    assert analysis == pytest.approx(dict(expected))
@@ -0,0 +1,108 @@
+import datetime
+import pytest
+from app.crud.outbox import drain
+from conftest import reset_database
+
+SMALL, LARGE = 2, 12
+
+# Every finance read endpoint; ids are filled in from the seeded data.
+READ_ENDPOINTS = [
+    "/finance/accounts",
+    "/finance/accounts?expand=transactions",
+    "/finance/accounts/{account}",
+    "/finance/accounts/{account}?expand=transactions",
+    "/finance/accounts/{account}/totals",
+    "/finance/transactions?limit=1000",
+    "/finance/transactions?expand=categories&limit=1000",
+    "/finance/transactions/{transaction}",
+    "/finance/categories",
+    "/finance/budgets",
+    "/finance/budgets?expand=category",
+    "/finance/budgets/{budget}/projection",
+    "/finance/goals",
+    "/finance/goals/{goal}/projection",
+    "/finance/recurring",
+    "/finance/forecast",
+    "/finance/notifications",
+    "/finance/notifications/unread-count",
+    "/finance/dashboard",
+    "/finance/trends/spending",
+    "/finance/analysis/expenses",
+    "/finance/analysis/series",
+    "/finance/analysis/year-over-year",
+    "/finance/analysis/percentiles",
+    "/finance/analysis/accounts",
+]
+
+
+def seed(client, headers: dict, name: str, size: int) -> dict:
+    today = datetime.date.today()
+    months = [(today.replace(day=1) - datetime.timedelta(days=31 * i)).replace(day=1) for i in range(size)]
+    categories = [client.post("/finance/categories", json={"name": f"{name}-category-{i}"}, headers=headers).json()["id"]
+                  for i in range(size)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 1000}, headers=headers).json()["id"]
+                for i in range(size)]
+    transactions = []
+    for account_id in accounts:
+        for i, month in enumerate(months):
+            transactions.append({
+                "account_id": account_id, "amount": 30 + i, "date": month.isoformat(), "type": "expense",
+                "categories": [{"category_id": categories[i], "allocated_amount": 20},
+                               {"category_id": categories[-1 - i], "allocated_amount": 10 + i}],
+            })
+            transactions.append({"account_id": account_id, "amount": 100, "date": month.isoformat(), "type": "income"})
+    assert client.post("/finance/transactions/bulk", json=transactions, headers=headers).status_code == 200
+    budgets = [client.post("/finance/budgets", json={"category_id": category_id, "period": f"{month:%Y-%m}", "limit_amount": 5},
+                           headers=headers).json()["id"] for category_id, month in zip(categories, months)]
+    goals = [client.post("/finance/goals", json={"name": f"goal {i}", "target_amount": 5000, "current_amount": 100 * i,
+                                                 "due_date": (today + datetime.timedelta(days=365)).isoformat()},
+                         headers=headers).json()["id"] for i in range(size)]
+    for i, account_id in enumerate(accounts):
+        client.post("/finance/recurring", json={
+            "account_id": account_id, "amount": 10, "type": "expense", "frequency": "monthly",
+            "start_date": (today + datetime.timedelta(days=30)).isoformat(),
+            "categories": [{"category_id": categories[i], "allocated_amount": 10}],
+        }, headers=headers)
+    transaction_id = client.get("/finance/transactions?limit=1", headers=headers).json()[0]["id"]
+    return {"account": accounts[0], "transaction": transaction_id, "budget": budgets[0], "goal": goals[0]}
+
+
+@pytest.fixture(scope="module")
+def seeded(app_client, login, session_factory):
+    reset_database()
+    users = {}
+    for size in (SMALL, LARGE):
+        headers = login(f"user{size}")
+        users[size] = (headers, seed(app_client, headers, f"user{size}", size))
+    # Budget notifications come from the outbox.
+    with session_factory() as db:
+        drain(db)
+    return users
+
+
+def request_statements(client, count_statements, headers: dict, path: str) -> int:
+    with count_statements() as counter:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return counter.count
+
+
+@pytest.mark.parametrize("endpoint", READ_ENDPOINTS)
+def test_statement_count_does_not_grow_with_rows(app_client, seeded, count_statements, endpoint):
+    counts = {}
+    for size, (headers, ids) in seeded.items():
+        path = endpoint.format(**ids)
+        # Warm the principal cache so only the endpoint's own statements are counted.
+        app_client.get("/auth/users/me", headers=headers)
+        counts[size] = request_statements(app_client, count_statements, headers, path)
+    assert counts[SMALL] > 0
+    assert counts[SMALL] == counts[LARGE], f"{endpoint}: {counts}"
+
+
+def test_seeded_sizes_differ(app_client, seeded):
+    # Guards the test above against seeding that silently produced the same data twice.
+    sizes = {size: len(app_client.get("/finance/transactions?limit=1000", headers=headers).json()) for size, (headers, _) in seeded.items()}
+    assert sizes == {SMALL: 2 * SMALL * SMALL, LARGE: 2 * LARGE * LARGE}
+    unread = {size: app_client.get("/finance/notifications/unread-count", headers=headers).json()["unread"]
+              for size, (headers, _) in seeded.items()}
+    assert 0 < unread[SMALL] < unread[LARGE]
@@ -0,0 +1,85 @@
+import datetime
+import json
+import random
+from app.core.cold_storage import cold_store
+from app.crud import async_finance, finance
+from app.crud.archive import archive_transactions
+from app.database import AsyncSessionLocal
+
+START = datetime.date(2025, 1, 1)
+ARCHIVE_BEFORE = datetime.date(2025, 5, 1)
+
+
+def seed(client, login, rng: random.Random, count: int = 150):
+    headers = login("exporter")
+    user_id = client.get("/auth/users/me", headers=headers).json()["id"]
+    categories = [client.post("/finance/categories", json={"name": f"export {i}"}, headers=headers).json()["id"]
+                  for i in range(3)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(2)]
+    transactions = []
+    for _ in range(count):
+        # Few distinct dates, so many rows share a date and only the id breaks the tie.
+        amount = round(rng.uniform(1, 100), 2)
+        transactions.append({
+            "account_id": rng.choice(accounts), "amount": amount, "type": "expense",
+            "date": (START + datetime.timedelta(days=7 * rng.randrange(26))).isoformat(),
+            "categories": [{"category_id": rng.choice(categories), "allocated_amount": amount}],
+        })
+    assert client.post("/finance/transactions/bulk", json=transactions, headers=headers).status_code == 200
+    return headers, user_id
+
+
+def normalized(items: list) -> list:
+    for item in items:
+        item["transaction_categories"].sort(key=lambda tc: tc["category"]["id"])
+    return items
+
+
+def export(client, headers, **params) -> list:
+    response = client.get("/finance/transactions", params={"stream": "true", **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return normalized([json.loads(line) for line in response.text.splitlines()])
+
+
+def test_export_merges_archived_months(client, login, session_factory):
+    headers, user_id = seed(client, login, random.Random(17))
+    before = export(client, headers)
+    assert len(before) == 150
+    assert [(row["date"], row["id"]) for row in before] == sorted(((row["date"], row["id"]) for row in before), reverse=True)
+
+    with session_factory() as db:
+        assert archive_transactions(db, ARCHIVE_BEFORE, user_id=user_id)
+    assert export(client, headers) == before
+    date_from, date_to = "2025-02-10", "2025-06-15"
+    assert export(client, headers, date_from=date_from, date_to=date_to) == \
+        [row for row in before if date_from <= row["date"] <= date_to]
+
+
+def test_export_reads_one_archived_month_at_a_time(client, login, session_factory, monkeypatch):
+    headers, user_id = seed(client, login, random.Random(18))
+    with session_factory() as db:
+        archived = archive_transactions(db, ARCHIVE_BEFORE, user_id=user_id)
+    assert len(archived) == 4
+    reads = []
+    read = cold_store.read
+    monkeypatch.setattr(cold_store, "read", lambda user_id, month, version: reads.append(month) or read(user_id, month, version))
+
+    with session_factory() as db:
+        rows = finance.iter_transactions(db, user_id)
+        first = next(rows)
+        assert first.date >= ARCHIVE_BEFORE and reads == ["2025-04"]
+        dates = [first.date] + [row.date for row in rows]
+    assert reads == ["2025-04", "2025-03", "2025-02", "2025-01"]
+    assert dates == sorted(dates, reverse=True) and len(dates) == 150
+
+    async def first_archived():
+        async with AsyncSessionLocal() as db:
+            async for row in async_finance.iter_transactions(db, user_id):
+                if row.date < ARCHIVE_BEFORE:
+                    return row
+
+    reads.clear()
+    row = client.portal.call(first_archived)
+    assert row.date.strftime("%Y-%m") == "2025-04" and reads == ["2025-04"]
@@ -0,0 +1,100 @@
+import datetime
+import json
+import random
+import pytest
+
+DATES = [datetime.date(2025, 3, day).isoformat() for day in (1, 2, 2, 9)]
+
+
+@pytest.fixture
+def seeded(client, login):
+    # 60 transactions on three distinct dates, so pages keep ending inside a run of equal dates.
+    rng = random.Random(1)
+    headers = login("lister")
+    categories = [client.post("/finance/categories", json={"name": f"list {i}"}, headers=headers).json()["id"]
+                  for i in range(2)]
+    accounts = [client.post("/finance/accounts", json={"name": f"account {i}", "balance": 0}, headers=headers).json()["id"]
+                for i in range(2)]
+    transactions = []
+    for _ in range(60):
+        type = rng.choice(["expense", "income"])
+        amount = round(rng.uniform(1, 100), 2)
+        transaction = {"account_id": rng.choice(accounts), "amount": amount, "type": type, "date": rng.choice(DATES)}
+        if type == "expense":
+            transaction["categories"] = [{"category_id": rng.choice(categories), "allocated_amount": amount}]
+        transactions.append(transaction)
+    assert client.post("/finance/transactions/bulk", json=transactions, headers=headers).status_code == 200
+    # Someone else's rows on the same dates must never show up.
+    other = login("other lister")
+    other_account = client.post("/finance/accounts", json={"name": "other", "balance": 0}, headers=other).json()["id"]
+    client.post("/finance/transactions/bulk", headers=other,
+                json=[{"account_id": other_account, "amount": 1, "type": "income", "date": date} for date in DATES])
+    everything = client.get("/finance/transactions", params={"limit": 1000}, headers=headers).json()
+    return headers, accounts, categories, everything
+
+
+def pages(client, headers, **params) -> list:
+    result, cursor = [], None
+    while True:
+        response = client.get("/finance/transactions", headers=headers,
+                              params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        result.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return result
+
+
+def keys(rows: list) -> list:
+    return [(row["date"], row["id"]) for row in rows]
+
+
+def test_listing_is_ordered_by_date_then_id(seeded):
+    _, _, _, everything = seeded
+    assert len(everything) == 60
+    assert keys(everything) == sorted(keys(everything), reverse=True)
+
+
+@pytest.mark.parametrize("params", [{}, {"fields": "id,date,amount"}, {"expand": ""}])
+def test_cursor_pages_across_equal_dates(client, seeded, params):
+    headers, _, _, everything = seeded
+    result = pages(client, headers, limit=7, **params)
+    assert [len(page) for page in result[:-1]] == [7] * (len(result) - 1)
+    rows = [row for page in result for row in page]
+    assert keys(rows) == keys(everything)
+
+
+@pytest.mark.parametrize("name", ["date_from", "date_to", "account_id", "type", "category_id"])
+def test_filters(client, seeded, name):
+    headers, accounts, categories, everything = seeded
+    value, keep = {
+        "date_from": ("2025-03-02", lambda row: row["date"] >= "2025-03-02"),
+        "date_to": ("2025-03-02", lambda row: row["date"] <= "2025-03-02"),
+        "account_id": (accounts[1], lambda row: row["account_id"] == accounts[1]),
+        "type": ("income", lambda row: row["type"] == "income"),
+        "category_id": (categories[0], lambda row: any(tc["category"]["id"] == categories[0]
+                                                       for tc in row["transaction_categories"])),
+    }[name]
+    expected = [row for row in everything if keep(row)]
+    assert 0 < len(expected) < len(everything)
+    rows = [row for page in pages(client, headers, limit=5, **{name: value}) for row in page]
+    assert keys(rows) == keys(expected)
+
+
+def test_invalid_cursor(client, seeded):
+    headers, _, _, _ = seeded
+    response = client.get("/finance/transactions", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_stream_is_ndjson_of_every_matching_row(client, seeded):
+    headers, accounts, _, everything = seeded
+    response = client.get("/finance/transactions", params={"stream": "true"}, headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert keys(json.loads(line) for line in lines) == keys(everything)
+    # No page size: the stream carries every row, and filters still apply.
+    response = client.get("/finance/transactions", params={"stream": "true", "account_id": accounts[0], "limit": 1},
+                          headers=headers)
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert keys(streamed) == keys(row for row in everything if row["account_id"] == accounts[0])